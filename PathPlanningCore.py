@@ -1,5 +1,10 @@
 import numpy as np
 import copy
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from enum import Enum, IntEnum, auto
 
 # 定义PlannerStatus枚举类型
@@ -17,11 +22,75 @@ class HeuristicType(Enum):
     VERTICAL = auto()  # 垂直启发式
     HORIZONTAL = auto()  # 水平启发式
 
+# 网格使用的紧凑数据类型
+GRID_DTYPE = np.uint8  # 地图、覆盖网格 (0: 空白, 1: 障碍物/已访问, 2: 起始点)
+ORIENTATION_DTYPE = np.int8  # A*搜索的方向矩阵 (-1: 未访问, 0~3: 移动方向)
+
+
+# 返回给定地图形状下能容纳所有启发值的最小整数类型
+def heuristic_dtype(shape):
+    if shape[0] + shape[1] < np.iinfo(np.uint16).max:
+        return np.uint16
+    return np.uint32
+
+
+# 编译后的只读地图：地图网格、允许覆盖掩码、初始覆盖网格和起始点只在创建时计算一次
+# 所有数组都设为只读，可以被多个CoveragePlanner（每个是一次运行的上下文）在多个线程中同时共享
+class CompiledMap():
+
+    def __init__(self, map_open, allowed_mask=None):
+        self.map_grid = np.array(map_open, dtype=GRID_DTYPE)  # 地图网格
+        self.shape = self.map_grid.shape
+
+        # 允许覆盖的单元格掩码（与地图同形状的bool数组），None表示整张地图
+        # 掩码外的可通行单元格不会作为覆盖目标，但A*仍可借道通过
+        self.allowed_mask = None
+        if allowed_mask is not None:
+            self.allowed_mask = np.array(allowed_mask, dtype=bool)
+            if self.allowed_mask.shape != self.shape:
+                raise ValueError("allowed_mask的形状{}与地图形状{}不一致".format(
+                    self.allowed_mask.shape, self.shape))
+
+        # 初始覆盖网格：复制地图，并把掩码外的可通行单元格标记为已访问
+        # 这样覆盖搜索不会进入它们，A*也不会把它们当作最近的未访问目标
+        self.base_coverage_grid = np.copy(self.map_grid)
+        if self.allowed_mask is not None:
+            self.base_coverage_grid[~self.allowed_mask & (self.base_coverage_grid == 0)] = 1
+
+        # 按行优先取第一个（掩码内的）起始点
+        candidates = self.map_grid == 2
+        if self.allowed_mask is not None:
+            candidates &= self.allowed_mask
+        starts = np.flatnonzero(candidates)
+        if len(starts) == 0 and self.allowed_mask is not None and np.any(self.map_grid == 2):
+            raise ValueError("地图上的起始点都不在allowed_mask内")
+        self.start_cell = None if len(starts) == 0 else tuple(int(v) for v in np.unravel_index(starts[0], self.shape))
+
+        for grid in (self.map_grid, self.allowed_mask, self.base_coverage_grid):
+            if grid is not None:
+                grid.setflags(write=False)
+        self._digest = None
+
+    # 地图内容的哈希（与mapTools.map_hash相同）
+    def digest(self):
+        if self._digest is None:
+            digest = hashlib.sha1(np.asarray(self.shape, dtype=np.int64).tobytes())
+            digest.update(np.ascontiguousarray(self.map_grid).tobytes())
+            self._digest = digest.hexdigest()
+        return self._digest
+
+
 # 定义CoveragePlanner类
+# 每个实例是一次规划运行的上下文（当前位置、覆盖网格、轨迹、FSM状态和搜索缓冲区），地图数据来自共享的CompiledMap
 class CoveragePlanner():
 
-    def __init__(self, map_open):
-        self.map_grid = map_open  # 地图网格
+    # 可读的移动描述['上', '左', '下', '右']，与实例无关，不需要载入地图即可读取
+    movement_name = ['^', '<', 'v', '>']
+
+    # map_open可以是地图数组或CompiledMap；传入CompiledMap时多个实例共享同一份只读地图
+    def __init__(self, map_open, allowed_mask=None):
+        self.compiled = None  # 编译后的只读地图
+        self._coverage_buffers = None  # 覆盖网格和搜索缓冲区，按地图形状分配
 
         # 在x和y轴上的可能移动方式
         self.movement = [[-1,  0],  # 上
@@ -29,9 +98,6 @@ class CoveragePlanner():
                          [1,  0],    # 下
                          [0,  1]]    # 右
 
-        # 可读的移动描述['上', '左', '下', '右']
-        self.movement_name = ['^', '<', 'v', '>']
-
         # 机器人可能执行的动作
         self.action = [-1, 0, 1, 2]
         self.action_name = ['R', '#', 'L', 'B']  # 右、前进、左、后退
@@ -40,6 +106,9 @@ class CoveragePlanner():
         # A*算法的移动成本
         self.a_star_movement_cost = [1, 1, 1, 1]
 
+        # 载入地图，分配覆盖网格和搜索缓冲区
+        self.load_map(map_open, allowed_mask)
+
         # 当前位置 [x, y, 方向 (默认 = 0)]
         self.current_pos = self.get_start_position()
 
@@ -47,11 +116,9 @@ class CoveragePlanner():
         self.current_trajectory = []
         self.current_trajectory_annotations = []
 
-        # 累积访问过的地图位置的网格
-        self.coverage_grid = np.copy(map_open)
-
         # 有限状态机变量
         self.state_ = PlannerStatus.STANDBY  # 初始状态为待机
+        self.fsm_steps = 0  # 本次搜索已执行的FSM步骤数
 
         # 各种搜索算法的启发式类型
         self.a_star_heuristic = HeuristicType.MANHATTAN
@@ -59,24 +126,140 @@ class CoveragePlanner():
 
         self.debug_level = -1  # 调试级别，默认为-1（不显示调试信息）
 
+    # 地图网格 (只读)
+    @property
+    def map_grid(self):
+        return self.compiled.map_grid
+
+    # 允许覆盖的单元格掩码 (只读)，None表示整张地图
+    @property
+    def allowed_mask(self):
+        return self.compiled.allowed_mask
+
+    # 载入地图和允许覆盖掩码（或直接使用给定的CompiledMap）
+    # 同形状的地图复用已分配的覆盖网格和搜索缓冲区，之后每次start()都不再重新分配
+    def load_map(self, map_open, allowed_mask=None):
+        if isinstance(map_open, CompiledMap):
+            if allowed_mask is not None:
+                raise ValueError("使用CompiledMap时，allowed_mask应在编译时给定")
+            compiled = map_open
+        else:
+            compiled = CompiledMap(map_open, allowed_mask)
+
+        if self._coverage_buffers is None or self._coverage_buffers[0].shape != compiled.shape:
+            shape = compiled.shape
+            # 覆盖搜索的两个交替缓冲区、A*的已关闭网格和方向矩阵
+            self._coverage_buffers = [np.empty(shape, dtype=GRID_DTYPE), np.empty(shape, dtype=GRID_DTYPE)]
+            self._astar_closed = np.empty(shape, dtype=bool)
+            self._astar_orientation = np.empty(shape, dtype=ORIENTATION_DTYPE)
+        self.compiled = compiled
+
+        # 累积访问过的地图位置的网格
+        self.coverage_grid = self._coverage_buffers[0]
+        np.copyto(self.coverage_grid, compiled.base_coverage_grid)
+        self.state_ = PlannerStatus.STANDBY
+
+    # 返回与当前覆盖网格不同的预分配缓冲区，供覆盖搜索写入新的覆盖网格
+    def _coverage_scratch(self):
+        if self.coverage_grid is self._coverage_buffers[0]:
+            return self._coverage_buffers[1]
+        return self._coverage_buffers[0]
+
     # 设置调试级别
     # 决定终端中要显示多少信息
     def set_debug_level(self, level):
         self.debug_level = level
 
     # 执行路径规划
-    def compute(self):
+    # 给定checkpoint_path时，每执行checkpoint_every次FSM步骤保存一次检查点，结束时再保存一次
+    # 给定step_bound时，一旦步数下界超过step_bound就提前停止（本次搜索不可能少于step_bound步），状态保持为搜索状态
+    def compute(self, checkpoint_path=None, checkpoint_every=100, step_bound=None):
         self.printd("compute", "{}".format(self.state_.name), 1)
         while self.compute_non_blocking():
-            pass
+            if checkpoint_path is not None and self.fsm_steps % checkpoint_every == 0:
+                self.save_checkpoint(checkpoint_path)
+            if step_bound is not None and self.steps_lower_bound() > step_bound:
+                self.printd("compute", "步数下界{}超过{}，停止搜索".format(
+                    self.steps_lower_bound(), step_bound), 1)
+                break
+        if checkpoint_path is not None:
+            self.save_checkpoint(checkpoint_path)
         return self.state_
 
+    # 剩余未覆盖的目标单元格数（不含当前位置）
+    def remaining_cells(self):
+        remaining = int(np.count_nonzero(self.coverage_grid == 0))
+        if self.current_pos is not None and self.coverage_grid[self.current_pos[0]][self.current_pos[1]] == 0:
+            remaining -= 1
+        return remaining
+
+    # 完成本次搜索所需步数的下界：已走步数 + 每个剩余单元格至少一步
+    def steps_lower_bound(self):
+        return max(len(self.current_trajectory) - 1, 0) + self.remaining_cells()
+
+    # 地图内容的哈希（与mapTools.map_hash相同），用于确认检查点属于同一张地图
+    def map_digest(self):
+        return self.compiled.digest()
+
+    # 将规划状态（覆盖网格、轨迹、标注、FSM状态、当前位置）保存为未压缩的npz检查点
+    # 先写临时文件再替换，保存过程中崩溃不会损坏上一个检查点
+    def save_checkpoint(self, path):
+        trajectory = self.current_trajectory
+        annotations = self.current_trajectory_annotations
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f,
+                     map_digest=np.array(self.map_digest()),
+                     coverage_grid=np.asarray(self.coverage_grid, dtype=GRID_DTYPE),
+                     # 轨迹按列存储：成本、[x, y, 方向, 执行的动作, 下一个动作] (None记为-1)、状态值
+                     trajectory_value=np.array([t[0] for t in trajectory], dtype=np.float64),
+                     trajectory_fields=np.array([[t[1], t[2], t[3],
+                                                  -1 if t[4] is None else t[4],
+                                                  -1 if t[5] is None else t[5]] for t in trajectory],
+                                                dtype=np.int32).reshape(-1, 5),
+                     trajectory_status=np.array([t[6].value for t in trajectory], dtype=np.uint8),
+                     annotation_xy=np.array([a[:2] for a in annotations], dtype=np.int32).reshape(-1, 2),
+                     annotation_label=np.array([a[2] for a in annotations], dtype='U4'),
+                     state=np.array([self.state_.value, self.cp_heuristic.value, self.a_star_heuristic.value,
+                                     self.fsm_steps], dtype=np.int64),
+                     current_pos=np.array(self.current_pos if self.current_pos is not None else [-1, -1, -1],
+                                          dtype=np.int64))
+        os.replace(tmp_path, path)
+
+    # 从检查点恢复规划状态，之后调用compute()即可从中断处继续
+    def load_checkpoint(self, path):
+        with np.load(path) as checkpoint:
+            if str(checkpoint["map_digest"]) != self.map_digest():
+                raise ValueError("检查点与当前地图不一致")
+            self.coverage_grid = np.array(checkpoint["coverage_grid"], dtype=GRID_DTYPE)
+
+            statuses = {s.value: s for s in PlannerStatus}
+            self.current_trajectory = [
+                [v, x, y, o, None if a_in < 0 else a_in, None if a_next < 0 else a_next, statuses[s]]
+                for v, (x, y, o, a_in, a_next), s in zip(checkpoint["trajectory_value"].tolist(),
+                                                         checkpoint["trajectory_fields"].tolist(),
+                                                         checkpoint["trajectory_status"].tolist())]
+            self.current_trajectory_annotations = [
+                [x, y, label] for (x, y), label in zip(checkpoint["annotation_xy"].tolist(),
+                                                       checkpoint["annotation_label"].tolist())]
+
+            state, cp_heuristic, a_star_heuristic, fsm_steps = checkpoint["state"].tolist()
+            self.state_ = PlannerStatus(state)
+            self.cp_heuristic = HeuristicType(cp_heuristic)
+            self.a_star_heuristic = HeuristicType(a_star_heuristic)
+            self.fsm_steps = fsm_steps
+            current_pos = checkpoint["current_pos"].tolist()
+            self.current_pos = current_pos if current_pos[0] >= 0 else None
+
     # 处理路径规划的有限状态机
     def compute_non_blocking(self):
         self.printd("compute_non_blocking", "{}".format(self.state_.name), 1)
         searching = False
 
         # 根据self.state_属性开始FSM状态机
+        if self.state_ in (PlannerStatus.COVERAGE_SEARCH, PlannerStatus.NEARST_UNVISITED_SEARCH):
+            self.fsm_steps += 1
+
         if self.state_ == PlannerStatus.COVERAGE_SEARCH:
 
             # 使用coverage_search算法进行搜索
@@ -139,9 +322,11 @@ class CoveragePlanner():
         self.current_pos = self.get_start_position(
             orientation=initial_orientation)
 
-        self.coverage_grid = np.copy(self.map_grid)
+        self.coverage_grid = self._coverage_buffers[0]
+        np.copyto(self.coverage_grid, self.compiled.base_coverage_grid)
         self.current_trajectory = []
         self.current_trajectory_annotations = []
+        self.fsm_steps = 0
 
         if cp_heuristic is not None:
             self.cp_heuristic = cp_heuristic
@@ -152,10 +337,106 @@ class CoveragePlanner():
         self.printd("start", "搜索设置为从{}开始，轨迹和覆盖网格已清除".format(
             self.current_pos), debug_level=1)
 
+    # 在线模式：用于部分已知的地图，每次只规划接下来的horizon步，执行后由传感器反馈更新覆盖网格和障碍物，再继续规划
+    # 每次规划只在以当前位置为中心的窗口内运行FSM，窗口规划器由实例池复用，通常代价与horizon有关而与地图大小无关
+    def start_online(self, initial_orientation=0, a_star_heuristic=None, cp_heuristic=None):
+        self.start(initial_orientation, a_star_heuristic, cp_heuristic)
+
+        # 已知地图（可写副本），传感器发现的障碍物写入这里；未知的单元格应在先验地图中视为空白
+        self.known_map = np.array(self.map_grid)
+        # 剩余未覆盖的单元格数，之后只做增量更新
+        self.online_remaining = self.count_uncovered(self.coverage_grid)
+        self._window_pool = PlannerPool(max_per_shape=1)
+
+    # 传感器反馈：把covered中的单元格标记为已覆盖，把obstacles中的单元格标记为障碍物
+    # covered、obstacles为 [(row, col), ...] 或 (n, 2) 数组
+    def sense(self, covered=None, obstacles=None):
+        for cells, is_obstacle in ((covered, False), (obstacles, True)):
+            if cells is None or len(cells) == 0:
+                continue
+            cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+            rows, cols = cells[:, 0], cells[:, 1]
+            uncovered = (self.coverage_grid[rows, cols] == 0) & (self.known_map[rows, cols] == 0)
+            self.online_remaining -= len(np.unique(rows[uncovered] * self.map_grid.shape[1] + cols[uncovered]))
+            if is_obstacle:
+                self.known_map[rows, cols] = 1
+            self.coverage_grid[rows, cols] = 1
+
+        if self.online_remaining == 0 and self.state_ in (PlannerStatus.COVERAGE_SEARCH,
+                                                           PlannerStatus.NEARST_UNVISITED_SEARCH):
+            self.state_ = PlannerStatus.FOUND
+
+    # 从当前位置规划接下来最多horizon步，追加到current_trajectory，返回新增的轨迹行（总图坐标，不含当前位置）
+    # 窗口裁剪到地图范围内；窗口内没有可到达的未覆盖单元格时窗口半径加倍，直到窗口就是整张地图；
+    # 此时（例如剩余的未覆盖单元格都离当前位置很远）单次调用的代价随地图大小增长，而不再只取决于horizon
+    def plan_horizon(self, horizon):
+        if self.state_ not in (PlannerStatus.COVERAGE_SEARCH, PlannerStatus.NEARST_UNVISITED_SEARCH):
+            return []
+        if self.online_remaining == 0:
+            self.state_ = PlannerStatus.FOUND
+            return []
+
+        rows, cols = self.map_grid.shape
+        x, y, orientation = self.current_pos
+        radius = horizon + 1
+        while True:
+            top, bottom = max(x - radius, 0), min(x + radius + 1, rows)
+            left, right = max(y - radius, 0), min(y + radius + 1, cols)
+            segment = self._plan_window(top, left, bottom, right, orientation, horizon)
+            if len(segment) > 1 or (bottom - top, right - left) == (rows, cols):
+                break
+            radius *= 2
+
+        if len(segment) <= 1:
+            # 整张地图上都没有可到达的未覆盖单元格
+            self.state_ = PlannerStatus.NOT_FOUND
+            if len(self.current_trajectory) > 0:
+                self.current_trajectory[-1][6] = PlannerStatus.NOT_FOUND
+            return []
+
+        self.append_trajectory(segment, "ON")
+        self.current_pos = [segment[-1][1], segment[-1][2], segment[-1][3]]
+        self.fsm_steps += 1
+
+        # 新覆盖的单元格
+        path = np.array([t[1:3] for t in segment[1:]], dtype=np.int64)
+        newly = np.unique(path[self.coverage_grid[path[:, 0], path[:, 1]] == 0], axis=0)
+        self.coverage_grid[path[:, 0], path[:, 1]] = 1
+        self.online_remaining -= len(newly)
+        if self.online_remaining == 0:
+            self.state_ = PlannerStatus.FOUND
+            self.current_trajectory[-1][6] = PlannerStatus.FOUND
+        return segment[1:]
+
+    # 在窗口 [top, bottom) x [left, right)（已在地图范围内）以当前位置为起点运行FSM，返回前horizon步的轨迹（总图坐标）
+    def _plan_window(self, top, left, bottom, right, orientation, horizon):
+        # 窗口边界视为障碍物；只有窗口内未覆盖的空白单元格是覆盖目标
+        window_map = np.array(self.known_map[top:bottom, left:right], dtype=GRID_DTYPE)
+        allowed = self.coverage_grid[top:bottom, left:right] == 0
+        center = (self.current_pos[0] - top, self.current_pos[1] - left)
+        window_map[center] = 2
+        allowed[center] = True
+
+        with self._window_pool.planner(window_map, allowed) as cp:
+            cp.start(initial_orientation=orientation, a_star_heuristic=self.a_star_heuristic,
+                     cp_heuristic=self.cp_heuristic)
+            # 逐步执行FSM，轨迹达到horizon步或搜索结束时停止
+            while len(cp.current_trajectory) - 1 < horizon and cp.compute_non_blocking():
+                pass
+            segment = cp.current_trajectory[:horizon + 1]
+        for t in segment:
+            t[1] += top
+            t[2] += left
+            # 窗口内的结束状态不代表整张地图的状态
+            if t[6] in (PlannerStatus.FOUND, PlannerStatus.NOT_FOUND):
+                t[6] = PlannerStatus.COVERAGE_SEARCH
+        return segment
+
     # 使用coverage_search算法查找路径
     def coverage_search(self, initial_pos, heuristic):
-        # 创建已访问坐标的参考网格
-        closed = np.copy(self.coverage_grid)
+        # 创建已访问坐标的参考网格（写入预分配的缓冲区）
+        closed = self._coverage_scratch()
+        np.copyto(closed, self.coverage_grid)
         closed[initial_pos[0]][initial_pos[1]] = 1
 
         if self.debug_level > 1:
@@ -174,9 +455,12 @@ class CoveragePlanner():
         complete_coverage = False
         resign = False
 
+        # 剩余未覆盖的可通行单元格数量，每走一步减一，避免每步全图扫描
+        remaining = self.count_uncovered(closed)
+
         while not complete_coverage and not resign:
 
-            if self.check_full_coverage(self.map_grid, closed):
+            if remaining == 0:
                 self.printd("coverage_search", "完全覆盖", 2)
                 complete_coverage = True
 
@@ -225,6 +509,7 @@ class CoveragePlanner():
                     # 将已选择的possible_next_coords位置标记为已访问
                     closed[possible_next_coords[0][1]
                            ][possible_next_coords[0][2]] = 1
+                    remaining -= 1
 
         if self.debug_level > 1:
             self.printd("coverage_search", "启发式：", 2)
@@ -255,8 +540,9 @@ class CoveragePlanner():
     # 使用A*搜索算法找到初始坐标和目标坐标之间的最短路径
     def a_star_search_closest_unvisited(self, initial_pos, heuristic):
 
-        # 创建一个已访问位置的参考网格
-        closed = np.zeros_like(self.map_grid)
+        # 创建一个已访问位置的参考网格（复用预分配的缓冲区）
+        closed = self._astar_closed
+        closed.fill(False)
         closed[initial_pos[0]][initial_pos[1]] = 1
 
         if self.debug_level > 1:
@@ -265,8 +551,8 @@ class CoveragePlanner():
             print(closed)
 
         # A*访问位置的移动方向
-        orientation = np.full(
-            (np.size(self.map_grid, 0), np.size(self.map_grid, 1)), -1)
+        orientation = self._astar_orientation
+        orientation.fill(-1)
 
         # 将给定的A*初始位置与其关联的成本添加到“open”列表中
         # “open”是要扩展的有效位置列表：[[f, g, x, y]]
@@ -276,7 +562,7 @@ class CoveragePlanner():
         x = initial_pos[0]
         y = initial_pos[1]
         g = 0
-        f = g + heuristic[x][y]
+        f = g + int(heuristic[x][y])
         open = [[f, g, x, y]]
 
         found = False  # 是否找到了未访问的位置
@@ -319,7 +605,7 @@ class CoveragePlanner():
                             # 检查此位置是否已访问或是否为可访问的位置
                             if closed[x_next][y_next] == 0 and self.map_grid[x_next][y_next] == 0:
                                 g2 = g + self.a_star_movement_cost[i]
-                                f = g2 + heuristic[x_next][y_next]
+                                f = g2 + int(heuristic[x_next][y_next])
                                 open.append([f, g2, x_next, y_next])
                                 closed[x_next][y_next] = 1
                                 orientation[x_next][y_next] = i
@@ -333,7 +619,7 @@ class CoveragePlanner():
 
             # 将最后一个位置添加到轨迹列表中，两个操作均为None（稍后将设置）
             trajectory = [
-                [0, x, y, orientation[x][y], None, None, self.state_]]
+                [0, x, y, int(orientation[x][y]), None, None, self.state_]]
 
             # 将初始方向添加到方向矩阵中
             orientation[initial_pos[0]][initial_pos[1]] = initial_pos[2]
@@ -346,7 +632,7 @@ class CoveragePlanner():
                 x0 = x - self.movement[orientation[x][y]][0]
                 y0 = y - self.movement[orientation[x][y]][1]
                 # 前身方向是在方向矩阵上的方向
-                o0 = orientation[x0][y0]
+                o0 = int(orientation[x0][y0])
                 # 前身操作将在下一次迭代中设置（它是它之前的下一个操作）
                 a0 = None
 
@@ -395,62 +681,62 @@ class CoveragePlanner():
     def check_full_coverage(self, grid, closed):
         return np.all(np.copy(grid)+np.copy(closed))
 
+    # 返回给定已关闭网格中尚未覆盖的可通行单元格数量
+    def count_uncovered(self, closed):
+        return int(np.count_nonzero((np.asarray(self.map_grid) == 0) & (closed == 0)))
+
+    # 创建初始覆盖网格（CompiledMap.base_coverage_grid的可写副本）
+    def create_coverage_grid(self):
+        return np.copy(self.compiled.base_coverage_grid)
+
+    # 返回到目标点的行距离(列向量)和列距离(行向量)，使用紧凑的整数类型
+    def heuristic_axis_distances(self, target_point):
+        rows, cols = self.map_grid.shape
+        dtype = heuristic_dtype(self.map_grid.shape)
+        dx = np.abs(np.arange(rows, dtype=np.int64) - target_point[0]).astype(dtype)
+        dy = np.abs(np.arange(cols, dtype=np.int64) - target_point[1]).astype(dtype)
+        return dx[:, np.newaxis], dy[np.newaxis, :]
+
     # 返回给定目标点的曼哈顿启发式
     def create_manhattan_heuristic(self, target_point):
-        heuristic = np.zeros_like(self.map_grid)
-        for x in range(len(heuristic)):
-            for y in range(len(heuristic[0])):
-                heuristic[x][y] = abs(x-target_point[0])+abs(y-target_point[1])
-        return heuristic
+        dx, dy = self.heuristic_axis_distances(target_point)
+        return dx + dy
 
     # 返回给定目标点的切比雪夫启发式
     def create_chebyshev_heuristic(self, target_point):
-        heuristic = np.zeros_like(self.map_grid)
-        for x in range(len(heuristic)):
-            for y in range(len(heuristic[0])):
-                heuristic[x][y] = max(
-                    abs(x-target_point[0]), abs(y-target_point[1]))
-        return heuristic
+        dx, dy = self.heuristic_axis_distances(target_point)
+        return np.maximum(dx, dy)
 
     # 返回给定目标点的水平启发式
+    # 只依赖一个轴的启发式以只读广播视图返回，不再分配整张地图大小的数组
     def create_horizontal_heuristic(self, target_point):
-        heuristic = np.zeros_like(self.map_grid)
-        for x in range(len(heuristic)):
-            for y in range(len(heuristic[0])):
-                heuristic[x][y] = abs(x-target_point[0])
-        return heuristic
+        dx, _ = self.heuristic_axis_distances(target_point)
+        return np.broadcast_to(dx, self.map_grid.shape)
 
     # 返回给定目标点的垂直启发式
     def create_vertical_heuristic(self, target_point):
-        heuristic = np.zeros_like(self.map_grid)
-        for x in range(len(heuristic)):
-            for y in range(len(heuristic[0])):
-                heuristic[x][y] = abs(y-target_point[1])
-        return heuristic
+        _, dy = self.heuristic_axis_distances(target_point)
+        return np.broadcast_to(dy, self.map_grid.shape)
 
     # 返回给定目标点和启发式类型的启发式
     def create_heuristic(self, target_point, heuristic_type):
-        heuristic = np.zeros_like(self.map_grid)
-        for x in range(len(heuristic)):
-            for y in range(len(heuristic[0])):
-                if heuristic_type == HeuristicType.MANHATTAN:
-                    heuristic[x][y] = abs(
-                        x-target_point[0]) + abs(y-target_point[1])
-                elif heuristic_type == HeuristicType.CHEBYSHEV:
-                    heuristic[x][y] = max(
-                        abs(x-target_point[0]), abs(y-target_point[1]))
-                elif heuristic_type == HeuristicType.HORIZONTAL:
-                    heuristic[x][y] = abs(x-target_point[0])
-                elif heuristic_type == HeuristicType.VERTICAL:
-                    heuristic[x][y] = abs(y-target_point[1])
-        return heuristic
-
-    # 返回当前地图网格的初始x、y和方向
+        if heuristic_type == HeuristicType.MANHATTAN:
+            return self.create_manhattan_heuristic(target_point)
+        elif heuristic_type == HeuristicType.CHEBYSHEV:
+            return self.create_chebyshev_heuristic(target_point)
+        elif heuristic_type == HeuristicType.HORIZONTAL:
+            return self.create_horizontal_heuristic(target_point)
+        elif heuristic_type == HeuristicType.VERTICAL:
+            return self.create_vertical_heuristic(target_point)
+        return np.zeros(self.map_grid.shape, dtype=heuristic_dtype(self.map_grid.shape))
+
+    # 返回当前地图网格的初始x、y和方向（起始点在CompiledMap中查找并缓存）
+    # 如果设置了掩码，只在掩码内寻找起始点
     def get_start_position(self, orientation=0):
-        for x in range(len(self.map_grid)):
-            for y in range(len(self.map_grid[0])):
-                if(self.map_grid[x][y] == 2):
-                    return [x, y, orientation]
+        start_cell = self.compiled.start_cell
+        if start_cell is None:
+            return None
+        return [start_cell[0], start_cell[1], orientation]
 
     # 将给定轨迹附加到主轨迹
     def append_trajectory(self, new_trajectory, algorithm_ref):
@@ -490,15 +776,20 @@ class CoveragePlanner():
 
     # 返回搜索结果：[found?, total_steps, total_cost, trajectory, xy_trajectory]
     def result(self):
-        found = self.state_ == PlannerStatus.FOUND
-        total_steps = len(self.current_trajectory)-1
-        total_cost = self.calculate_trajectory_cost(self.current_trajectory)
+        found, total_steps, total_cost = self.summary()
         xy_trajectory = self.get_xy_trajectory(self.current_trajectory)
 
         res = [found, total_steps, total_cost,
                self.current_trajectory, xy_trajectory]
         return res
 
+    # 返回搜索结果的摘要 [found, steps, cost]，不生成坐标列表
+    def summary(self):
+        found = self.state_ == PlannerStatus.FOUND
+        total_steps = len(self.current_trajectory)-1
+        total_cost = self.calculate_trajectory_cost(self.current_trajectory)
+        return [found, total_steps, total_cost]
+
     # 打印搜索结果的摘要
     def show_results(self):
         self.printd("show_results",
@@ -577,3 +868,67 @@ class CoveragePlanner():
     def printd(self, f, m, debug_level=0):
         if debug_level <= self.debug_level:
             print("["+f+"] "+m)
+
+
+# 按地图形状缓存空闲的CoveragePlanner实例，长期运行的服务和配置迭代不必为每次规划重新分配网格和缓冲区
+# acquire/release可以在多个线程中调用
+class PlannerPool():
+
+    def __init__(self, max_per_shape=4, max_shapes=16):
+        self.max_per_shape = max_per_shape  # 每种形状最多保留的空闲实例数
+        self.max_shapes = max_shapes  # 最多保留空闲实例的形状数，超过时淘汰最久未使用的形状
+        self._idle = OrderedDict()  # 形状 -> 空闲实例列表，按最近使用排序
+        self._lock = threading.Lock()
+        self.created = 0  # 新建的实例数
+        self.reused = 0  # 复用的次数
+
+    # 取出一个同形状的空闲实例并载入地图（数组或CompiledMap），没有时新建
+    def acquire(self, map_open, allowed_mask=None):
+        shape = map_open.shape if isinstance(map_open, CompiledMap) else np.shape(map_open)
+        with self._lock:
+            idle = self._idle.get(shape)
+            cp = idle.pop() if idle else None
+            if idle is not None:
+                self._idle.move_to_end(shape)
+            if cp is None:
+                self.created += 1
+            else:
+                self.reused += 1
+        if cp is None:
+            return CoveragePlanner(map_open, allowed_mask=allowed_mask)
+        cp.load_map(map_open, allowed_mask)
+        cp.set_debug_level(-1)
+        return cp
+
+    # 归还实例，归还后不能再使用它（包括其coverage_grid）
+    # 空闲实例只保留按形状分配的缓冲区，不再引用地图和轨迹
+    def release(self, cp):
+        shape = cp._coverage_buffers[0].shape
+        cp.compiled = None
+        cp.current_trajectory = []
+        cp.current_trajectory_annotations = []
+        with self._lock:
+            idle = self._idle.setdefault(shape, [])
+            self._idle.move_to_end(shape)
+            if len(idle) < self.max_per_shape:
+                idle.append(cp)
+            while len(self._idle) > self.max_shapes:
+                self._idle.popitem(last=False)
+
+    # with pool.planner(map_open) as cp: ... 结束时自动归还
+    @contextmanager
+    def planner(self, map_open, allowed_mask=None):
+        cp = self.acquire(map_open, allowed_mask)
+        try:
+            yield cp
+        finally:
+            self.release(cp)
+
+    # 清空所有空闲实例
+    def clear(self):
+        with self._lock:
+            self._idle.clear()
+
+
+# 进程内共享的默认实例池
+default_planner_pool = PlannerPool()
@@ -0,0 +1,204 @@
+import numpy as np
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from getPath import plan_map, plan_multi_agent_coverage
+from mapTools import basic_region_partition, advanced_region_partition, load_packed_map, map_hash
+from mapCatalog import MapCatalog
+from planIO import result_to_json
+from trajectoryCodec import compress_result
+
+# 非交互的批量规划：对地图目录或地图目录文件中的每张地图、每个智能体数量规划覆盖路径，
+# 结果逐行追加到JSON Lines文件；中断后重新运行会跳过已完成的任务
+
+PARTITIONERS = {
+    "basic": basic_region_partition,
+    "advanced": advanced_region_partition
+}
+
+# 工作进程中缓存打开的地图目录
+_catalog_cache = {}
+
+
+def list_maps(source) -> list:
+    '''
+    列出地图来源中的所有地图名称
+
+    :param source: 地图文件夹（包含npy或位压缩npz地图），或build_map_catalog生成的地图目录文件
+    :return: 地图名称列表（文件夹按文件名排序，地图目录按写入顺序）
+    '''
+    if os.path.isdir(source):
+        names = {}
+        for file_name in sorted(os.listdir(source)):
+            name, ext = os.path.splitext(file_name)
+            if ext in (".npy", ".npz"):
+                names.setdefault(name, None)
+        return list(names)
+    return MapCatalog(source).names()
+
+
+def read_map(source, map_name):
+    '''
+    由地图来源读取一张地图 (uint8)，文件夹中同名的npy优先于npz
+    '''
+    if os.path.isdir(source):
+        path = os.path.join(source, map_name)
+        if os.path.exists(path + ".npy"):
+            return np.asarray(np.load(path + ".npy"), dtype=np.uint8)
+        return load_packed_map(path + ".npz")
+    if source not in _catalog_cache:
+        _catalog_cache[source] = MapCatalog(source)
+    return _catalog_cache[source].get(map_name)
+
+
+def task_key(map_name, partition, num_agents):
+    # 单机规划不做区域划分
+    return (map_name, partition if num_agents > 1 else "none", int(num_agents))
+
+
+def plan_task(source, map_name, partition="advanced", num_agents=1, compress=False) -> dict:
+    '''
+    规划一个批量任务，在工作进程中执行
+
+    :return: 一行结果记录
+
+    {
+        "map_name": 地图名称, "partition": 区域划分算法 ("none"表示单机), "agents": 智能体数量,
+
+        "map_hash": 地图哈希, "shape": 地图尺寸, "elapsed_s": 规划耗时（秒）,
+
+        "steps": 各智能体步数之和, "makespan": 各智能体步数的最大值,
+
+        "results": 各智能体的路径字典 (格式同plan_map / plan_multi_agent_coverage)；出错时为"error"字段
+    }
+    '''
+    map_name, partition, num_agents = task_key(map_name, partition, num_agents)
+    record = {"map_name": map_name, "partition": partition, "agents": num_agents}
+    try:
+        target_map = read_map(source, map_name)
+        record["map_hash"] = map_hash(target_map)
+        record["shape"] = list(target_map.shape)
+
+        start = time.perf_counter()
+        if num_agents == 1:
+            results = [plan_map(target_map, map_name=map_name)]
+        else:
+            regions = PARTITIONERS[partition](np.array(target_map), num_agents)
+            results = plan_multi_agent_coverage(regions, processes=1)
+        record["elapsed_s"] = time.perf_counter() - start
+
+        steps = [res["Steps"] for res in results]
+        record["steps"] = int(sum(steps))
+        record["makespan"] = int(max(steps))
+        record["results"] = [compress_result(res) for res in results] if compress else results
+    except Exception as e:
+        record["error"] = repr(e)
+    return record
+
+
+def load_completed(output) -> set:
+    '''
+    读取已有的结果文件，返回成功完成的任务键；中断时写了一半的最后一行会被截掉
+    '''
+    completed = set()
+    if not os.path.exists(output):
+        return completed
+
+    with open(output, 'rb+') as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            f.truncate(end)
+    for line in data[:end].splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if "error" not in record:
+            completed.add(task_key(record["map_name"], record["partition"], record["agents"]))
+    return completed
+
+
+def print_progress(done, total, record):
+    if "error" in record:
+        status = "失败: {}".format(record["error"])
+    else:
+        status = "步数={}, 耗时={:.2f}s".format(record["steps"], record["elapsed_s"])
+    print("[{}/{}] {} (智能体={}, 划分={}) {}".format(
+        done, total, record["map_name"], record["agents"], record["partition"], status), file=sys.stderr, flush=True)
+
+
+def run_batch(source, output, partition="advanced", agent_counts=(1,), workers=None, compress=False,
+              resume=True, progress=print_progress) -> dict:
+    '''
+    批量规划地图来源中的所有地图，结果逐行追加到JSON Lines文件
+
+    :param source: 地图文件夹或地图目录文件
+    :param output: 结果文件路径 (.jsonl)
+    :param partition: (默认为"advanced") 多机时使用的区域划分算法，"basic"或"advanced"
+    :param agent_counts: (默认为(1,)) 智能体数量列表，每张地图对每个数量各规划一次
+    :param workers: (默认为None) 工作进程数，None时取CPU核数，1表示在当前进程中顺序规划
+    :param compress: (默认为False) 是否以压缩轨迹格式写入结果
+    :param resume: (默认为True) 是否跳过结果文件中已经成功完成的任务；为False时覆盖结果文件
+    :param progress: (默认为print_progress) 每完成一个任务调用一次 progress(已完成数, 总数, 结果记录)，None表示不报告
+    :return: {"total": 本次任务数, "skipped": 跳过的已完成任务数, "failed": 失败任务数}
+    '''
+    if partition not in PARTITIONERS:
+        raise ValueError("未知的区域划分算法：{}".format(partition))
+
+    completed = load_completed(output) if resume else set()
+    keys = [task_key(map_name, partition, num_agents)
+            for map_name in list_maps(source) for num_agents in dict.fromkeys(agent_counts)]
+    tasks = [key for key in keys if key not in completed]
+    skipped = len(keys) - len(tasks)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    failed = 0
+    with open(output, 'a' if resume else 'w', encoding="utf-8") as f:
+        def write(done, record):
+            # 每行写完立即落盘，中断时最多丢失正在规划的任务
+            f.write(result_to_json(record) + "\n")
+            f.flush()
+            if progress is not None:
+                progress(done, len(tasks), record)
+            return "error" in record
+
+        if workers <= 1 or len(tasks) <= 1:
+            for done, key in enumerate(tasks, 1):
+                failed += write(done, plan_task(source, *key, compress=compress))
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+                futures = [executor.submit(plan_task, source, *key, compress=compress) for key in tasks]
+                for done, future in enumerate(as_completed(futures), 1):
+                    failed += write(done, future.result())
+
+    return {"total": len(tasks), "skipped": skipped, "failed": failed}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量覆盖路径规划，结果写入JSON Lines文件")
+    parser.add_argument("source", help="地图文件夹（npy/npz）或地图目录文件")
+    parser.add_argument("-o", "--output", default="results.jsonl", help="结果文件 (默认: results.jsonl)")
+    parser.add_argument("-p", "--partition", choices=sorted(PARTITIONERS), default="advanced",
+                        help="多机区域划分算法 (默认: advanced)")
+    parser.add_argument("-a", "--agents", type=int, nargs="+", default=[1], help="智能体数量列表 (默认: 1)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="工作进程数 (默认: CPU核数)")
+    parser.add_argument("--compress", action="store_true", help="以压缩轨迹格式写入结果")
+    parser.add_argument("--no-resume", action="store_true", help="覆盖结果文件，不跳过已完成的任务")
+    parser.add_argument("-q", "--quiet", action="store_true", help="不报告进度")
+    args = parser.parse_args(argv)
+
+    summary = run_batch(args.source, args.output, args.partition, args.agents, args.workers, args.compress,
+                        resume=not args.no_resume, progress=None if args.quiet else print_progress)
+    print("完成：{} 个任务，跳过 {} 个已完成任务，失败 {} 个".format(
+        summary["total"], summary["skipped"], summary["failed"]), file=sys.stderr)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+import numpy as np
+
+from PathPlanningCore import HeuristicType, GRID_DTYPE, default_planner_pool
+from tiledPlanner import MOVEMENT, label_components, connect
+
+# 由粗到细的多分辨率覆盖路径规划：地图按k x k切分为粗单元格，先在粗网格上用CoveragePlanner规划访问顺序，
+# 再逐个粗单元格细化。完全空闲的粗单元格直接生成蛇形扫描（数组运算，不做搜索），
+# 只有包含障碍物或地图边界的粗单元格才在块内调用现有规划器，规划耗时主要取决于粗单元格数和边界区域的大小
+
+# 粗单元格类型
+BLOCK_BLOCKED = 0   # 没有可通行单元格
+BLOCK_OPEN = 1      # 全部可通行，直接蛇形扫描
+BLOCK_MIXED = 2     # 包含障碍物或地图边界，块内细规划
+
+
+def classify_blocks(input_map, k):
+    '''
+    将地图按k x k切分并对每个粗单元格分类
+
+    :param input_map: 地图数组 (0: 空白, 1: 障碍物, 2: 起始点)
+    :param k: 粗单元格边长
+    :return: (粗网格行数, 粗网格列数) 的类型数组 (BLOCK_BLOCKED / BLOCK_OPEN / BLOCK_MIXED)
+    '''
+    input_map = np.asarray(input_map)
+    rows, cols = input_map.shape
+    out_rows, out_cols = -(-rows // k), -(-cols // k)
+    # 地图外的部分按障碍物补齐，因此不完整的边缘块归为MIXED
+    free = np.zeros((out_rows * k, out_cols * k), dtype=bool)
+    free[:rows, :cols] = input_map != 1
+    counts = free.reshape(out_rows, k, out_cols, k).sum(axis=(1, 3))
+    kinds = np.full(counts.shape, BLOCK_MIXED, dtype=np.uint8)
+    kinds[counts == 0] = BLOCK_BLOCKED
+    kinds[counts == k * k] = BLOCK_OPEN
+    return kinds
+
+
+def coarse_order(kinds, start_block, cp_heuristic=HeuristicType.VERTICAL):
+    '''
+    在粗网格上用CoveragePlanner规划粗单元格的访问顺序
+
+    :param kinds: classify_blocks返回的类型数组
+    :param start_block: 起始点所在的粗单元格 (row, col)
+    :param cp_heuristic: (默认为VERTICAL) 覆盖搜索的启发式
+    :return: 按首次访问排序的粗单元格 (n, 2) 数组，粗规划未到达的单元格按行优先顺序排在末尾
+    '''
+    coarse_map = (kinds == BLOCK_BLOCKED).astype(GRID_DTYPE)
+    coarse_map[start_block] = 2
+    with default_planner_pool.planner(coarse_map) as cp:
+        cp.start(cp_heuristic=cp_heuristic)
+        cp.compute()
+        xy = np.asarray(cp.result()[4], dtype=np.int64).reshape(-1, 2)
+
+    ids = xy[:, 0] * kinds.shape[1] + xy[:, 1]
+    unique_ids, first = np.unique(ids, return_index=True)
+    visited = unique_ids[np.argsort(first)]
+    rest = np.setdiff1d(np.flatnonzero(kinds.ravel() != BLOCK_BLOCKED), visited)
+    order = np.concatenate([visited, rest])
+    return np.stack(np.divmod(order, kinds.shape[1]), axis=1)
+
+
+def serpentine(height, width, corner, by_rows=True):
+    '''
+    生成矩形区域内从给定角出发的蛇形扫描
+
+    :param height: 区域高度
+    :param width: 区域宽度
+    :param corner: 出发角 (0或1, 0或1)，分别表示从上/下边、左/右边出发
+    :param by_rows: (默认为True) True时逐行扫描，否则逐列扫描
+    :return: 区域内坐标的 (height * width, 2) 数组
+    '''
+    if not by_rows:
+        return serpentine(width, height, corner[::-1], True)[:, ::-1]
+    r = np.arange(height) if corner[0] == 0 else np.arange(height - 1, -1, -1)
+    c = np.arange(width) if corner[1] == 0 else np.arange(width - 1, -1, -1)
+    cc = np.tile(c, (height, 1))
+    cc[1::2] = cc[1::2, ::-1]
+    return np.stack([np.repeat(r, width), cc.ravel()], axis=1)
+
+
+def _straight_connector(free, a, b):
+    # 尝试先横后竖或先竖后横的L形路径，全部经过可通行单元格时返回路径，否则返回None
+    for first_rows in (False, True):
+        if first_rows:
+            corner = (b[0], a[1])
+        else:
+            corner = (a[0], b[1])
+        legs = []
+        for p, q in ((a, corner), (corner, b)):
+            n = abs(q[0] - p[0]) + abs(q[1] - p[1])
+            t = np.arange(1, n + 1)
+            legs.append(np.stack([p[0] + np.sign(q[0] - p[0]) * t, p[1] + np.sign(q[1] - p[1]) * t], axis=1))
+        path = np.concatenate([np.array([a])] + legs)
+        if free[path[:, 0], path[:, 1]].all():
+            return path
+    return None
+
+
+def _window_connector(free, pos, target, block_bounds, margin):
+    # 在覆盖当前位置和目标粗单元格的窗口内BFS连接，找不到时加倍扩大窗口，窗口已是整张地图仍找不到则返回None
+    rows, cols = free.shape
+    top, left, bottom, right = block_bounds
+    while True:
+        r0, c0 = max(0, min(top, pos[0]) - margin), max(0, min(left, pos[1]) - margin)
+        r1, c1 = min(rows, max(bottom, pos[0] + 1) + margin), min(cols, max(right, pos[1] + 1) + margin)
+        window_target = np.zeros((r1 - r0, c1 - c0), dtype=bool)
+        window_target[top-r0:bottom-r0, left-c0:right-c0] = target
+        path = connect(free[r0:r1, c0:c1], [pos[0] - r0, pos[1] - c0], window_target)
+        if path is not None:
+            return np.asarray(path, dtype=np.int64) + np.array([r0, c0])
+        if r0 == 0 and c0 == 0 and r1 == rows and c1 == cols:
+            return None
+        margin *= 2
+
+
+def _orientation(path, orientation):
+    # 由路径最后一步推出朝向
+    if len(path) < 2:
+        return orientation
+    last = path[-1] - path[-2]
+    return MOVEMENT.index((int(last[0]), int(last[1])))
+
+
+def plan_coarse_to_fine(input_map, k=8, cp_heuristic=HeuristicType.VERTICAL) -> dict:
+    '''
+    由粗到细的多分辨率覆盖路径规划
+
+    :param input_map: 地图数组 (0: 空白, 1: 障碍物, 2: 起始点)，没有起始点时从第一个可通行单元格开始
+    :param k: (默认为8) 粗单元格边长，一个粗单元格对应k x k个单元格
+    :param cp_heuristic: (默认为VERTICAL) 粗网格和块内覆盖搜索的启发式
+    :return: 规划结果
+
+    {
+        "path": 轨迹 (n, 2) 数组,
+
+        "steps": 总步数,
+
+        "uncovered": 未能到达的可通行单元格数,
+
+        "coarse_shape": 粗网格尺寸,
+
+        "coarse_order": 粗单元格的访问顺序 (m, 2),
+
+        "open_blocks": 直接蛇形扫描的粗单元格数,
+
+        "mixed_blocks": 块内细规划的粗单元格数
+    }
+    '''
+    input_map = np.asarray(input_map)
+    rows, cols = input_map.shape
+    free = input_map != 1
+    covered = np.zeros((rows, cols), dtype=bool)
+
+    starts = np.argwhere(input_map == 2)
+    if len(starts) == 0:
+        starts = np.argwhere(free)
+    if len(starts) == 0:
+        return {"path": np.zeros((0, 2), dtype=np.int64), "steps": 0, "uncovered": 0,
+                "coarse_shape": (-(-rows // k), -(-cols // k)), "coarse_order": np.zeros((0, 2), dtype=np.int64),
+                "open_blocks": 0, "mixed_blocks": 0}
+    pos = starts[0].astype(np.int64)
+
+    kinds = classify_blocks(input_map, k)
+    start_block = (int(pos[0]) // k, int(pos[1]) // k)
+    # 起始点所在的粗单元格总是细规划，使轨迹从起始点本身开始
+    kinds[start_block] = BLOCK_MIXED
+    order = coarse_order(kinds, start_block, cp_heuristic)
+
+    segments = [pos[None, :]]
+    orientation = 0
+    open_blocks = mixed_blocks = 0
+
+    for i, (br, bc) in enumerate(order):
+        top, left = int(br) * k, int(bc) * k
+        bottom, right = min(top + k, rows), min(left + k, cols)
+        block_free = free[top:bottom, left:right]
+
+        if kinds[br, bc] == BLOCK_OPEN:
+            open_blocks += 1
+            # 从四个角、两个扫描方向中选择：到入口的距离 + 出口到下一个粗单元格中心的距离最小
+            if i + 1 < len(order):
+                next_center = order[i + 1] * k + k // 2
+            else:
+                next_center = None
+            best = None
+            for corner in ((0, 0), (0, 1), (1, 0), (1, 1)):
+                for by_rows in (True, False):
+                    sweep = serpentine(bottom - top, right - left, corner, by_rows) + np.array([top, left])
+                    score = np.abs(sweep[0] - pos).sum()
+                    if next_center is not None:
+                        score += np.abs(sweep[-1] - next_center).sum()
+                    if best is None or score < best[0]:
+                        best = (score, sweep)
+            sweep = best[1]
+            connector = _straight_connector(free, pos, sweep[0])
+            if connector is None:
+                target = np.zeros(block_free.shape, dtype=bool)
+                target[sweep[0][0] - top, sweep[0][1] - left] = True
+                connector = _window_connector(free, pos, target, (top, left, bottom, right), k)
+                if connector is None:
+                    continue
+            segments.append(connector[1:])
+            segments.append(sweep[1:])
+            covered[connector[:, 0], connector[:, 1]] = True
+            covered[top:bottom, left:right] = True
+            orientation = _orientation(np.concatenate([connector, sweep[1:]]), orientation)
+            pos = sweep[-1]
+            continue
+
+        # 包含障碍物或边界的粗单元格：与分块规划相同，连接到最近的未覆盖单元格后用现有规划器覆盖其连通区域
+        mixed_blocks += 1
+        labels, _ = label_components(block_free)
+        block_map = (~block_free).astype(GRID_DTYPE)
+        while True:
+            uncovered = block_free & ~covered[top:bottom, left:right]
+            if not uncovered.any():
+                break
+            connector = _window_connector(free, pos, uncovered, (top, left, bottom, right), k)
+            if connector is None:
+                break
+            segments.append(connector[1:])
+            covered[connector[:, 0], connector[:, 1]] = True
+            orientation = _orientation(connector, orientation)
+
+            entry = (int(connector[-1][0]) - top, int(connector[-1][1]) - left)
+            block_map[entry] = 2
+            allowed = (labels == labels[entry]) & uncovered
+            with default_planner_pool.planner(block_map, allowed) as cp:
+                cp.start(initial_orientation=orientation, cp_heuristic=cp_heuristic)
+                cp.compute()
+                xy = np.asarray(cp.result()[4], dtype=np.int64).reshape(-1, 2)
+                orientation = cp.current_pos[2]
+            block_map[entry] = 0
+            xy += np.array([top, left])
+            segments.append(xy[1:])
+            covered[xy[:, 0], xy[:, 1]] = True
+            pos = xy[-1]
+
+    path = np.concatenate(segments)
+    return {
+        "path": path,
+        "steps": len(path) - 1,
+        "uncovered": int(np.count_nonzero(free & ~covered)),
+        "coarse_shape": kinds.shape,
+        "coarse_order": order,
+        "open_blocks": open_blocks,
+        "mixed_blocks": mixed_blocks
+    }
@@ -0,0 +1,166 @@
+import numpy as np
+
+# 多机轨迹的时空冲突检测（预约表）
+# 所有检测都基于 (智能体, 时间步) 数组的排序完成，不在时间步上做Python循环
+
+
+def trajectories_to_array(trajectories: list, stay_at_goal=True):
+    '''
+    将多条总图坐标轨迹转换为预约表数组
+
+    :param trajectories: 轨迹列表，每条轨迹为 [[row, col], ...]；也可以直接传入plan_multi_agent_coverage的结果（使用global_path_point_list）
+    :param stay_at_goal: (默认为True) 智能体完成轨迹后是否停留在终点并继续占用该单元格
+    :return: positions: (智能体数, 最大步数, 2) 的int32数组；valid: (智能体数, 最大步数) 的bool数组，表示该时刻是否占用单元格
+    '''
+    paths = []
+    for t in trajectories:
+        if isinstance(t, dict):
+            t = t['global_path_point_list']
+        paths.append(np.asarray(t, dtype=np.int32).reshape(-1, 2))
+
+    num_agents = len(paths)
+    horizon = max((len(p) for p in paths), default=0)
+    positions = np.zeros((num_agents, horizon, 2), dtype=np.int32)
+    valid = np.zeros((num_agents, horizon), dtype=bool)
+
+    for i, p in enumerate(paths):
+        if len(p) == 0:
+            continue
+        positions[i, :len(p)] = p
+        valid[i, :len(p)] = True
+        if stay_at_goal:
+            positions[i, len(p):] = p[-1]
+            valid[i, len(p):] = True
+
+    return positions, valid
+
+
+def _group_pairs(sorted_keys, max_group):
+    '''
+    在已排序的键数组中找出所有键相同的下标对 (i, j), i < j
+
+    :param sorted_keys: 已排序的键数组，可以是一维或二维（按行比较）
+    :param max_group: 同一键出现的最大次数上限（智能体数）
+    :return: (first, second) 两个下标数组
+    '''
+    n = len(sorted_keys)
+    first = []
+    second = []
+    d = 1
+    # 按间距d比较，间距上限为同一键的最大重复次数，与时间步数无关
+    while d < min(n, max_group):
+        if sorted_keys.ndim == 1:
+            same = sorted_keys[:-d] == sorted_keys[d:]
+        else:
+            same = np.all(sorted_keys[:-d] == sorted_keys[d:], axis=1)
+        idx = np.nonzero(same)[0]
+        if len(idx) == 0:
+            break
+        first.append(idx)
+        second.append(idx + d)
+        d += 1
+
+    if not first:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    return np.concatenate(first), np.concatenate(second)
+
+
+def find_vertex_conflicts(positions, valid):
+    '''
+    查找顶点冲突：两个智能体在同一时间步占用同一单元格
+
+    :param positions: trajectories_to_array返回的位置数组
+    :param valid: trajectories_to_array返回的占用标志数组
+    :return: (冲突数, 5) 的int64数组，每行为 [时间步, 智能体a, 智能体b, row, col]，a < b
+    '''
+    num_agents, horizon = valid.shape
+    agent_idx, t_idx = np.nonzero(valid)
+    rows = positions[agent_idx, t_idx, 0].astype(np.int64)
+    cols = positions[agent_idx, t_idx, 1].astype(np.int64)
+
+    if len(rows) == 0:
+        return np.zeros((0, 5), dtype=np.int64)
+
+    width = int(cols.max()) + 1
+    cells = int(rows.max() + 1) * width
+    keys = t_idx.astype(np.int64) * cells + rows * width + cols
+
+    order = np.argsort(keys)
+    i, j = _group_pairs(keys[order], num_agents)
+    a = agent_idx[order][i]
+    b = agent_idx[order][j]
+    k = order[i]
+
+    conflicts = np.stack([t_idx[k], np.minimum(a, b), np.maximum(a, b), rows[k], cols[k]], axis=1)
+    return conflicts.astype(np.int64)
+
+
+def find_edge_conflicts(positions, valid):
+    '''
+    查找边冲突：两个智能体在同一时间步互换所在单元格
+
+    :param positions: trajectories_to_array返回的位置数组
+    :param valid: trajectories_to_array返回的占用标志数组
+    :return: (冲突数, 7) 的int64数组，每行为 [时间步t, 智能体a, 智能体b, from_row, from_col, to_row, to_col]，
+             表示a在t到t+1间从from移动到to，b同时从to移动到from
+    '''
+    num_agents, horizon = valid.shape
+    if horizon < 2:
+        return np.zeros((0, 7), dtype=np.int64)
+
+    # 相邻两个时间步都有效且发生移动的边
+    moving = valid[:, :-1] & valid[:, 1:] & np.any(positions[:, :-1] != positions[:, 1:], axis=2)
+    agent_idx, t_idx = np.nonzero(moving)
+    src = positions[agent_idx, t_idx].astype(np.int64)
+    dst = positions[agent_idx, t_idx + 1].astype(np.int64)
+
+    if len(src) == 0:
+        return np.zeros((0, 7), dtype=np.int64)
+
+    width = int(max(src[:, 1].max(), dst[:, 1].max())) + 1
+    src_cell = src[:, 0] * width + src[:, 1]
+    dst_cell = dst[:, 0] * width + dst[:, 1]
+    low = np.minimum(src_cell, dst_cell)
+    high = np.maximum(src_cell, dst_cell)
+    forward = src_cell < dst_cell
+
+    # 以无向边 (t, low, high) 分组，同组内方向相反的两条边即为互换
+    cells = int(max(src[:, 0].max(), dst[:, 0].max()) + 1) * width
+    step = np.abs(src - dst).sum(axis=1)
+    if np.all(step == 1):
+        # 四连通单步移动：无向边由较小单元格和移动轴唯一确定，可压缩为单个整数键
+        axis = (src[:, 0] == dst[:, 0]).astype(np.int64)
+        keys = (t_idx.astype(np.int64) * cells + low) * 2 + axis
+        order = np.argsort(keys)
+        keys = keys[order]
+    else:
+        order = np.lexsort((high, low, t_idx))
+        keys = np.stack([t_idx[order], low[order], high[order]], axis=1)
+    i, j = _group_pairs(keys, num_agents)
+    swap = forward[order][i] != forward[order][j]
+    i = order[i[swap]]
+    j = order[j[swap]]
+
+    a = agent_idx[i]
+    b = agent_idx[j]
+    # 以编号较小的智能体为a
+    k = np.where(a < b, i, j)
+    conflicts = np.stack([t_idx[k], np.minimum(a, b), np.maximum(a, b),
+                          src[k, 0], src[k, 1], dst[k, 0], dst[k, 1]], axis=1)
+    return conflicts.astype(np.int64)
+
+
+def check_conflicts(trajectories: list, stay_at_goal=True) -> dict:
+    '''
+    检测多机轨迹的所有时空冲突
+
+    :param trajectories: 总图坐标轨迹列表，或plan_multi_agent_coverage的结果
+    :param stay_at_goal: (默认为True) 智能体完成轨迹后是否停留在终点
+    :return: {"vertex": 顶点冲突数组, "edge": 边冲突数组}，格式见find_vertex_conflicts和find_edge_conflicts
+    '''
+    positions, valid = trajectories_to_array(trajectories, stay_at_goal)
+    return {
+        "vertex": find_vertex_conflicts(positions, valid),
+        "edge": find_edge_conflicts(positions, valid)
+    }
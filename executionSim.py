@@ -0,0 +1,85 @@
+import numpy as np
+
+from conflictCheck import trajectories_to_array
+
+# 多机执行仿真：所有智能体按时间步同步（锁步）执行各自的总图轨迹，每步移动一格，
+# 用数组运算一次性统计完工时间、空闲时间、覆盖率随时间的变化和重复访问次数，不在时间步上做Python循环
+
+
+def simulate_execution(original_map, trajectories: list) -> dict:
+    '''
+    锁步仿真多机覆盖轨迹的执行过程
+
+    :param original_map: 原始地图（总图，1为障碍物）
+    :param trajectories: 总图坐标轨迹列表 ([[row, col], ...] 或 (n, 2) 数组)，也可以直接传入plan_multi_agent_coverage的结果
+    :return: 仿真结果
+
+    {
+        "makespan": 完工时间（所有智能体完成轨迹所需的时间步数）,
+
+        "agent_steps": 各智能体的轨迹步数 (int64数组),
+
+        "idle_steps": 各智能体的空闲时间步数：原地停留的步数 + 完成后等待其他智能体的步数,
+
+        "utilisation": 各智能体的利用率（移动步数 / 完工时间）,
+
+        "new_cells": 各智能体首先覆盖的单元格数,
+
+        "coverage_curve": 长度为makespan + 1的数组，第t个元素为t时刻已覆盖的可通行单元格数,
+
+        "coverage_ratio_curve": coverage_curve / 可通行单元格总数,
+
+        "visit_counts": 与地图同形状的int64数组，每个单元格被访问的总次数,
+
+        "revisits": 重复访问的总次数（访问次数超过1的部分之和）,
+
+        "revisit_histogram": 下标为访问次数、值为单元格数的数组,
+
+        "obstacle_visits": 落在障碍物上的轨迹点数
+    }
+    '''
+    original_map = np.asarray(original_map)
+    rows, cols = original_map.shape
+    free = original_map != 1
+
+    positions, valid = trajectories_to_array(trajectories, stay_at_goal=False)
+    num_agents, horizon = valid.shape
+    agent_steps = valid.sum(axis=1).astype(np.int64) - 1
+    agent_steps[agent_steps < 0] = 0
+    makespan = int(agent_steps.max()) if num_agents > 0 else 0
+
+    # 按 (时间步, 智能体) 展开，顺序即为执行顺序，同一时间步内编号小的智能体在前
+    t_idx, agent_idx = np.nonzero(valid.T)
+    cells = positions[agent_idx, t_idx, 0].astype(np.int64) * cols + positions[agent_idx, t_idx, 1]
+
+    visit_counts = np.bincount(cells, minlength=rows * cols)
+    obstacle_visits = int(visit_counts[~free.ravel()].sum())
+
+    # 每个单元格第一次被访问的时间和访问者
+    unique_cells, first = np.unique(cells, return_index=True)
+    on_free = free.ravel()[unique_cells]
+    first_time = t_idx[first][on_free]
+    first_agent = agent_idx[first][on_free]
+    coverage_curve = np.cumsum(np.bincount(first_time, minlength=makespan + 1)[:makespan + 1])
+    new_cells = np.bincount(first_agent, minlength=num_agents)
+
+    # 原地停留：相邻时间步位置不变
+    stationary = (valid[:, 1:] & valid[:, :-1] & np.all(positions[:, 1:] == positions[:, :-1], axis=2)).sum(axis=1)
+    moving_steps = agent_steps - stationary
+    idle_steps = (makespan - agent_steps) + stationary
+    utilisation = moving_steps / makespan if makespan > 0 else np.zeros(num_agents)
+
+    visited = visit_counts[visit_counts > 0]
+    return {
+        "makespan": makespan,
+        "agent_steps": agent_steps,
+        "idle_steps": idle_steps,
+        "utilisation": utilisation,
+        "new_cells": new_cells,
+        "coverage_curve": coverage_curve,
+        "coverage_ratio_curve": coverage_curve / max(int(free.sum()), 1),
+        "visit_counts": visit_counts.reshape(rows, cols),
+        "revisits": int((visited - 1).sum()),
+        "revisit_histogram": np.bincount(visited),
+        "obstacle_visits": obstacle_visits
+    }
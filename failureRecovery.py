@@ -0,0 +1,172 @@
+import numpy as np
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from getPath import plan_map
+from mapTools import region_mask, submap_to_global_array
+
+# 智能体故障后的任务重分配：只把故障智能体尚未覆盖的单元格分给就近的存活智能体，
+# 然后只为分到新单元格的智能体从当前位置重新规划剩余路径，其余智能体保持原计划
+
+# 未分配的标记
+UNASSIGNED = np.iinfo(np.int32).max
+
+
+def agent_state_from_plan(result, region, step, map_shape):
+    '''
+    由plan_multi_agent_coverage的结果构造智能体在第step步时的状态
+
+    :param result: plan_multi_agent_coverage返回的单个智能体结果
+    :param region: 该智能体的区域
+    :param step: 已执行的步数（当前位置为global_path_point_list[step]）
+    :param map_shape: 总图形状
+    :return: {"position": 当前位置 (row, col), "orientation": 当前方向, "covered": 已覆盖掩码,
+              "assigned": 分配的区域掩码}（均为总图坐标）
+    '''
+    path = np.asarray(result["global_path_point_list"], dtype=np.int64).reshape(-1, 2)
+    step = min(step, len(path) - 1)
+    covered = np.zeros(map_shape, dtype=bool)
+    covered[path[:step + 1, 0], path[:step + 1, 1]] = True
+    return {
+        "position": tuple(int(v) for v in path[step]),
+        "orientation": int(result["policy_map"][step][3]),
+        "covered": covered,
+        "assigned": region_mask(region, map_shape)
+    }
+
+
+def nearest_agent_labels(free, positions):
+    '''
+    多源广度优先搜索：按4连通的路径距离把每个可通行单元格分给最近的智能体，距离相同时分给编号小的
+
+    :param free: 可通行的bool数组
+    :param positions: 各智能体的位置列表 [(row, col), ...]，None表示不参与分配
+    :return: int32标签数组，值为智能体在positions中的下标，不可达的单元格为UNASSIGNED
+    '''
+    labels = np.full(free.shape, UNASSIGNED, dtype=np.int32)
+    for k, pos in enumerate(positions):
+        if pos is not None and labels[pos] == UNASSIGNED:
+            labels[pos] = k
+
+    # 逐层膨胀：每一层每个未分配单元格取4邻域中最小的标签
+    frontier = labels != UNASSIGNED
+    while frontier.any():
+        candidate = np.full(free.shape, UNASSIGNED, dtype=np.int32)
+        np.minimum(candidate[1:, :], np.where(frontier[:-1, :], labels[:-1, :], UNASSIGNED), out=candidate[1:, :])
+        np.minimum(candidate[:-1, :], np.where(frontier[1:, :], labels[1:, :], UNASSIGNED), out=candidate[:-1, :])
+        np.minimum(candidate[:, 1:], np.where(frontier[:, :-1], labels[:, :-1], UNASSIGNED), out=candidate[:, 1:])
+        np.minimum(candidate[:, :-1], np.where(frontier[:, 1:], labels[:, 1:], UNASSIGNED), out=candidate[:, :-1])
+        frontier = free & (labels == UNASSIGNED) & (candidate != UNASSIGNED)
+        labels[frontier] = candidate[frontier]
+    return labels
+
+
+def _plan_window(free, position, orientation, allowed_mask, map_name, window):
+    # 在窗口 (top, left, bottom, right) 内以当前位置为起始点规划，只覆盖allowed_mask内的单元格，返回总图坐标的结果
+    top, left, bottom, right = window
+    target_map = np.where(free[top:bottom, left:right], 0, 1).astype(np.uint8)
+    target_map[position[0] - top, position[1] - left] = 2
+    mask = allowed_mask[top:bottom, left:right].copy()
+    mask[position[0] - top, position[1] - left] = True
+    # 机器人朝向已知时只迭代启发式，不再迭代初始方向
+    res = plan_map(target_map, map_name, allowed_mask=mask,
+                   orientations=None if orientation is None else [orientation], prune=True)
+
+    res["Path_point_list"] = submap_to_global_array(res["Path_point_list"], (top, left, bottom - 1, right - 1)).tolist()
+    res["start_pos"] = res["Path_point_list"][0]
+    res["end_pos"] = res["Path_point_list"][-1]
+    for t in res["policy_map"]:
+        t[1] += top
+        t[2] += left
+    return res
+
+
+def _plan_suffix(original_map, position, orientation, allowed_mask, map_name, margin=2):
+    # 先在包含当前位置和待覆盖单元格的最小矩形（外扩margin）内规划，没有覆盖全部单元格时再使用整张地图
+    free = np.asarray(original_map) != 1
+    cells = np.argwhere(allowed_mask)
+    top, left = np.maximum(np.minimum(cells.min(axis=0), position) - margin, 0)
+    bottom, right = np.minimum(np.maximum(cells.max(axis=0), position) + 1 + margin, free.shape)
+    res = _plan_window(free, position, orientation, allowed_mask, map_name, (top, left, bottom, right))
+
+    if (bottom - top, right - left) != free.shape:
+        path = np.asarray(res["Path_point_list"])
+        visited = np.zeros(free.shape, dtype=bool)
+        visited[path[:, 0], path[:, 1]] = True
+        if np.any(allowed_mask & ~visited):
+            res = _plan_window(free, position, orientation, allowed_mask, map_name,
+                               (0, 0, free.shape[0], free.shape[1]))
+    return res
+
+
+def reallocate_failed_agent(original_map, agents, failed_id, processes=None) -> dict:
+    '''
+    将故障智能体剩余的单元格重新分配给存活的智能体，并只为受影响的智能体重新规划剩余路径
+
+    :param original_map: 原始地图（总图）
+    :param agents: 各智能体的状态列表，每个为 {"position": 当前位置 (row, col), "orientation": 当前方向 (可选),
+                   "covered": 已覆盖掩码, "assigned": 分配的区域掩码}（总图坐标，见agent_state_from_plan）
+    :param failed_id: 故障智能体在agents中的下标
+    :param processes: (默认为None) 进程数，None时取受影响智能体数与CPU核数的较小值，1表示在当前进程中顺序规划
+    :return: 重分配结果
+
+    {
+        "remaining_cells": 故障智能体剩余未覆盖的单元格数,
+
+        "unreachable_cells": 存活智能体都无法到达的剩余单元格数,
+
+        "agents": 与agents一一对应的列表（故障智能体为None），每个为
+            {"agent_id", "reassigned_cells": 新分到的单元格数, "assigned": 新的区域掩码,
+             "replanned": 是否重新规划, "suffix": 从当前位置开始的剩余路径 (plan_map的结果，总图坐标) 或None}
+    }
+    '''
+    original_map = np.asarray(original_map)
+    free = original_map != 1
+    covered_any = np.zeros(original_map.shape, dtype=bool)
+    for agent in agents:
+        covered_any |= agent["covered"]
+
+    # 故障智能体分到但还没有任何智能体覆盖过的单元格
+    remaining = agents[failed_id]["assigned"] & free & ~covered_any
+
+    positions = [None if k == failed_id else tuple(agent["position"]) for k, agent in enumerate(agents)]
+    labels = nearest_agent_labels(free, positions)
+
+    outcome = []
+    affected = []
+    for k, agent in enumerate(agents):
+        if k == failed_id:
+            outcome.append(None)
+            continue
+        extra = remaining & (labels == k)
+        assigned = agent["assigned"] | extra
+        outcome.append({
+            "agent_id": k,
+            "reassigned_cells": int(np.count_nonzero(extra)),
+            "assigned": assigned,
+            "replanned": False,
+            "suffix": None
+        })
+        if outcome[k]["reassigned_cells"] > 0:
+            affected.append(k)
+
+    # 只有分到新单元格的智能体需要重新规划：覆盖自己剩余的和新分到的单元格
+    tasks = [(original_map, positions[k], agents[k].get("orientation"), outcome[k]["assigned"] & free & ~covered_any,
+              "agent_{}".format(k)) for k in affected]
+    if processes is None:
+        processes = min(len(tasks), os.cpu_count() or 1)
+    if processes <= 1:
+        suffixes = [_plan_suffix(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            suffixes = list(executor.map(_plan_suffix, *zip(*tasks)))
+
+    for k, suffix in zip(affected, suffixes):
+        outcome[k]["replanned"] = True
+        outcome[k]["suffix"] = suffix
+
+    return {
+        "remaining_cells": int(np.count_nonzero(remaining)),
+        "unreachable_cells": int(np.count_nonzero(remaining & (labels == UNASSIGNED))),
+        "agents": outcome
+    }
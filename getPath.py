@@ -1,7 +1,16 @@
 import numpy as np
-from PathPlanningCore import CoveragePlanner, HeuristicType, PlannerStatus
+from PathPlanningCore import CompiledMap, CoveragePlanner, HeuristicType, PlannerStatus, default_planner_pool
+from mapTools import (
+    submaps_to_global, load_packed_map, scenario_corpus, gen_scenario_map,
+    coverage_features, expected_coverage_steps, fit_step_model
+)
+from mapCatalog import MapCatalog
+from trajectoryCodec import compress_result
 from tabulate import tabulate
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import deque
 import os
+import threading
 
 import matplotlib.pyplot as plt
 import matplotlib as mpl
@@ -17,14 +26,24 @@ from matplotlib.lines import Line2D
 cp_debug_level = 0
 # 是否显示每个结果的测试标志
 test_show_each_result = False
-
-# 载入地图
-def load_map(map_name):
+# 每个地图迭代的覆盖启发式和初始方向，按此顺序比较，(步数, 成本) 相同时取先出现的配置
+cp_heuristics = [HeuristicType.VERTICAL,
+                 HeuristicType.HORIZONTAL, HeuristicType.CHEBYSHEV, HeuristicType.MANHATTAN]
+cp_orientations = [0, 1, 2, 3]
+
+# 载入地图，统一转换为uint8；没有npy文件时读取位压缩的npz地图
+# 给定地图目录时直接返回目录中的只读视图
+def load_map(map_name, catalog=None):
+    if catalog is not None:
+        return catalog.get(map_name)
+    if not os.path.exists("maps/{}.npy".format(map_name)) and os.path.exists("maps/{}.npz".format(map_name)):
+        return load_packed_map("maps/{}.npz".format(map_name))
     with open("maps/{}.npy".format(map_name), 'rb') as f:
-        return np.load(f)
+        return np.asarray(np.load(f), dtype=np.uint8)
 
 # 使用matplotlib绘制结果
-def plot_map(target_map, trajectory, map_name="map", params_str=""):
+# 无界面环境下请使用show=False，或使用renderTools.render_trajectory批量渲染
+def plot_map(target_map, trajectory, map_name="map", params_str="", show=True):
     # 从CoveragePlanner到转换动作为定向移动的参考
     movement = [[-1,  0],  # 上
                 [0, -1],    # 左
@@ -115,14 +134,17 @@ def plot_map(target_map, trajectory, map_name="map", params_str=""):
         1.025, 1.0), loc='upper left')
     plt.title("覆盖路径规划[{}]\n{}".format(map_name, params_str))
     plt.tight_layout()
-    plt.show()
+    if show:
+        plt.show()
     # 检查目标文件夹是否存在，如果不存在则创建
     if not os.path.exists("output_images"):
         os.makedirs("output_images")
     fig.savefig("output_images/{}.png".format(map_name), bbox_inches='tight')
+    if not show:
+        plt.close(fig)
 
 
-def plan_coverage_path(maps: list, isprint=True, isconsole=True ,test_show_each_result=False) -> list:
+def plan_coverage_path(maps: list, isprint=True, isconsole=True ,test_show_each_result=False, masks=None, catalog=None) -> list:
     """
     覆盖路径规划算法生成函数
 
@@ -130,6 +152,8 @@ def plan_coverage_path(maps: list, isprint=True, isconsole=True ,test_show_each_
     :param isprint: (默认为True) 是否输出图示；
     :param isconsole:  (默认为True) 是否控制台打印信息；
     :param test_show_each_result: (默认为False) 是否显示每个结果的测试标志；
+    :param masks: (默认为None) 与maps一一对应的允许覆盖掩码列表（见mapTools.region_mask），只覆盖掩码内的单元格；
+    :param catalog: (默认为None) 地图目录 (MapCatalog或目录文件路径)，给定时从目录中按名称读取地图，而不是maps/*.npy；
     :return: best_trajectory_list: 最好的路径列表
 
     {
@@ -154,88 +178,321 @@ def plan_coverage_path(maps: list, isprint=True, isconsole=True ,test_show_each_
         "policy_map": 策略地图
     }
     """
-    # 为每个地图动态计算最佳覆盖启发式的列表
-    cp_heuristics = [HeuristicType.VERTICAL,
-                     HeuristicType.HORIZONTAL, HeuristicType.CHEBYSHEV, HeuristicType.MANHATTAN]
-    orientations = [0, 1, 2, 3]
+    if isinstance(catalog, str):
+        catalog = MapCatalog(catalog)
+
     best_trajectory_list = []
-    for map_name in maps:
-        compare_tb = []
+    for map_idx, map_name in enumerate(maps):
+        target_map = load_map(map_name, catalog)
+        mask = masks[map_idx] if masks is not None else None
+        best_trajectory_list.append(plan_map(
+            target_map, map_name, allowed_mask=mask, isprint=isprint, isconsole=isconsole,
+            test_show_each_result=test_show_each_result))
+
+    return best_trajectory_list
+
+
+def plan_map(target_map, map_name="map", allowed_mask=None, isprint=False, isconsole=False, test_show_each_result=False, compress=False, orientations=None, prune=False, threads=None) -> dict:
+    """
+    对单个地图数组迭代所有启发式和初始方向，返回最佳覆盖路径
 
-        target_map = load_map(map_name)
-        cp = CoveragePlanner(target_map)
+    :param target_map: 地图数组 (0: 空白, 1: 障碍物, 2: 起始点)，也可以是CompiledMap（此时allowed_mask应为None）；
+    :param map_name: 地图名称，用于打印信息和保存图片；
+    :param allowed_mask: (默认为None) 允许覆盖的单元格掩码；
+    :param isprint: (默认为False) 是否输出图示；
+    :param isconsole: (默认为False) 是否控制台打印信息；
+    :param test_show_each_result: (默认为False) 是否显示每个结果的测试标志；
+    :param compress: (默认为False) 是否返回压缩轨迹格式（见trajectoryCodec.compress_result），用直线段代替逐单元格路径；
+    :param orientations: (默认为None) 迭代的初始方向列表，None时迭代全部4个方向；机器人朝向已知时可以只给当前方向；
+    :param prune: (默认为False) 是否剪枝：当前最佳配置完整覆盖后，步数下界已超过最佳步数的配置提前停止，且不列入摘要表；
+                  被剪掉的配置不可能优于最佳配置，返回的最佳路径与不剪枝相同；
+    :param threads: (默认为None) 线程数，大于1时在线程池中同时运行多个配置，所有线程共享同一个只读的CompiledMap，
+                    结果与顺序执行相同；
+    :return: 最佳路径字典，格式同plan_coverage_path返回列表中的元素
+    """
+    if orientations is None:
+        orientations = cp_orientations
+    compiled = target_map if isinstance(target_map, CompiledMap) else CompiledMap(target_map, allowed_mask)
+    configurations = [(heuristic, orientation) for heuristic in cp_heuristics for orientation in orientations]
+
+    # 每个配置只保留一行摘要 [启发式, 初始方向, 找到?, 步数, 成本]，完整轨迹只保留当前最佳的一条
+    rows = [None] * len(configurations)
+    best = [None]  # [((步数, 成本, 配置序号), 最佳行)]
+    lock = threading.Lock()
+
+    def run_configuration(k):
+        heuristic, orientation = configurations[k]
+        # 每次运行从实例池取出一个运行上下文，地图数据共享
+        with default_planner_pool.planner(compiled) as cp:
+            cp.set_debug_level(cp_debug_level)
+            if test_show_each_result:
+                print("\n\n迭代[地图：{}，cp：{}，初始方向：{}]".format(
+                    map_name, heuristic.name, orientation))
+
+            cp.start(initial_orientation=orientation, cp_heuristic=heuristic)
+            with lock:
+                step_bound = best[0][1][3] if prune and best[0] is not None and best[0][1][2] else None
+            cp.compute(step_bound=step_bound)
+            if cp.state_ not in (PlannerStatus.FOUND, PlannerStatus.NOT_FOUND):
+                # 已被剪枝，不可能优于当前最佳配置
+                return
+
+            if test_show_each_result:
+                cp.show_results()
+
+            row = [heuristic.name, orientation]
+            row.extend(cp.summary())
+            rows[k] = row
+
+            # 按 (步数, 成本, 配置序号) 比较，与顺序迭代时保留先出现的配置一致
+            key = (row[3], row[4], k)
+            with lock:
+                if best[0] is None or key < best[0][0]:
+                    best[0] = (key, row + [cp.current_trajectory, cp.get_xy_trajectory(cp.current_trajectory)])
+
+    # 对每个方向和每个启发式进行迭代
+    if threads is None or threads <= 1:
+        for k in range(len(configurations)):
+            run_configuration(k)
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(run_configuration, range(len(configurations))))
+
+    best_row = best[0][1]
+    summary = [row for row in rows if row is not None]
+    movement_name = CoveragePlanner.movement_name
+
+    # 按步数排序
+    summary.sort(key=lambda x: (x[3], x[4]))
+
+    # 显示结果
+    if isconsole:
+        print("测试的地图：{}".format(map_name))
+
+    # 打印给定地图的结果摘要
+    for row in summary:
+        # 格式化成2位小数的成本
+        row[4] = "{:.2f}".format(row[4])
+        # 将移动索引转换为移动名称
+        row[1] = movement_name[row[1]]
+
+    compare_tb_headers = ["启发式",
+                          "初始方向", "找到?", "步数", "成本"]
+    summary_tb = tabulate(summary, compare_tb_headers,
+                          tablefmt="pretty", floatfmt=".2f")
+    if isconsole:
+        print(summary_tb)
+
+    # 打印最佳覆盖规划器的策略地图
+    if isconsole:
+        with default_planner_pool.planner(compiled) as cp:
+            cp.set_debug_level(cp_debug_level)
+            cp.print_policy_map(trajectory=best_row[5], trajectory_annotations=[])
+
+    # 绘制完整的轨迹地图
+    if isprint:
+        plot_map(compiled.map_grid, best_row[5], map_name=map_name,
+                 params_str="启发式:{}, 初始方向: {}".format(best_row[0], movement_name[best_row[1]]))
+
+    # 打印最佳路径
+    if isconsole:
+        print("\n最佳路径的坐标列表：[地图：{}，初始方向：{} ({})，覆盖路径启发式：{}]".format(
+            map_name, movement_name[best_row[1]], best_row[1], best_row[0]))
+        print(best_row[6])
+        print("\n\n")
+
+    # 返回信息
+    return _best_result(map_name, best_row, movement_name[best_row[1]], compress)
+
+
+# 由最佳配置 [启发式, 初始方向, 找到?, 步数, 成本, 轨迹, 坐标列表] 生成路径字典
+def _best_result(map_name, best_row, orientation_name, compress=False):
+    best = {
+        "map_name": map_name,
+        "start_pos": best_row[6][0],
+        "end_pos": best_row[6][-1],
+        "start_orientation": orientation_name,
+        "start_orientation_code": best_row[1],
+        "coverage_path_Heuristic": best_row[0],
+        "Path_point_list": best_row[6],
+        "Cost": "{:.2f}".format(best_row[4]),
+        "Steps": best_row[3],
+        "policy_map": best_row[5]
+    }
+    if compress:
+        return compress_result(best)
+    return best
+
+
+# 进程池任务：规划一个 (地图, 启发式, 初始方向) 配置，步数下界超过step_bound时停止并返回None
+def _plan_configuration(target_map, allowed_mask, heuristic, orientation, step_bound=None):
+    with default_planner_pool.planner(target_map, allowed_mask) as cp:
         cp.set_debug_level(cp_debug_level)
+        cp.start(initial_orientation=orientation, cp_heuristic=heuristic)
+        cp.compute(step_bound=step_bound)
+        if cp.state_ not in (PlannerStatus.FOUND, PlannerStatus.NOT_FOUND):
+            return None
+        row = [heuristic.name, orientation]
+        row.extend(cp.result())
+        return row
+
 
-        # 对每个方向和每个启发式进行迭代
-        for heuristic in cp_heuristics:
-            for orientation in orientations:
-                if test_show_each_result:
-                    print("\n\n迭代[地图：{}，cp：{}，初始方向：{}]".format(
-                        map_name, heuristic.name, orientation))
+def plan_coverage_batch(maps: list, map_names=None, masks=None, processes=None, progress=None, compress=False, catalog=None) -> list:
+    """
+    批量规划多张地图：所有地图的 (地图, 启发式, 初始方向) 配置共用一个进程池，可通行单元格多的地图先提交
+    配置按需提交，同一地图后提交的配置以该地图当前完整覆盖的最佳步数为step_bound剪枝
+
+    :param maps: 地图数组列表，元素也可以是地图名称（按load_map读取）；
+    :param map_names: (默认为None) 与maps一一对应的地图名称，None时使用地图名称或"map_序号"；
+    :param masks: (默认为None) 与maps一一对应的允许覆盖掩码列表；
+    :param processes: (默认为None) 进程数，None时取CPU核数，1表示在当前进程中逐个调用plan_map；
+    :param progress: (默认为None) 每完成一张地图调用一次 progress(已完成数, 总数, 地图序号)；
+    :param compress: (默认为False) 是否返回压缩轨迹格式；
+    :param catalog: (默认为None) 地图目录 (MapCatalog或目录文件路径)，maps中的名称从目录中读取；
+    :return: 与maps一一对应（按输入顺序）的最佳路径列表，与plan_map的结果一致
+    """
+    if isinstance(catalog, str):
+        catalog = MapCatalog(catalog)
+    if map_names is None:
+        map_names = [m if isinstance(m, str) else "map_{}".format(i) for i, m in enumerate(maps)]
+    maps = [load_map(m, catalog) if isinstance(m, str) else np.asarray(m, dtype=np.uint8) for m in maps]
+    if masks is None:
+        masks = [None] * len(maps)
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    results = [None] * len(maps)
+    if processes <= 1:
+        for i in range(len(maps)):
+            results[i] = plan_map(maps[i], map_names[i], allowed_mask=masks[i], compress=compress, prune=True)
+            if progress is not None:
+                progress(i + 1, len(maps), i)
+        return results
+
+    # 可通行单元格多的地图先开始，避免大地图排在最后拖长总耗时
+    order = sorted(range(len(maps)), key=lambda i: np.count_nonzero(maps[i] != 1), reverse=True)
+
+    configurations = [(h, o) for h in cp_heuristics for o in cp_orientations]
+    pending = deque((i, k) for i in order for k in range(len(configurations)))
+
+    # 每张地图只保留当前最佳配置，(步数, 成本, 配置序号) 最小者与plan_map的选择一致
+    best = [None] * len(maps)
+    remaining = [len(configurations)] * len(maps)
+    done = 0
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = {}
+
+        def submit():
+            # 在途任务数保持为进程数的两倍，使后提交的配置能用上已完成配置的步数
+            while pending and len(futures) < 2 * processes:
+                i, k = pending.popleft()
+                heuristic, orientation = configurations[k]
+                step_bound = best[i][1][3] if best[i] is not None and best[i][1][2] else None
+                future = executor.submit(_plan_configuration, maps[i], masks[i], heuristic, orientation, step_bound)
+                futures[future] = (i, k)
+
+        submit()
+        while futures:
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                i, k = futures.pop(future)
+                row = future.result()
+                # 被剪枝的配置步数一定多于当前最佳，不可能被选中
+                if row is not None:
+                    key = (row[3], row[4], k)
+                    if best[i] is None or key < best[i][0]:
+                        best[i] = (key, row)
+                remaining[i] -= 1
+                if remaining[i] == 0:
+                    row = best[i][1]
+                    results[i] = _best_result(map_names[i], row, CoveragePlanner.movement_name[row[1]], compress)
+                    best[i] = None
+                    done += 1
+                    if progress is not None:
+                        progress(done, len(maps), i)
+            submit()
+
+    return results
+
+
+def calibrate_step_model(scenarios=None, processes=None) -> tuple:
+    """
+    在基准场景上运行完整规划，以最小二乘拟合mapTools.expected_coverage_steps使用的步数模型 (mapTools.STEP_MODEL)
 
-                cp.start(initial_orientation=orientation, cp_heuristic=heuristic)
-                cp.compute()
+    :param scenarios: (默认为None) scenario_corpus生成的场景列表，None时使用scenario_corpus(sizes=((24, 24), (48, 48)), repeats=2)
+                      加上同尺寸、各4张有死胡同的"obstacle"场景，使死胡同系数也能被拟合；
+    :param processes: (默认为None) 进程数，同plan_coverage_batch；
+    :return: (模型系数, 拟合后的平均相对误差)
+    """
+    if scenarios is None:
+        scenarios = (scenario_corpus(sizes=((24, 24), (48, 48)), repeats=2)
+                     + scenario_corpus(sizes=((24, 24), (48, 48)), densities=(0,), block_sizes=((1, 1),),
+                                       repeats=4, seed=1, generator="obstacle"))
+    maps = [gen_scenario_map(scenario) for scenario in scenarios]
+    results = plan_coverage_batch(maps, [scenario["name"] for scenario in scenarios], processes=processes)
 
-                if test_show_each_result:
-                    cp.show_results()
+    features = [coverage_features(m) for m in maps]
+    steps = np.array([res["Steps"] for res in results], dtype=np.float64)
+    model = fit_step_model(features, steps)
+    expected = np.array([expected_coverage_steps(m, model=model, features=f) for m, f in zip(maps, features)])
+    return model, float(np.mean(np.abs(expected - steps) / np.maximum(steps, 1)))
 
-                res = [heuristic.name, orientation]
-                res.extend(cp.result())
-                compare_tb.append(res)
 
-        # 按步数排序
-        compare_tb.sort(key=lambda x: (x[3], x[4]))
+def plan_multi_agent_coverage(regions: list, processes=None, isconsole=False, use_threads=False) -> list:
+    """
+    多机覆盖路径规划：在进程池中并行规划各区域，并把路径转换为总图坐标
 
-        # 显示结果
-        if isconsole:
-            print("测试的地图：{}".format(map_name))
-
-        # 打印给定地图的结果摘要
-        summary = [row[0:5] for row in compare_tb]
-        for row in summary:
-            # 格式化成2位小数的成本
-            row[4] = "{:.2f}".format(row[4])
-            # 将移动索引转换为移动名称
-            row[1] = cp.movement_name[row[1]]
-
-        compare_tb_headers = ["启发式",
-                              "初始方向", "找到?", "步数", "成本"]
-        summary_tb = tabulate(summary, compare_tb_headers,
-                              tablefmt="pretty", floatfmt=".2f")
-        if isconsole:
-            print(summary_tb)
+    :param regions: basic_region_partition或advanced_region_partition的输出；
+    :param processes: (默认为None) 进程数，None时取区域数量与CPU核数的较小值，1表示在当前进程中顺序规划；
+    :param isconsole: (默认为False) 是否控制台打印信息；
+    :param use_threads: (默认为False) 用线程池代替进程池，子地图不需要复制到子进程；
+                        processes为线程数，每个区域内的配置也用同样数量的线程运行；
+    :return: 与regions一一对应的最佳路径列表，在plan_map返回的字典基础上增加：
 
-        # 打印最佳覆盖规划器的策略地图
-        if isconsole:
-            cp.print_policy_map(trajectory=compare_tb[0][5], trajectory_annotations=[])
+    {
+        "agent_id": 智能体编号 (从0开始),
 
-        # 绘制完整的轨迹地图
-        if isprint:
-            plot_map(target_map, compare_tb[0][5], map_name=map_name,
-                     params_str="启发式:{}, 初始方向: {}".format(compare_tb[0][0], cp.movement_name[compare_tb[0][1]]))
+        "bounds": 区域边界 (start_row, start_col, end_row, end_col),
 
-        # 打印最佳路径
+        "global_path_point_list": 总图坐标下的路径点列表 ([row_id, column_id])
+    }
+    """
+    if processes is None:
+        processes = min(len(regions), os.cpu_count() or 1)
+
+    # 面积大的区域先提交，使总耗时取决于最大的区域
+    order = sorted(range(len(regions)), key=lambda i: regions[i]['area'], reverse=True)
+    tasks = [(region['map'], "region_{}".format(i+1), region.get('mask'))
+             for i, region in enumerate(regions)]
+
+    results = [None] * len(regions)
+    if processes <= 1:
+        for i in order:
+            results[i] = plan_map(*tasks[i], prune=True)
+    elif use_threads:
+        with ThreadPoolExecutor(max_workers=processes) as executor:
+            futures = {i: executor.submit(plan_map, *tasks[i], prune=True, threads=processes) for i in order}
+            for i in order:
+                results[i] = futures[i].result()
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = {i: executor.submit(plan_map, *tasks[i], prune=True) for i in order}
+            for i in order:
+                results[i] = futures[i].result()
+
+    # 将所有子地图路径拼接后一次转换为总图坐标
+    global_paths = submaps_to_global([res["Path_point_list"] for res in results],
+                                     [region['bounds'] for region in regions])
+    for i, (region, res, global_path) in enumerate(zip(regions, results, global_paths)):
+        res["agent_id"] = i
+        res["bounds"] = region['bounds']
+        res["global_path_point_list"] = global_path.tolist()
         if isconsole:
-            print("\n最佳路径的坐标列表：[地图：{}，初始方向：{} ({})，覆盖路径启发式：{}]".format(
-                map_name, cp.movement_name[compare_tb[0][1]], compare_tb[0][1], compare_tb[0][0]))
-            print(compare_tb[0][6])
-            print("\n\n")
-
-        # 返回信息
-        best_trajectory_list.append({
-            "map_name": map_name,
-            "start_pos": compare_tb[0][6][0],
-            "end_pos": compare_tb[0][6][-1],
-            "start_orientation": cp.movement_name[compare_tb[0][1]],
-            "start_orientation_code": compare_tb[0][1],
-            "coverage_path_Heuristic": compare_tb[0][0],
-            "Path_point_list": compare_tb[0][6],
-            "Cost": summary[0][-1],
-            "Steps": summary[0][-2],
-            "policy_map": compare_tb[0][5]
-        })
+            print("智能体 {}: 区域边界={}, 步数={}, 成本={}".format(
+                i+1, region['bounds'], res["Steps"], res["Cost"]))
+
+    return results
 
-    return best_trajectory_list
 
 # 测试
 if __name__ == "__main__":
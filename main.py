@@ -1,12 +1,14 @@
-from getPath import plan_coverage_path
+from getPath import plan_coverage_path, plan_multi_agent_coverage
 from mapTools import (
     gen_base_map, randomStartPoint, random_obstacle_map, map2np,
     basic_region_partition, advanced_region_partition, visualize_multi_agent_path
 )
 import numpy as np
+import argparse
 
 # 多机覆盖路径规划示例
-def multi_agent_coverage_example():
+# 未给定划分算法或智能体数量时交互式输入；批量运行请使用batchPlan.py
+def multi_agent_coverage_example(algorithm_choice=None, num_agents=None):
     print("\n=== 多机覆盖路径规划示例 ===")
     
     # 生成测试地图
@@ -14,13 +16,15 @@ def multi_agent_coverage_example():
     print(f"测试地图尺寸: {test_map.shape}")
     
     # 选择区域划分算法
-    print("\n1. 选择区域划分算法：")
-    print("   1. 初阶区域划分算法")
-    print("   2. 高阶区域划分算法")
-    algorithm_choice = input("   请选择 (1/2): ")
+    if algorithm_choice is None:
+        print("\n1. 选择区域划分算法：")
+        print("   1. 初阶区域划分算法")
+        print("   2. 高阶区域划分算法")
+        algorithm_choice = input("   请选择 (1/2): ")
     
     # 输入智能体数量
-    num_agents = int(input("\n2. 请输入智能体数量 (2-4): "))
+    if num_agents is None:
+        num_agents = int(input("\n2. 请输入智能体数量 (2-4): "))
     
     # 执行区域划分
     if algorithm_choice == '1':
@@ -30,22 +34,9 @@ def multi_agent_coverage_example():
         print("\n使用高阶区域划分算法...")
         regions = advanced_region_partition(test_map, num_agents)
     
-    # 保存子地图
-    submap_names = []
-    for i, region in enumerate(regions):
-        submap = region['map']
-        submap_name = f"submap_{i+1}"
-        submap_names.append(submap_name)
-        
-        # 保存为npy文件
-        import os
-        if not os.path.exists("maps"):
-            os.makedirs("maps")
-        np.save(f"maps/{submap_name}.npy", submap)
-    
-    # 为每个子地图规划路径
+    # 并行为每个区域规划路径
     print("\n3. 为每个子地图规划路径...")
-    paths = plan_coverage_path(submap_names, isprint=False, isconsole=False)
+    paths = plan_multi_agent_coverage(regions)
     
     # 提取路径点
     path_points = []
@@ -67,10 +58,18 @@ def multi_agent_coverage_example():
     print("\n多机覆盖路径规划示例完成！")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="多机覆盖路径规划示例，未给定的参数将交互式输入")
+    parser.add_argument("--mode", choices=["1", "2"], help="1: 单机路径规划示例, 2: 多机覆盖路径规划示例")
+    parser.add_argument("--partition", choices=["1", "2"], help="1: 初阶区域划分算法, 2: 高阶区域划分算法")
+    parser.add_argument("--agents", type=int, help="智能体数量")
+    args = parser.parse_args()
+
     print("=== 多机覆盖路径规划算法 ===")
-    print("1. 单机路径规划示例")
-    print("2. 多机覆盖路径规划示例")
-    choice = input("请选择 (1/2): ")
+    choice = args.mode
+    if choice is None:
+        print("1. 单机路径规划示例")
+        print("2. 多机覆盖路径规划示例")
+        choice = input("请选择 (1/2): ")
     
     if choice == '1':
         # 预设地图
@@ -150,7 +149,7 @@ if __name__ == "__main__":
     
     elif choice == '2':
         # 运行多机覆盖路径规划示例
-        multi_agent_coverage_example()
+        multi_agent_coverage_example(args.partition, args.agents)
     
     else:
         print("无效选择！")
\ No newline at end of file
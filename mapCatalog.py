@@ -0,0 +1,136 @@
+import numpy as np
+import json
+import os
+import struct
+
+from mapTools import map_hash, gen_scenario_map
+
+# 地图目录文件格式：
+# [魔数 8字节][索引偏移 uint64][地图数据区 (uint8网格逐个拼接)][JSON索引]
+# 索引记录每个地图的名称、形状、数据偏移、起始点和内容哈希；追加写入后数据区中可能留有不再使用的旧索引
+CATALOG_MAGIC = b"MAPCAT1\0"
+HEADER_SIZE = len(CATALOG_MAGIC) + 8
+
+
+def _read_header(f):
+    magic = f.read(len(CATALOG_MAGIC))
+    if magic != CATALOG_MAGIC:
+        raise ValueError("不是有效的地图目录文件")
+    return struct.unpack("<Q", f.read(8))[0]
+
+
+def build_map_catalog(path, maps, map_name_list, append=False):
+    '''
+    将多个地图写入单个带索引的地图目录文件
+
+    :param path: 目录文件路径
+    :param maps: 地图可迭代对象 (可以是生成器，逐个写入，不需要同时加载所有地图)
+    :param map_name_list: 地图名字列表
+    :param append: (默认为False) 是否追加到已有的目录文件
+    :return: 写入后的索引条目列表
+    '''
+    entries = []
+    if append and os.path.exists(path):
+        with open(path, 'rb') as f:
+            index_offset = _read_header(f)
+            f.seek(index_offset)
+            entries = json.loads(f.read().decode("utf-8"))
+        mode = 'r+b'
+    else:
+        mode = 'wb'
+
+    # 写入任何数据之前先检查名称，避免中途出错留下损坏的目录文件
+    map_name_list = list(map_name_list)
+    names = set(e["name"] for e in entries)
+    for name in map_name_list:
+        if name in names:
+            raise ValueError("地图目录中已存在地图：{}".format(name))
+        names.add(name)
+
+    with open(path, mode) as f:
+        if mode == 'wb':
+            f.write(CATALOG_MAGIC)
+            f.write(struct.pack("<Q", 0))
+
+        # 追加时新数据和新索引写在旧索引之后，旧索引在头部更新之前保持有效；
+        # 头部最后更新，中途崩溃时目录仍指向旧索引（旧索引占用的空间不再回收）
+        f.seek(0, os.SEEK_END)
+        offset = f.tell()
+        for name, m in zip(map_name_list, maps):
+            m = np.ascontiguousarray(m, dtype=np.uint8)
+            starts = np.argwhere(m == 2)
+            f.write(m.tobytes())
+            entries.append({
+                "name": name,
+                "shape": list(m.shape),
+                "offset": offset,
+                "start": starts[0].tolist() if len(starts) > 0 else None,
+                "hash": map_hash(m)
+            })
+            offset += m.nbytes
+
+        f.write(json.dumps(entries, ensure_ascii=False).encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+        f.seek(len(CATALOG_MAGIC))
+        f.write(struct.pack("<Q", offset))
+
+    return entries
+
+
+class MapCatalog():
+    '''
+    只读地图目录：通过np.memmap零拷贝访问，只有实际使用的地图才会被读入内存
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            index_offset = _read_header(f)
+            f.seek(index_offset)
+            self.entries = json.loads(f.read().decode("utf-8"))
+        self.index = {e["name"]: e for e in self.entries}
+
+        # 整个数据区只映射一次，各地图为其中的视图
+        self.data = None
+        if index_offset > HEADER_SIZE:
+            self.data = np.memmap(path, dtype=np.uint8, mode='r',
+                                  offset=HEADER_SIZE, shape=(index_offset - HEADER_SIZE,))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __iter__(self):
+        return iter(self.names())
+
+    def __getitem__(self, name):
+        return self.get(name)
+
+    # 返回所有地图名称（按写入顺序）
+    def names(self):
+        return [e["name"] for e in self.entries]
+
+    # 返回地图的元数据：名称、形状、数据偏移、起始点、内容哈希
+    def info(self, name):
+        return self.index[name]
+
+    # 返回地图的只读视图 (uint8)
+    def get(self, name):
+        e = self.index[name]
+        shape = tuple(e["shape"])
+        start = e["offset"] - HEADER_SIZE
+        return self.data[start:start + shape[0] * shape[1]].reshape(shape)
+
+
+def build_scenario_catalog(path, scenarios):
+    '''
+    将mapTools.scenario_corpus的场景逐个生成并写入地图目录文件，场景参数可由索引中的地图名称对应
+
+    :param path: 目录文件路径
+    :param scenarios: 场景列表
+    :return: 写入后的索引条目列表
+    '''
+    return build_map_catalog(path, (gen_scenario_map(s) for s in scenarios), [s["name"] for s in scenarios])
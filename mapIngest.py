@@ -0,0 +1,246 @@
+import numpy as np
+import os
+
+# 占据栅格图像（SLAM输出的PGM/PNG）导入：阈值化 -> 按机器人尺寸膨胀障碍物 -> 按规划单元格大小块降采样 -> 添加起始点
+# 所有步骤都是数组运算；PGM (P5) 和npy以内存映射方式按行条带流式处理，任意时刻只有一个条带驻留内存
+
+
+def _pgm_tokens(f, count):
+    # 读取PGM头部的count个字段，跳过以#开头的注释
+    tokens = []
+    while len(tokens) < count:
+        line = f.readline()
+        if not line:
+            raise ValueError("PGM头部不完整")
+        line = line.split(b"#", 1)[0]
+        tokens.extend(line.split())
+    return tokens
+
+
+def read_pgm(path, mmap=True):
+    '''
+    读取PGM灰度图像
+
+    :param path: 文件路径，支持二进制 (P5) 和文本 (P2) 格式，8位或16位
+    :param mmap: (默认为True) P5格式是否以内存映射方式读取
+    :return: (图像, maxval)，图像为 (rows, cols) 的uint8或uint16数组（16位按大端存储），maxval为头部声明的最大灰度值
+    '''
+    with open(path, 'rb') as f:
+        magic, width, height, maxval = _pgm_tokens(f, 4)
+        width, height, maxval = int(width), int(height), int(maxval)
+        dtype = np.dtype(np.uint8) if maxval < 256 else np.dtype('>u2')
+        if magic == b"P2":
+            return np.array(f.read().split()[:width * height], dtype=np.int64).astype(dtype).reshape(height, width), maxval
+        if magic != b"P5":
+            raise ValueError("不支持的PGM格式: {}".format(magic))
+        offset = f.tell()
+    if mmap:
+        return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(height, width)), maxval
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        return np.fromfile(f, dtype=dtype, count=width * height).reshape(height, width), maxval
+
+
+def write_pgm(path, image):
+    '''
+    将灰度图像保存为二进制PGM (P5)
+
+    :param path: 文件路径
+    :param image: uint8或uint16数组
+    '''
+    image = np.asarray(image)
+    maxval = 255 if image.dtype == np.uint8 else 65535
+    with open(path, 'wb') as f:
+        f.write("P5\n{} {}\n{}\n".format(image.shape[1], image.shape[0], maxval).encode())
+        f.write(np.ascontiguousarray(image, dtype=np.uint8 if maxval == 255 else '>u2').tobytes())
+
+
+def read_occupancy_image(path, mmap=True):
+    '''
+    读取占据栅格图像为灰度数组
+
+    :param path: .pgm、.png或.npy文件
+    :param mmap: (默认为True) PGM (P5) 和npy是否以内存映射方式读取；PNG总是完整解码
+    :return: (灰度数组, maxval)，像素值越大越空闲；maxval为PGM头部的最大灰度值，PNG为255，npy为None（见image_to_binary）
+    '''
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".pgm":
+        return read_pgm(path, mmap)
+    if ext == ".npy":
+        return np.load(path, mmap_mode='r' if mmap else None), None
+    if ext == ".png":
+        import matplotlib.image as mpimg
+        image = mpimg.imread(path)
+        if image.ndim == 3:
+            # RGB(A) 取RGB的平均值作为灰度
+            image = image[:, :, :3].mean(axis=2)
+        return np.round(image * 255).astype(np.uint8), 255
+    raise ValueError("不支持的图像格式: {}".format(ext))
+
+
+def image_to_binary(image, occupied_thresh=0.65, free_thresh=0.196, negate=False, unknown_is_obstacle=True, maxval=None):
+    '''
+    将占据栅格图像阈值化为01地图（与map_server的阈值含义一致）
+    0: 可通行区域
+    1: 障碍物
+
+    :param image: 灰度数组（像素值越大越空闲）
+    :param occupied_thresh: (默认为0.65) 占据概率大于该值为障碍物
+    :param free_thresh: (默认为0.196) 占据概率小于该值为空闲
+    :param negate: (默认为False) 是否反转灰度（像素值越大越占据）
+    :param unknown_is_obstacle: (默认为True) 介于两个阈值之间的未知区域是否视为障碍物
+    :param maxval: (默认为None) 表示完全空闲的灰度值（PGM头部的maxval），None时浮点数组取1.0，整数数组取数据类型的最大值
+    :return: 01地图数组 (uint8)
+    '''
+    image = np.asarray(image)
+    if maxval is None:
+        maxval = 1.0 if np.issubdtype(image.dtype, np.floating) else np.iinfo(image.dtype).max
+    maxval = float(maxval)
+    occupancy = image / maxval if negate else (maxval - image) / maxval
+    if unknown_is_obstacle:
+        return (occupancy >= free_thresh).astype(np.uint8)
+    return (occupancy > occupied_thresh).astype(np.uint8)
+
+
+def binary_to_image(binary_map):
+    '''
+    将01地图转换为灰度图像（障碍物为0，空闲为255），可用write_pgm保存
+
+    :param binary_map: 01地图数组
+    :return: uint8灰度数组
+    '''
+    return np.where(np.asarray(binary_map) == 1, 0, 255).astype(np.uint8)
+
+
+def inflate_obstacles(binary_map, radius):
+    '''
+    以圆形机器人足迹膨胀障碍物：与任一障碍物的距离不超过radius的单元格都变为障碍物
+
+    先对每个可能的半宽做一次水平方向的滑动窗口（前缀和），再按行偏移合并，复杂度为O(radius * 单元格数)
+
+    :param binary_map: 01地图数组
+    :param radius: 膨胀半径（单元格数）
+    :return: 膨胀后的01地图 (uint8)
+    '''
+    occupied = np.asarray(binary_map) == 1
+    radius = int(radius)
+    if radius <= 0:
+        return occupied.astype(np.uint8)
+    rows, cols = occupied.shape
+
+    # 水平前缀和，用于计算任意半宽窗口内是否有障碍物
+    prefix = np.zeros((rows, cols + 2 * radius + 1), dtype=np.int32)
+    np.cumsum(occupied, axis=1, out=prefix[:, radius + 1:radius + 1 + cols])
+    prefix[:, radius + 1 + cols:] = prefix[:, radius + cols:radius + 1 + cols]
+
+    inflated = np.zeros((rows, cols), dtype=bool)
+    horizontal = {}
+    for dy in range(-radius, radius + 1):
+        half = int(np.floor(np.sqrt(radius * radius - dy * dy)))
+        if half not in horizontal:
+            # 窗口 [c - half, c + half] 内的障碍物数量
+            horizontal[half] = (prefix[:, radius + half + 1:radius + half + 1 + cols]
+                                - prefix[:, radius - half:radius - half + cols]) > 0
+        h = horizontal[half]
+        if dy >= 0:
+            inflated[:rows - dy] |= h[dy:]
+        else:
+            inflated[-dy:] |= h[:rows + dy]
+    return inflated.astype(np.uint8)
+
+
+def block_reduce(binary_map, factor, occupied_fraction=0.0):
+    '''
+    块降采样：每factor x factor个单元格合并为一个规划单元格，不能整除的边缘部分按障碍物补齐
+
+    :param binary_map: 01地图数组
+    :param factor: 降采样倍数
+    :param occupied_fraction: (默认为0.0) 块内障碍物占比超过该值时为障碍物，0表示块内有任何障碍物即为障碍物
+    :return: 降采样后的01地图 (uint8)
+    '''
+    binary_map = np.asarray(binary_map)
+    factor = int(factor)
+    rows, cols = binary_map.shape
+    out_rows, out_cols = -(-rows // factor), -(-cols // factor)
+    if out_rows * factor != rows or out_cols * factor != cols:
+        padded = np.ones((out_rows * factor, out_cols * factor), dtype=np.uint8)
+        padded[:rows, :cols] = binary_map
+        binary_map = padded
+    blocks = binary_map.reshape(out_rows, factor, out_cols, factor) == 1
+    if occupied_fraction <= 0:
+        return blocks.any(axis=(1, 3)).astype(np.uint8)
+    return (blocks.mean(axis=(1, 3)) > occupied_fraction).astype(np.uint8)
+
+
+def choose_start_cell(binary_map, start=None):
+    '''
+    :param binary_map: 01地图数组
+    :param start: (默认为None) 指定的起始单元格 (row, col)；None时取离地图中心最近的可通行单元格
+    :return: 起始单元格 (row, col)
+    '''
+    binary_map = np.asarray(binary_map)
+    if start is not None:
+        start = (int(start[0]), int(start[1]))
+        if binary_map[start] == 1:
+            raise ValueError("起始点{}位于障碍物上".format(start))
+        return start
+    free = np.argwhere(binary_map != 1)
+    if len(free) == 0:
+        raise ValueError("地图中没有可通行的单元格")
+    center = (np.array(binary_map.shape) - 1) / 2
+    row, col = free[np.argmin(((free - center) ** 2).sum(axis=1))]
+    return int(row), int(col)
+
+
+def ingest_occupancy_map(source, cell_size=1, robot_radius=0, start=None, output=None, band_rows=1024,
+                         occupied_fraction=0.0, maxval=None, **threshold_args):
+    '''
+    将占据栅格图像转换为可直接规划的地图 (0: 空白, 1: 障碍物, 2: 起始点)
+
+    图像按行条带逐段处理：每个条带额外读取上下robot_radius行用于膨胀，处理后只保留条带本身，
+    PGM (P5) 和npy以内存映射方式读取，给定output时结果也写入内存映射的npy文件，峰值内存只取决于条带大小
+
+    :param source: 图像路径 (.pgm/.png/.npy) 或灰度数组
+    :param cell_size: (默认为1) 规划单元格边长（像素），即降采样倍数
+    :param robot_radius: (默认为0) 机器人半径（像素），障碍物按此半径膨胀
+    :param start: (默认为None) 起始位置（像素坐标 (row, col)，例如机器人位姿）；None时取离地图中心最近的可通行单元格
+    :param output: (默认为None) 输出npy文件路径，None时返回内存中的数组
+    :param band_rows: (默认为1024) 每个条带的像素行数（向下取整到cell_size的倍数）
+    :param occupied_fraction: (默认为0.0) 见block_reduce
+    :param maxval: (默认为None) 表示完全空闲的灰度值，None时从路径读取的图像取文件给出的值（如PGM头部的maxval），见image_to_binary
+    :param threshold_args: 传给image_to_binary的阈值参数
+    :return: 地图数组 (uint8)，给定output时为内存映射数组
+    '''
+    if isinstance(source, str):
+        image, file_maxval = read_occupancy_image(source)
+        if maxval is None:
+            maxval = file_maxval
+    else:
+        image = source
+    rows, cols = image.shape
+    cell_size = int(cell_size)
+    robot_radius = int(robot_radius)
+    band_rows = max(band_rows // cell_size, 1) * cell_size
+    out_shape = (-(-rows // cell_size), -(-cols // cell_size))
+
+    if output is None:
+        result = np.empty(out_shape, dtype=np.uint8)
+    else:
+        result = np.lib.format.open_memmap(output, mode='w+', dtype=np.uint8, shape=out_shape)
+
+    for r0 in range(0, rows, band_rows):
+        r1 = min(r0 + band_rows, rows)
+        # 上下各多读robot_radius行，使条带边缘的膨胀结果与整图处理一致
+        h0, h1 = max(r0 - robot_radius, 0), min(r1 + robot_radius, rows)
+        binary = inflate_obstacles(image_to_binary(np.asarray(image[h0:h1]), maxval=maxval, **threshold_args),
+                                   robot_radius)
+        band = block_reduce(binary[r0 - h0:r1 - h0], cell_size, occupied_fraction)
+        result[r0 // cell_size:r0 // cell_size + len(band)] = band
+
+    if start is not None:
+        start = (int(start[0]) // cell_size, int(start[1]) // cell_size)
+    start = choose_start_cell(result, start)
+    result[start] = 2
+    if output is not None:
+        result.flush()
+    return result
@@ -2,6 +2,7 @@ import numpy as np
 import random
 import copy
 import os
+import hashlib
 
 def gen_base_map(rows=16, cols=19, obstacle_size=2):
     '''
@@ -13,49 +14,181 @@ def gen_base_map(rows=16, cols=19, obstacle_size=2):
     :return: grid: 生成的map数组
     '''
     # 创建一个二维数组，初始值为0
-    grid = np.zeros((rows, cols), dtype=int)
+    grid = np.zeros((rows, cols), dtype=np.uint8)
 
-    # 在边界周围的一圈设置为0
-    grid[0, :] = grid[-1, :] = grid[:, 0] = grid[:, -1] = 0
-
-    # 随机放置大障碍物，确保周围一圈都是0
-    for i in range(1, rows - 1, obstacle_size + 1):
-        for j in range(1, cols - 1, obstacle_size + 1):
-            if grid[i, j] == 0:
-                for x in range(obstacle_size):
-                    for y in range(obstacle_size):
-                        if i + x < rows and j + y < cols:
-                            grid[i + x, j + y] = 1
+    # 在边界周围的一圈设置为0，从(1, 1)开始每隔obstacle_size + 1放置一个obstacle_size大小的障碍物，
+    # 障碍物之间留一格通道；按行、列分别计算是否落在障碍物内，再取外积
+    grid[_block_axis(rows, obstacle_size)[:, None] & _block_axis(cols, obstacle_size)[None, :]] = 1
 
     return grid
 
 
-def random_obstacle_map(rows=10, cols=12):
+def _block_axis(n, obstacle_size):
+    # 一个方向上落在障碍物内的下标：障碍物起点为1, 1 + (obstacle_size + 1), ...，且起点不在最后一格
+    idx = np.arange(n)
+    offset = (idx - 1) % (obstacle_size + 1)
+    return (idx >= 1) & (offset < obstacle_size) & (idx - offset < n - 1)
+
+
+def random_obstacle_map(rows=10, cols=12, rng=None):
     '''
     生成随机障碍地图
 
     :param rows: 行数 (空格为0)
     :param cols: 列数 (空格为0)
+    :param rng: (默认为None) np.random.Generator或随机种子；为None时使用全局random模块，与以前的结果一致
     :return: grid: 生成的map数组
     '''
     # 创建一个二维数组，初始值为0
-    grid = np.zeros((rows, cols), dtype=int)
+    grid = np.zeros((rows, cols), dtype=np.uint8)
+
+    # 每隔一格放置一个1x2的障碍，边界周围的一圈保持为0
+    r = np.arange(2, rows - 2, 2)
+    c = np.arange(2, cols - 2, 2)
+    if len(r) == 0 or len(c) == 0:
+        return grid
+    if rng is None:
+        horizontal = np.array([random.choice([True, False]) for _ in range(len(r) * len(c))]).reshape(len(r), len(c))
+    else:
+        horizontal = make_rng(rng).random((len(r), len(c))) < 0.5
+
+    # 横向障碍占据 (i, j+1)，纵向障碍占据 (i+1, j)
+    grid[np.ix_(r, c)] = 1
+    grid[r[:, None], c[None, :] + 1] |= horizontal.astype(np.uint8)
+    grid[r[:, None] + 1, c[None, :]] |= (~horizontal).astype(np.uint8)
+
+    return grid
+
+
+def make_rng(seed=None):
+    '''
+    :param seed: 随机种子（整数或整数序列）、np.random.Generator或None
+    :return: np.random.Generator；传入Generator时原样返回
+    '''
+    if isinstance(seed, np.random.Generator):
+        return seed
+    return np.random.default_rng(seed)
+
+
+def random_block_map(rows, cols, density=0.2, block_size=(1, 4), corridor_width=1, seed=None):
+    '''
+    向量化生成大尺寸的随机矩形障碍地图，所有空白单元格相互连通
 
-    # 在边界周围的一圈设置为0
-    grid[0, :] = grid[-1, :] = grid[:, 0] = grid[:, -1] = 0
+    地图按 (block_size最大值 + corridor_width) 划分为格子，每个格子以一定概率在左上角(留出通道后)放置一个随机大小的矩形障碍，
+    障碍之间以及障碍与地图边界之间至少留有corridor_width宽的通道
 
-    for i in range(2, rows - 2, 2):
-        for j in range(2, cols - 2, 2):
-            if grid[i, j] == 0:
-                if random.choice([True, False]):
-                    # 横向障碍
-                    grid[i, j] = grid[i, j + 1] = 1
-                else:
-                    # 纵向障碍
-                    grid[i, j] = grid[i + 1, j] = 1
+    :param rows: 行数
+    :param cols: 列数
+    :param density: (默认为0.2) 目标障碍物占比，受格子数量限制，可达到的最大值约为 (最大块/格子边长)^2
+    :param block_size: (默认为(1, 4)) 障碍边长范围 (最小, 最大)，整数表示固定边长
+    :param corridor_width: (默认为1) 通道宽度
+    :param seed: (默认为None) 随机种子或np.random.Generator
+    :return: grid: 生成的map数组 (uint8)
+    '''
+    rng = make_rng(seed)
+    if np.isscalar(block_size):
+        block_size = (block_size, block_size)
+    min_block, max_block = int(block_size[0]), int(block_size[1])
+    if min_block < 1 or max_block < min_block or corridor_width < 1:
+        raise ValueError("障碍尺寸或通道宽度无效")
+
+    pitch = max_block + corridor_width
+    cell_rows = -(-rows // pitch)
+    cell_cols = -(-cols // pitch)
+
+    # 每个格子的障碍高、宽，按平均面积换算放置概率
+    heights = rng.integers(min_block, max_block + 1, size=(cell_rows, cell_cols))
+    widths = rng.integers(min_block, max_block + 1, size=(cell_rows, cell_cols))
+    mean_area = (min_block + max_block) ** 2 / 4
+    occupied = rng.random((cell_rows, cell_cols)) < min(1.0, density * pitch * pitch / mean_area)
 
+    # 以 (格子行, 格内行偏移, 格子列, 格内列偏移) 的四维广播生成障碍，格子前corridor_width行/列为通道
+    offset = np.arange(pitch) - corridor_width
+    inside_r = (offset[None, :, None] >= 0) & (offset[None, :, None] < heights[:, None, :])
+    inside_c = (offset[None, None, :] >= 0) & (offset[None, None, :] < widths[:, :, None])
+    blocks = (occupied[:, None, :, None] & inside_r[:, :, :, None] & inside_c[:, None, :, :])
+    grid = blocks.reshape(cell_rows * pitch, cell_cols * pitch)[:rows, :cols].astype(np.uint8)
+
+    # 最后一行/列格子可能被地图边界截断，保证右侧和下侧同样留有通道
+    grid[max(rows - corridor_width, 0):, :] = 0
+    grid[:, max(cols - corridor_width, 0):] = 0
     return grid
 
+
+def place_start_point(input_map, seed=None):
+    '''
+    在地图边界上随机选择一个空白单元格作为起始点 (置为2)
+
+    :param input_map: 输入的地图
+    :param seed: (默认为None) 随机种子或np.random.Generator
+    :return: new_map: 含起始点的新地图 (uint8)
+    '''
+    new_map = np.array(input_map, dtype=np.uint8)
+    border = np.zeros(new_map.shape, dtype=bool)
+    border[0, :] = border[-1, :] = border[:, 0] = border[:, -1] = True
+    candidates = np.argwhere(border & (new_map == 0))
+    if len(candidates) == 0:
+        raise ValueError("地图边界上没有空白单元格")
+    row, col = candidates[make_rng(seed).integers(len(candidates))]
+    new_map[row, col] = 2
+    return new_map
+
+
+def scenario_corpus(sizes=((32, 32), (64, 64), (128, 128)), densities=(0.1, 0.2, 0.3),
+                    block_sizes=((1, 2), (2, 4)), corridor_widths=(1,), repeats=1, seed=0, generator="block") -> list:
+    '''
+    生成确定性的基准场景列表，相同参数总是得到相同的场景和地图
+
+    :param sizes: 地图尺寸列表 ((rows, cols), ...)
+    :param densities: 障碍物占比列表
+    :param block_sizes: 障碍边长范围列表
+    :param corridor_widths: 通道宽度列表
+    :param repeats: (默认为1) 每组参数生成的地图数量
+    :param seed: (默认为0) 基础随机种子
+    :param generator: (默认为"block") 地图生成器："block"为random_block_map（没有死胡同），
+                      "obstacle"为random_obstacle_map（有死胡同，忽略障碍物占比、障碍边长和通道宽度）
+    :return: 场景列表，每个场景为 {"name", "rows", "cols", "density", "block_size", "corridor_width", "seed", "generator"}，
+             用gen_scenario_map生成对应的地图
+    '''
+    scenarios = []
+    for rows, cols in sizes:
+        for density in densities:
+            for block_size in block_sizes:
+                for corridor_width in corridor_widths:
+                    for k in range(repeats):
+                        block_size = (block_size, block_size) if np.isscalar(block_size) else tuple(block_size)
+                        name = "s{}x{}_d{:g}_b{}-{}_c{}_{}".format(
+                            rows, cols, density, block_size[0], block_size[1], corridor_width, k)
+                        scenarios.append({
+                            "name": name if generator == "block" else "{}_{}".format(name, generator),
+                            "rows": rows,
+                            "cols": cols,
+                            "density": density,
+                            "block_size": list(block_size),
+                            "corridor_width": corridor_width,
+                            # 每个场景有独立的种子，单独生成某个场景时结果不受其他场景影响
+                            "seed": [seed, len(scenarios)],
+                            "generator": generator
+                        })
+    return scenarios
+
+
+def gen_scenario_map(scenario):
+    '''
+    由scenario_corpus的场景生成地图（含边界上的起始点）
+
+    :param scenario: 场景字典
+    :return: 地图数组 (uint8)
+    '''
+    rng = make_rng(scenario["seed"])
+    if scenario.get("generator", "block") == "obstacle":
+        grid = random_obstacle_map(scenario["rows"], scenario["cols"], rng)
+    else:
+        grid = random_block_map(scenario["rows"], scenario["cols"], scenario["density"], tuple(scenario["block_size"]),
+                                scenario["corridor_width"], rng)
+    return place_start_point(grid, rng)
+
+
 def randomStartPoint(input_map: list, startpoint=1):
     '''
     随机生成起始点 (置为2) 加入到地图中(随机四周放点，四周所有的[0][0]和首行[0]与尾行[-1])
@@ -89,12 +222,13 @@ def randomStartPoint(input_map: list, startpoint=1):
     return input_map
 
 
-def map2np(maps: list, map_name_list: list):
+def map2np(maps: list, map_name_list: list, packed=False):
     '''
     将数组地图转换成持久储存使用的npy地图
 
     :param maps: 地图数据列表 (嵌套数组)
     :param map_name_list: 地图名字列表 (也是保存的文件名maps/map_name.npy)
+    :param packed: (默认为False) 是否以位压缩格式保存为maps/map_name.npz（见pack_map）
     :return: None
     '''
     # 检查目标文件夹是否存在，如果不存在则创建
@@ -103,18 +237,83 @@ def map2np(maps: list, map_name_list: list):
 
     for i in range(0, len(maps)):
         print("地图名称：" + map_name_list[i])
-        m = np.array(maps[i])
-        with open("maps/{}.npy".format(map_name_list[i]), 'wb') as f:
-            np.save(f, m)
-
-        m = None
-        with open("maps/{}.npy".format(map_name_list[i]), 'rb') as f:
-            m = np.load(f)
+        m = np.asarray(maps[i], dtype=np.uint8)
+        if packed:
+            save_packed_map("maps/{}.npz".format(map_name_list[i]), m)
+        else:
+            with open("maps/{}.npy".format(map_name_list[i]), 'wb') as f:
+                np.save(f, m)
         print(m)
 
     print("所有地图数据转换完毕")
 
 
+def map_hash(input_map):
+    '''
+    计算地图内容哈希（与存储数据类型无关，形状不同的地图哈希不同）
+
+    :param input_map: 输入的地图
+    :return: 十六进制的sha1哈希字符串
+    '''
+    input_map = np.ascontiguousarray(input_map, dtype=np.uint8)
+    h = hashlib.sha1()
+    h.update(np.array(input_map.shape, dtype=np.int64).tobytes())
+    h.update(input_map.tobytes())
+    return h.hexdigest()
+
+
+def pack_map(input_map):
+    '''
+    将地图压缩为位存储格式：障碍物每个单元格占1位，起始点单独记录坐标
+
+    :param input_map: 输入的地图 (0: 空白, 1: 障碍物, 2: 起始点)
+    :return: packed: {"shape": 地图形状, "bits": np.packbits后的障碍物位图, "starts": (起始点数, 2)的起始点坐标数组}
+    '''
+    input_map = np.asarray(input_map)
+    return {
+        "shape": np.array(input_map.shape, dtype=np.int64),
+        "bits": np.packbits(input_map == 1, axis=None),
+        "starts": np.argwhere(input_map == 2).astype(np.int64)
+    }
+
+
+def unpack_map(packed):
+    '''
+    将位存储格式还原为uint8地图
+
+    :param packed: pack_map的输出（或load_packed_map读取的npz文件）
+    :return: 地图数组 (uint8)
+    '''
+    shape = tuple(int(n) for n in packed["shape"])
+    count = shape[0] * shape[1]
+    input_map = np.unpackbits(packed["bits"], count=count).reshape(shape)
+    starts = np.asarray(packed["starts"]).reshape(-1, 2)
+    input_map[starts[:, 0], starts[:, 1]] = 2
+    return input_map
+
+
+def save_packed_map(path, input_map):
+    '''
+    以位压缩格式保存地图 (npz)
+
+    :param path: 保存路径
+    :param input_map: 输入的地图
+    :return: None
+    '''
+    np.savez(path, **pack_map(input_map))
+
+
+def load_packed_map(path):
+    '''
+    读取位压缩格式的地图
+
+    :param path: npz文件路径
+    :return: 地图数组 (uint8)
+    '''
+    with np.load(path) as packed:
+        return unpack_map(packed)
+
+
 def basic_region_partition(input_map: list, num_regions: int):
     '''
     初阶区域划分算法，将地图均匀划分为指定数量的子区域
@@ -135,7 +334,8 @@ def basic_region_partition(input_map: list, num_regions: int):
         regions.append({
             'map': input_map,
             'bounds': (0, 0, rows-1, cols-1),  # (start_row, start_col, end_row, end_col)
-            'area': rows * cols
+            'area': rows * cols,
+            'mask': np.asarray(input_map) != 1
         })
         return regions
     
@@ -243,6 +443,9 @@ def basic_region_partition(input_map: list, num_regions: int):
                 sub_map[sub_r][sub_c] = 2
             else:
                 sub_map[sub_r][sub_c] = 2
+
+        # 按行/列划分的子区域内所有可通行单元格都属于该区域
+        region['mask'] = np.asarray(sub_map) != 1
     
     return regions
 
@@ -321,7 +524,8 @@ def advanced_region_partition(input_map: list, num_regions: int):
             'bounds': (min_row, min_col, max_row, max_col),
             'area': area,
             'estimated_steps': agent_region['estimated_steps'],
-            'cells': agent_region['cells']
+            'cells': agent_region['cells'],
+            'mask': cells_to_mask(agent_region['cells'], (min_row, min_col, max_row, max_col))
         })
     
     # 确保至少返回一个区域
@@ -332,7 +536,8 @@ def advanced_region_partition(input_map: list, num_regions: int):
             'bounds': (0, 0, rows-1, cols-1),
             'area': np.sum(input_map == 0),
             'estimated_steps': estimate_coverage_steps([(i, j) for i in range(rows) for j in range(cols) if input_map[i][j] == 0]),
-            'cells': [(i, j) for i in range(rows) for j in range(cols) if input_map[i][j] == 0]
+            'cells': [(i, j) for i in range(rows) for j in range(cols) if input_map[i][j] == 0],
+            'mask': input_map != 1
         })
     
     return final_regions
@@ -443,33 +648,169 @@ def identify_connected_regions(map_array):
     
     return connected_regions
 
+# 期望覆盖步数模型的系数，对应特征 [目标单元格数, 边界边数, 死胡同数, 1]
+# 由getPath.calibrate_step_model在默认场景（无死胡同的block场景和有死胡同的obstacle场景）上以最小二乘拟合
+STEP_MODEL = (1.0074, 0.2868, 3.5914, -40.24)
+
+
+def _coverage_target(input_map, allowed_mask=None):
+    # 返回 (可通行掩码, 需要覆盖的掩码, 起始点坐标或None)，起始点总是计入需要覆盖的单元格
+    input_map = np.asarray(input_map)
+    free = input_map != 1
+    target = free if allowed_mask is None else (free & np.asarray(allowed_mask, dtype=bool))
+    starts = np.argwhere(input_map == 2)
+    start = tuple(int(v) for v in starts[0]) if len(starts) else None
+    if start is not None:
+        target = target.copy()
+        target[start] = True
+    return free, target, start
+
+
+def _longest_run(mask):
+    # 各行中连续True的最大长度
+    padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded.ravel())
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return int((ends - starts).max()) if len(starts) else 0
+
+
+def coverage_features(input_map, allowed_mask=None) -> dict:
+    '''
+    向量化计算地图或区域的覆盖特征
+
+    :param input_map: 地图数组 (0: 空白, 1: 障碍物, 2: 起始点)
+    :param allowed_mask: (默认为None) 需要覆盖的单元格掩码，None时为全部可通行单元格
+    :return: {"cells": 需要覆盖的单元格数（含起始点）, "boundary_edges": 需要覆盖的单元格与障碍物/地图边界相邻的边数,
+              "dead_ends": 需要覆盖且只有一个可通行邻居的单元格数（不含起始点）, "parity": 起始点同色/异色的单元格数,
+              "longest_run": 行或列中连续可通行单元格的最大长度, "spans_2d": 是否跨越多行且多列, "start": 起始点}
+    '''
+    free, target, start = _coverage_target(input_map, allowed_mask)
+    rows, cols = free.shape
+
+    # 每个单元格的可通行邻居数
+    padded = np.zeros((rows + 2, cols + 2), dtype=np.int8)
+    padded[1:-1, 1:-1] = free
+    degree = padded[:-2, 1:-1] + padded[2:, 1:-1] + padded[1:-1, :-2] + padded[1:-1, 2:]
+
+    dead_end = target & (degree == 1)
+    if start is not None:
+        dead_end[start] = False
+
+    # 棋盘着色：每走一步颜色交替
+    color = (np.add.outer(np.arange(rows), np.arange(cols)) & 1).astype(bool)
+    if start is not None and color[start]:
+        color = ~color
+    same = int(np.count_nonzero(target & ~color))
+    other = int(np.count_nonzero(target & color))
+
+    target_rows = np.flatnonzero(target.any(axis=1))
+    target_cols = np.flatnonzero(target.any(axis=0))
+    return {
+        "cells": same + other,
+        "boundary_edges": int((4 - degree)[target].sum()),
+        "dead_ends": int(np.count_nonzero(dead_end)),
+        "parity": (same, other),
+        "longest_run": max(_longest_run(free), _longest_run(free.T)),
+        "spans_2d": len(target_rows) > 1 and len(target_cols) > 1,
+        "start": start
+    }
+
+
+def coverage_lower_bound(input_map, allowed_mask=None, features=None) -> dict:
+    '''
+    覆盖路径步数、转向次数和动作成本的可采纳下界（任何覆盖全部目标单元格的4连通路径都不会低于该值）
+
+    - 步数：每个目标单元格至少访问一次；棋盘着色下每步颜色交替，两种颜色的单元格数决定最少步数；
+      除起始点和终点外，每个死胡同都要原路返回，其唯一的邻居至少重复访问一次
+    - 转向：除终点外每个死胡同需要掉头一次；路径的每一段直线最多覆盖最长连续可通行长度的单元格
+
+    :param input_map: 地图数组 (0: 空白, 1: 障碍物, 2: 起始点)
+    :param allowed_mask: (默认为None) 需要覆盖的单元格掩码
+    :param features: (默认为None) 已计算的coverage_features结果
+    :return: {"steps": 步数下界, "turns": 转向次数下界, "cost": 动作成本下界（CoveragePlanner的动作成本）}
+    '''
+    if features is None:
+        features = coverage_features(input_map, allowed_mask)
+    cells = features["cells"]
+    if cells == 0:
+        return {"steps": 0, "turns": 0, "cost": 0.0}
+
+    same, other = features["parity"]
+    if features["start"] is not None:
+        # 第0、2、4...步与起始点同色
+        parity_bound = max(2 * same - 2, 2 * other - 1)
+        # 终点可以是一个死胡同
+        backtracks = max(features["dead_ends"] - 1, 0)
+    else:
+        parity_bound = 2 * max(same, other) - 2
+        backtracks = max(features["dead_ends"] - 2, 0)
+
+    steps = max(cells - 1, parity_bound, cells - 1 + backtracks)
+    turns = max(backtracks, int(features["spans_2d"]),
+                -(-cells // max(features["longest_run"], 1)) - 1)
+    # 前进0.1，转向至少0.2，掉头0.4
+    return {"steps": steps, "turns": turns, "cost": 0.1 * steps + 0.1 * turns + 0.2 * backtracks}
+
+
+def expected_coverage_steps(input_map, allowed_mask=None, model=STEP_MODEL, features=None):
+    '''
+    用STEP_MODEL估计CoveragePlanner的覆盖步数，结果不低于coverage_lower_bound的步数下界
+
+    :param input_map: 地图数组 (0: 空白, 1: 障碍物, 2: 起始点)
+    :param allowed_mask: (默认为None) 需要覆盖的单元格掩码
+    :param model: (默认为STEP_MODEL) 模型系数
+    :param features: (默认为None) 已计算的coverage_features结果
+    :return: 期望步数 (int)
+    '''
+    if features is None:
+        features = coverage_features(input_map, allowed_mask)
+    if features["cells"] == 0:
+        return 0
+    x = step_model_inputs(features)
+    bound = coverage_lower_bound(input_map, allowed_mask, features)["steps"]
+    return max(int(round(float(np.dot(model, x)))), bound)
+
+
+def step_model_inputs(features):
+    '''
+    :param features: coverage_features的结果
+    :return: 步数模型的特征向量 [目标单元格数, 边界边数, 死胡同数, 1]
+    '''
+    return np.array([features["cells"], features["boundary_edges"], features["dead_ends"], 1.0])
+
+
+def fit_step_model(features_list, steps):
+    '''
+    以最小二乘拟合步数模型
+
+    :param features_list: coverage_features结果的列表
+    :param steps: 对应的实际覆盖步数列表
+    :return: 模型系数元组，可直接传给expected_coverage_steps
+    '''
+    x = np.array([step_model_inputs(f) for f in features_list])
+    coef, _, _, _ = np.linalg.lstsq(x, np.asarray(steps, dtype=np.float64), rcond=None)
+    return tuple(float(round(c, 4)) for c in coef)
+
+
 def estimate_coverage_steps(cells):
     '''
     估计覆盖区域所需的步数
 
     :param cells: 区域中的细胞列表
-    :return: 估计的步数
+    :return: 估计的步数（见expected_coverage_steps）
     '''
-    # 基于区域大小和形状估计步数
-    # 简单估计：区域面积的平方根乘以一个系数
-    area = len(cells)
-    if area == 0:
+    if len(cells) == 0:
         return 0
-    
-    # 计算区域的宽度和高度
-    min_row = min(cell[0] for cell in cells)
-    max_row = max(cell[0] for cell in cells)
-    min_col = min(cell[1] for cell in cells)
-    max_col = max(cell[1] for cell in cells)
-    
-    width = max_col - min_col + 1
-    height = max_row - min_row + 1
-    
-    # 估计步数：考虑区域的周长和面积
-    perimeter = 2 * (width + height)
-    estimated_steps = int(area * 1.2 + perimeter * 0.5)
-    
-    return estimated_steps
+
+    # 在区域的外接矩形中只把区域内的细胞视为可通行
+    cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+    origin = cells.min(axis=0)
+    local = cells - origin
+    region_map = np.ones(local.max(axis=0) + 1, dtype=np.uint8)
+    region_map[local[:, 0], local[:, 1]] = 0
+    return expected_coverage_steps(region_map)
 
 def assign_regions(connected_regions, num_regions):
     '''
@@ -532,6 +873,43 @@ def find_start_point(cells):
     return cells[0]
 
 
+def cells_to_mask(cells, region_bounds):
+    '''
+    将区域的细胞列表转换为子地图坐标系下的bool掩码
+
+    :param cells: 区域中的细胞列表 (总图坐标)
+    :param region_bounds: 区域边界 (start_row, start_col, end_row, end_col)
+    :return: 掩码数组，形状与子地图一致，属于该区域的细胞为True
+    '''
+    start_row, start_col, end_row, end_col = region_bounds
+    mask = np.zeros((end_row - start_row + 1, end_col - start_col + 1), dtype=bool)
+    if len(cells) > 0:
+        cells = np.asarray(cells)
+        mask[cells[:, 0] - start_row, cells[:, 1] - start_col] = True
+    return mask
+
+
+def region_mask(region, map_shape=None):
+    '''
+    返回区域的允许覆盖掩码，可传给CoveragePlanner的allowed_mask参数
+
+    :param region: 区域划分结果中的一个区域
+    :param map_shape: 总图形状，默认为None（返回子地图坐标系下的掩码）；给定时返回总图坐标系下的掩码
+    :return: bool掩码数组
+    '''
+    if 'mask' in region:
+        mask = region['mask']
+    else:
+        mask = np.asarray(region['map']) != 1
+    if map_shape is None:
+        return mask
+
+    start_row, start_col, end_row, end_col = region['bounds']
+    global_mask = np.zeros(map_shape, dtype=bool)
+    global_mask[start_row:end_row+1, start_col:end_col+1] = mask
+    return global_mask
+
+
 def map_to_binary(map_array):
     '''
     将普通地图转换为01地图
@@ -545,7 +923,7 @@ def map_to_binary(map_array):
         map_array = np.array(map_array)
     
     # 创建01地图
-    binary_map = np.zeros_like(map_array, dtype=int)
+    binary_map = np.zeros(map_array.shape, dtype=np.uint8)
     binary_map[map_array == 1] = 1  # 障碍物为1
     
     return binary_map
@@ -566,7 +944,7 @@ def binary_to_map(binary_map, start_positions=None):
         binary_map = np.array(binary_map)
     
     # 创建普通地图
-    map_array = np.zeros_like(binary_map, dtype=int)
+    map_array = np.zeros(binary_map.shape, dtype=np.uint8)
     map_array[binary_map == 1] = 1  # 障碍物为1
     
     # 添加起始点
@@ -606,14 +984,78 @@ def global_to_submap_coords(global_coords, region_bounds):
     return (submap_row, submap_col)
 
 
-def visualize_multi_agent_path(original_map, regions, paths, title="多机覆盖路径"):
+def bounds_offset(region_bounds):
+    '''
+    计算区域左上角在总图中的偏移，支持嵌套区域
+
+    :param region_bounds: 区域边界 (start_row, start_col, end_row, end_col)，
+                          或由外到内的嵌套区域边界列表，内层边界是外层子地图中的坐标
+    :return: 偏移 (row, col) 的int64数组
+    '''
+    bounds = np.asarray(region_bounds, dtype=np.int64).reshape(-1, 4)
+    return bounds[:, :2].sum(axis=0)
+
+
+def compose_bounds(*region_bounds):
+    '''
+    将由外到内的嵌套区域边界合成为总图中的区域边界
+
+    :param region_bounds: 外层区域边界, 内层区域边界, ...
+    :return: 总图中的区域边界 (start_row, start_col, end_row, end_col)
     '''
-    在总图上可视化多机协同覆盖路径
+    offset = bounds_offset(region_bounds[:-1]) if len(region_bounds) > 1 else np.zeros(2, dtype=np.int64)
+    start_row, start_col, end_row, end_col = region_bounds[-1]
+    return (int(offset[0] + start_row), int(offset[1] + start_col), int(offset[0] + end_row), int(offset[1] + end_col))
+
+
+def submap_to_global_array(points, region_bounds):
+    '''
+    将整条子地图路径一次性转换为总图坐标
+
+    :param points: 子地图中的坐标 [[row, col], ...] 或 (n, 2) 数组
+    :param region_bounds: 区域边界，或由外到内的嵌套区域边界列表
+    :return: 总图坐标的 (n, 2) int64数组
+    '''
+    return np.asarray(points, dtype=np.int64).reshape(-1, 2) + bounds_offset(region_bounds)
+
+
+def global_to_submap_array(points, region_bounds):
+    '''
+    将整条总图路径一次性转换为子地图坐标
+
+    :param points: 总图中的坐标 [[row, col], ...] 或 (n, 2) 数组
+    :param region_bounds: 区域边界，或由外到内的嵌套区域边界列表
+    :return: 子地图坐标的 (n, 2) int64数组
+    '''
+    return np.asarray(points, dtype=np.int64).reshape(-1, 2) - bounds_offset(region_bounds)
+
+
+def submaps_to_global(paths, bounds_list):
+    '''
+    将多个区域的路径拼接后一次性转换为总图坐标
+
+    :param paths: 各区域子地图坐标的路径列表
+    :param bounds_list: 与paths一一对应的区域边界（或嵌套区域边界列表）
+    :return: 与paths一一对应的总图坐标 (n_i, 2) int64数组列表
+    '''
+    arrays = [np.asarray(p, dtype=np.int64).reshape(-1, 2) for p in paths]
+    if len(arrays) == 0:
+        return []
+    lengths = [len(a) for a in arrays]
+    offsets = np.stack([bounds_offset(b) for b in bounds_list])
+    stitched = np.concatenate(arrays) + np.repeat(offsets, lengths, axis=0)
+    return np.split(stitched, np.cumsum(lengths)[:-1])
+
+
+def visualize_multi_agent_path(original_map, regions, paths, title="多机覆盖路径", show=True):
+    '''
+    在总图上可视化多机协同覆盖路径（无界面批量渲染见renderTools.render_multi_agent_path）
 
     :param original_map: 原始地图
     :param regions: 划分后的区域列表
     :param paths: 各区域的路径列表
     :param title: 标题
+    :param show: (默认为True) 是否调用plt.show()显示图片，False时只保存图片
     '''
     import matplotlib.pyplot as plt
     
@@ -641,19 +1083,12 @@ def visualize_multi_agent_path(original_map, regions, paths, title="多机覆盖
     for i, (region, path) in enumerate(zip(regions, paths)):
         color = colors[i % len(colors)]
         
-        # 提取路径点
-        path_points = []
-        for point in path:
-            if isinstance(point, list) and len(point) >= 2:
-                # 转换为总图坐标
-                global_point = submap_to_global_coords((point[0], point[1]), region['bounds'])
-                path_points.append(global_point)
+        # 整条路径一次转换为总图坐标
+        path_points = submap_to_global_array(path, region['bounds'])
         
         # 绘制路径
-        if path_points:
-            x = [p[1] for p in path_points]
-            y = [p[0] for p in path_points]
-            plt.plot(x, y, color=color, marker='o', markersize=3, linewidth=1, label=f'智能体 {i+1}')
+        if len(path_points) > 0:
+            plt.plot(path_points[:, 1], path_points[:, 0], color=color, marker='o', markersize=3, linewidth=1, label=f'智能体 {i+1}')
     
     # 绘制地图
     plt.imshow(visual_map, cmap='Greys', alpha=0.5)
@@ -669,4 +1104,7 @@ def visualize_multi_agent_path(original_map, regions, paths, title="多机覆盖
     if not os.path.exists("output_images"):
         os.makedirs("output_images")
     plt.savefig(f"output_images/{title}.png")
-    plt.show()
\ No newline at end of file
+    if show:
+        plt.show()
+    else:
+        plt.close()
\ No newline at end of file
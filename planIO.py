@@ -0,0 +1,257 @@
+import numpy as np
+import json
+import os
+import struct
+
+from PathPlanningCore import PlannerStatus
+from mapTools import map_hash, submap_to_global_array
+
+# 规划结果的二进制存储格式（版本1）：
+# [魔数 8字节][头部偏移 uint64][轨迹结构化数组][标注结构化数组][JSON头部]
+# 数据区按16字节对齐，可以用np.memmap零拷贝读取；头部写在文件末尾，因此轨迹可以边规划边流式写入
+PLAN_MAGIC = b"CPLAN1\0\0"
+PLAN_VERSION = 1
+HEADER_SIZE = len(PLAN_MAGIC) + 8
+ALIGNMENT = 16
+
+# 轨迹：[值, x, y, 方向, 执行的动作, 下一个动作, 当前状态_]，动作为None时存为-1，状态存为PlannerStatus.value
+TRAJECTORY_DTYPE = np.dtype([('value', '<f8'), ('x', '<i4'), ('y', '<i4'), ('orientation', 'i1'),
+                             ('action_in', 'i1'), ('action_next', 'i1'), ('status', 'u1')])
+# 标注：[x, y, 算法标记]
+ANNOTATION_DTYPE = np.dtype([('x', '<i4'), ('y', '<i4'), ('label', 'S4')])
+
+# 由轨迹和头部可以还原的字段，不写入头部
+_DERIVED_KEYS = ("Path_point_list", "policy_map", "start_pos", "end_pos", "global_path_point_list")
+
+
+def trajectory_to_array(trajectory):
+    '''
+    将规划器的完整轨迹转换为结构化数组
+
+    :param trajectory: [[值, x, y, 方向, 执行的动作, 下一个动作, 当前状态_], ...]
+    :return: TRAJECTORY_DTYPE结构化数组
+    '''
+    return np.array([(t[0], t[1], t[2], t[3],
+                      -1 if t[4] is None else t[4],
+                      -1 if t[5] is None else t[5],
+                      t[6].value) for t in trajectory], dtype=TRAJECTORY_DTYPE)
+
+
+def array_to_trajectory(array):
+    '''
+    将结构化数组还原为规划器的完整轨迹列表
+
+    :param array: TRAJECTORY_DTYPE结构化数组
+    :return: [[值, x, y, 方向, 执行的动作, 下一个动作, 当前状态_], ...]
+    '''
+    statuses = {s.value: s for s in PlannerStatus}
+    return [[v, x, y, o, None if a_in < 0 else a_in, None if a_next < 0 else a_next, statuses[s]]
+            for v, x, y, o, a_in, a_next, s in array.tolist()]
+
+
+def annotations_to_array(annotations):
+    return np.array([(a[0], a[1], a[2].encode("utf-8")) for a in annotations], dtype=ANNOTATION_DTYPE)
+
+
+def _align(f):
+    # 将写入位置填充到ALIGNMENT字节对齐
+    pad = (-f.tell()) % ALIGNMENT
+    f.write(b"\0" * pad)
+    return f.tell()
+
+
+class PlanWriter():
+    '''
+    流式写入规划结果：轨迹可以分批追加，最后写入标注和头部
+    数据先写入临时文件，close()写完头部后才重命名为目标路径，因此目标路径上不会出现未写完的文件
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.temp_path = path + ".part"
+        self.f = open(self.temp_path, 'wb')
+        self.f.write(PLAN_MAGIC)
+        self.f.write(struct.pack("<Q", 0))
+        self.trajectory_offset = _align(self.f)
+        self.trajectory_count = 0
+
+    def __enter__(self):
+        return self
+
+    # 正常退出时自动写入头部；出现异常时丢弃未写完的临时文件
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.f.closed:
+            return
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    # 放弃写入并删除临时文件
+    def abort(self):
+        if not self.f.closed:
+            self.f.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+    # 追加一批轨迹点（规划器格式的列表或TRAJECTORY_DTYPE数组）
+    def append(self, trajectory):
+        if not isinstance(trajectory, np.ndarray):
+            trajectory = trajectory_to_array(trajectory)
+        self.f.write(np.ascontiguousarray(trajectory, dtype=TRAJECTORY_DTYPE).tobytes())
+        self.trajectory_count += len(trajectory)
+
+    # 写入标注和头部并关闭文件
+    def close(self, metadata=None, annotations=None):
+        annotations = annotations_to_array(annotations if annotations is not None else [])
+        annotation_offset = _align(self.f)
+        self.f.write(annotations.tobytes())
+
+        header = dict(metadata or {})
+        header.update({
+            "version": PLAN_VERSION,
+            "trajectory_offset": self.trajectory_offset,
+            "trajectory_count": self.trajectory_count,
+            "annotation_offset": annotation_offset,
+            "annotation_count": len(annotations)
+        })
+        header_offset = self.f.tell()
+        self.f.write(json.dumps(header, ensure_ascii=False).encode("utf-8"))
+        self.f.seek(len(PLAN_MAGIC))
+        self.f.write(struct.pack("<Q", header_offset))
+        self.f.close()
+        os.replace(self.temp_path, self.path)
+
+
+def save_plan(path, best_trajectory, target_map=None, annotations=None):
+    '''
+    将plan_map / plan_coverage_path返回的路径字典保存为二进制规划文件
+
+    :param path: 保存路径
+    :param best_trajectory: 路径字典
+    :param target_map: (默认为None) 规划使用的地图，给定时在头部记录地图哈希
+    :param annotations: (默认为None) 轨迹标注列表 [[x, y, 算法标记], ...]
+    :return: None
+    '''
+    metadata = {k: v for k, v in best_trajectory.items() if k not in _DERIVED_KEYS}
+    metadata["has_global_path"] = "global_path_point_list" in best_trajectory
+    if "bounds" in metadata:
+        metadata["bounds"] = [int(b) for b in metadata["bounds"]]
+    if target_map is not None:
+        metadata["map_hash"] = map_hash(target_map)
+
+    with PlanWriter(path) as writer:
+        writer.append(best_trajectory["policy_map"])
+        writer.close(metadata, annotations)
+
+
+class PlanFile():
+    '''
+    二进制规划文件：头部为字典，轨迹和标注为结构化数组（默认内存映射，零拷贝）
+    '''
+
+    def __init__(self, path, mmap=True):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(PLAN_MAGIC)) != PLAN_MAGIC:
+                raise ValueError("不是有效的规划文件")
+            header_offset = struct.unpack("<Q", f.read(8))[0]
+            f.seek(header_offset)
+            self.header = json.loads(f.read().decode("utf-8"))
+            if self.header["version"] > PLAN_VERSION:
+                raise ValueError("不支持的规划文件版本：{}".format(self.header["version"]))
+
+            self.trajectory = self._read(f, mmap, TRAJECTORY_DTYPE,
+                                         self.header["trajectory_offset"], self.header["trajectory_count"])
+            self.annotations = self._read(f, mmap, ANNOTATION_DTYPE,
+                                          self.header["annotation_offset"], self.header["annotation_count"])
+
+    def _read(self, f, mmap, dtype, offset, count):
+        if count == 0:
+            return np.zeros(0, dtype=dtype)
+        if mmap:
+            return np.memmap(self.path, dtype=dtype, mode='r', offset=offset, shape=(count,))
+        f.seek(offset)
+        return np.fromfile(f, dtype=dtype, count=count)
+
+    # 返回轨迹的 (n, 2) 坐标数组
+    def xy(self):
+        return np.stack([self.trajectory['x'], self.trajectory['y']], axis=1)
+
+    # 还原为plan_map / plan_coverage_path返回的路径字典
+    def to_dict(self):
+        metadata = {k: v for k, v in self.header.items()
+                    if k not in ("version", "trajectory_offset", "trajectory_count", "annotation_offset",
+                                 "annotation_count", "map_hash", "has_global_path")}
+        policy_map = array_to_trajectory(self.trajectory)
+        path_points = [[t[1], t[2]] for t in policy_map]
+
+        res = {
+            "map_name": metadata.pop("map_name"),
+            "start_pos": path_points[0],
+            "end_pos": path_points[-1],
+            "start_orientation": metadata.pop("start_orientation"),
+            "start_orientation_code": metadata.pop("start_orientation_code"),
+            "coverage_path_Heuristic": metadata.pop("coverage_path_Heuristic"),
+            "Path_point_list": path_points,
+            "Cost": metadata.pop("Cost"),
+            "Steps": metadata.pop("Steps"),
+            "policy_map": policy_map
+        }
+        if "bounds" in metadata:
+            metadata["bounds"] = tuple(metadata["bounds"])
+        res.update(metadata)
+        if self.header.get("has_global_path"):
+            res["global_path_point_list"] = submap_to_global_array(self.xy(), res["bounds"]).tolist()
+        return res
+
+
+def load_plan(path, mmap=True):
+    '''
+    读取二进制规划文件
+
+    :param path: 文件路径
+    :param mmap: (默认为True) 是否用np.memmap零拷贝读取轨迹和标注
+    :return: PlanFile
+    '''
+    return PlanFile(path, mmap)
+
+
+def _json_default(o):
+    # numpy标量/数组和枚举的JSON序列化
+    if isinstance(o, np.integer):
+        return int(o)
+    if isinstance(o, np.floating):
+        return float(o)
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    if isinstance(o, PlannerStatus):
+        return o.name
+    raise TypeError("无法序列化的类型：{}".format(type(o).__name__))
+
+
+def result_to_json(best_trajectory, **kwargs):
+    '''
+    将路径字典序列化为JSON字符串（PlannerStatus记为名称，numpy标量转为Python数值）
+
+    :param best_trajectory: plan_map / plan_coverage_path返回的路径字典（或compress_result的输出）
+    :param kwargs: 传给json.dumps的其他参数
+    :return: JSON字符串
+    '''
+    return json.dumps(best_trajectory, default=_json_default, ensure_ascii=False, **kwargs)
+
+
+def result_from_json(text):
+    '''
+    由result_to_json的输出还原路径字典
+
+    :param text: JSON字符串，或已经json.loads的字典
+    :return: 路径字典，policy_map中的状态还原为PlannerStatus
+    '''
+    res = json.loads(text) if isinstance(text, (str, bytes)) else text
+    if "policy_map" in res:
+        for t in res["policy_map"]:
+            t[6] = PlannerStatus[t[6]]
+    if "bounds" in res:
+        res["bounds"] = tuple(res["bounds"])
+    return res
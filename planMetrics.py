@@ -0,0 +1,160 @@
+import numpy as np
+
+# 覆盖路径的校验与质量指标：把所有智能体的轨迹拼接成一个 (总步数, 2) 数组，
+# 每项检查都是对该数组的一次向量化运算，复杂度为O(总步数 + 地图单元格数)，可以在大规模基准测试中校验每一种配置
+
+
+def paths_to_array(trajectories: list):
+    '''
+    将一条或多条轨迹拼接为一个数组
+
+    :param trajectories: 单条轨迹 ([[row, col], ...] 或 (n, 2) 数组)、plan_map/plan_coverage_path的单个结果，
+                         或它们组成的列表（如plan_multi_agent_coverage的结果）；结果中有global_path_point_list时使用总图坐标
+    :return: points: (总步数, 2) 的int64数组；agent: 每个点所属智能体的下标；lengths: 各智能体的轨迹点数
+    '''
+    if isinstance(trajectories, dict) or (isinstance(trajectories, np.ndarray) and trajectories.ndim == 2):
+        trajectories = [trajectories]
+    elif (len(trajectories) > 0 and not isinstance(trajectories[0], dict)
+          and np.ndim(trajectories[0]) == 1 and len(trajectories[0]) == 2):
+        trajectories = [trajectories]
+
+    paths = []
+    for t in trajectories:
+        if isinstance(t, dict):
+            t = t['global_path_point_list'] if 'global_path_point_list' in t else t['Path_point_list']
+        paths.append(np.asarray(t, dtype=np.int64).reshape(-1, 2))
+
+    lengths = np.array([len(p) for p in paths], dtype=np.int64)
+    points = np.concatenate(paths) if paths else np.zeros((0, 2), dtype=np.int64)
+    agent = np.repeat(np.arange(len(paths)), lengths)
+    return points, agent, lengths
+
+
+def _moves(points, agent):
+    # 同一智能体内相邻两点之间的位移，以及位移起点的下标
+    same = agent[1:] == agent[:-1]
+    idx = np.nonzero(same)[0]
+    return points[idx + 1] - points[idx], idx
+
+
+def connectivity_violations(points, agent, allow_wait=False):
+    '''
+    检查同一智能体相邻两步是否4连通
+
+    :param points: paths_to_array返回的点数组
+    :param agent: paths_to_array返回的智能体下标数组
+    :param allow_wait: (默认为False) 是否允许原地停留
+    :return: 违反4连通的位移起点在points中的下标
+    '''
+    delta, idx = _moves(points, agent)
+    dist = np.abs(delta).sum(axis=1)
+    bad = (dist > 1) if allow_wait else (dist != 1)
+    return idx[bad]
+
+
+def turn_counts(points, agent, num_agents=None):
+    '''
+    统计各智能体的转向次数（相邻两次移动方向不同计一次，掉头也计一次，原地停留不影响转向）
+
+    :param points: paths_to_array返回的点数组
+    :param agent: paths_to_array返回的智能体下标数组
+    :param num_agents: (默认为None) 智能体数，None时取agent的最大值 + 1
+    :return: 各智能体转向次数的int64数组
+    '''
+    if num_agents is None:
+        num_agents = int(agent.max()) + 1 if len(agent) else 0
+    delta, idx = _moves(points, agent)
+    moving = np.any(delta != 0, axis=1)
+    delta = delta[moving]
+    owner = agent[idx[moving]]
+    changed = (owner[1:] == owner[:-1]) & np.any(delta[1:] != delta[:-1], axis=1)
+    return np.bincount(owner[1:][changed], minlength=num_agents).astype(np.int64)
+
+
+def validate_plan(original_map, trajectories, allowed_mask=None, allow_wait=False) -> dict:
+    '''
+    校验覆盖路径并计算质量指标
+
+    :param original_map: 轨迹所在坐标系的地图（1为障碍物）；多机结果使用总图
+    :param trajectories: 轨迹，格式见paths_to_array
+    :param allowed_mask: (默认为None) 需要覆盖的单元格掩码，None时为全部可通行单元格
+    :param allow_wait: (默认为False) 是否允许原地停留
+    :return: 校验结果
+
+    {
+        "valid": 三项检查是否全部通过,
+
+        "connected": 相邻两步是否都4连通,
+
+        "connectivity_violations": 违反4连通的步数,
+
+        "obstacle_free": 是否没有经过障碍物和地图外的单元格,
+
+        "obstacle_visits": 落在障碍物或地图外的轨迹点数,
+
+        "complete": 需要覆盖的单元格是否全部被覆盖,
+
+        "uncovered_cells": 未覆盖的单元格数,
+
+        "coverage_ratio": 覆盖率,
+
+        "overlap_ratio": 重叠率（重复访问次数 / 已覆盖的单元格数）,
+
+        "revisit_histogram": 下标为访问次数、值为单元格数的数组,
+
+        "turns": 各智能体的转向次数,
+
+        "total_turns": 转向总次数,
+
+        "agent_steps": 各智能体的步数,
+
+        "makespan": 完工时间（最大步数）,
+
+        "makespan_spread": 最大步数与最小步数之差,
+
+        "makespan_std": 各智能体步数的标准差
+    }
+    '''
+    original_map = np.asarray(original_map)
+    rows, cols = original_map.shape
+    free = original_map != 1
+    target = free if allowed_mask is None else (np.asarray(allowed_mask, dtype=bool) & free)
+
+    points, agent, lengths = paths_to_array(trajectories)
+    num_agents = len(lengths)
+
+    bad_moves = connectivity_violations(points, agent, allow_wait)
+
+    # 地图外的点计为障碍物访问，只用地图内的点统计访问次数
+    inside = (points[:, 0] >= 0) & (points[:, 0] < rows) & (points[:, 1] >= 0) & (points[:, 1] < cols)
+    cells = points[inside, 0] * cols + points[inside, 1]
+    visit_counts = np.bincount(cells, minlength=rows * cols)
+    obstacle_visits = int((~inside).sum() + visit_counts[~free.ravel()].sum())
+
+    free_counts = visit_counts[free.ravel()]
+    covered = int(np.count_nonzero(free_counts))
+    uncovered = int(np.count_nonzero(target.ravel() & (visit_counts == 0)))
+    revisits = int(free_counts.sum()) - covered
+    target_cells = int(target.sum())
+
+    agent_steps = np.maximum(lengths - 1, 0)
+    turns = turn_counts(points, agent, num_agents)
+
+    return {
+        "valid": len(bad_moves) == 0 and obstacle_visits == 0 and uncovered == 0,
+        "connected": len(bad_moves) == 0,
+        "connectivity_violations": int(len(bad_moves)),
+        "obstacle_free": obstacle_visits == 0,
+        "obstacle_visits": obstacle_visits,
+        "complete": uncovered == 0,
+        "uncovered_cells": uncovered,
+        "coverage_ratio": (target_cells - uncovered) / target_cells if target_cells else 1.0,
+        "overlap_ratio": revisits / covered if covered else 0.0,
+        "revisit_histogram": np.bincount(free_counts[free_counts > 0]),
+        "turns": turns,
+        "total_turns": int(turns.sum()),
+        "agent_steps": agent_steps,
+        "makespan": int(agent_steps.max()) if num_agents else 0,
+        "makespan_spread": int(agent_steps.max() - agent_steps.min()) if num_agents else 0,
+        "makespan_std": float(agent_steps.std()) if num_agents else 0.0
+    }
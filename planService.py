@@ -0,0 +1,352 @@
+import numpy as np
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from getPath import plan_map
+from mapTools import map_hash
+from planIO import result_to_json, result_from_json
+
+# 本地规划服务：asyncio + 常驻进程池
+# 协议为逐行JSON，每个请求一行，响应按完成顺序逐行返回（用id对应请求）：
+#   {"id": 1, "op": "plan", "map": [[...]], "map_name": "xx", "compress": false}
+#     -> {"id": 1, "status": "accepted", "map_hash": "...", "coalesced": false}
+#     -> {"id": 1, "status": "done", "latency_ms": 12.3, "result": {...}}
+#   {"id": 2, "op": "stats"} -> {"id": 2, "status": "done", "result": {队列深度和延迟分位数}}
+# 出错时返回 {"id": .., "status": "error", "error": "..."}
+
+# 延迟统计保留最近的请求数
+LATENCY_WINDOW = 1000
+# 单行消息的最大字节数（大地图和完整轨迹都在一行中）
+STREAM_LIMIT = 64 * 1024 * 1024
+
+
+def _warm_up():
+    # 在工作进程中导入模块并规划一张小地图，使第一个真实请求不再承担冷启动开销
+    plan_map(np.array([[2, 0], [0, 0]], dtype=np.uint8))
+    return os.getpid()
+
+
+def _plan_job(target_map, compress):
+    # 在工作进程中规划并序列化，事件循环中不再转换numpy数据和枚举
+    return result_to_json(plan_map(target_map, compress=compress))
+
+
+class PlanningService():
+    '''
+    规划服务：在常驻进程池中执行plan_map，相同地图的并发请求只规划一次
+    '''
+
+    def __init__(self, processes=None):
+        '''
+        :param processes: (默认为None) 工作进程数，None时取CPU核数
+        '''
+        self.processes = processes if processes is not None else (os.cpu_count() or 1)
+        self.executor = None
+        self.server = None
+        self.address = None
+        # (地图哈希, 是否压缩) -> 正在执行的规划任务
+        self._pending = {}
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self.in_flight = 0
+        self.completed = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    async def start(self, path=None, host="127.0.0.1", port=0):
+        '''
+        启动进程池并预热，然后开始监听
+
+        :param path: (默认为None) Unix套接字路径；为None时监听host:port
+        :param host: (默认为"127.0.0.1") TCP监听地址
+        :param port: (默认为0) TCP端口，0表示由系统分配
+        :return: 监听地址（套接字路径或 (host, port)）
+        '''
+        await self.warm_up()
+        if path is not None:
+            if os.path.exists(path):
+                os.remove(path)
+            self.server = await asyncio.start_unix_server(self._handle_connection, path=path, limit=STREAM_LIMIT)
+            self.address = path
+        else:
+            self.server = await asyncio.start_server(self._handle_connection, host=host, port=port, limit=STREAM_LIMIT)
+            self.address = self.server.sockets[0].getsockname()[:2]
+        return self.address
+
+    async def warm_up(self):
+        # 只启动进程池，不监听；本地客户端直接使用
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.processes)
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*[loop.run_in_executor(self.executor, _warm_up) for _ in range(self.processes)])
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            if isinstance(self.address, str) and os.path.exists(self.address):
+                os.remove(self.address)
+            self.server = None
+        if self.executor is not None:
+            # shutdown会等待正在运行的任务完成，放到线程中执行以免阻塞事件循环
+            executor, self.executor = self.executor, None
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+    async def __aenter__(self):
+        await self.warm_up()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def submit(self, target_map, compress=False):
+        '''
+        提交一张地图，相同地图正在规划时复用同一个任务
+
+        :param target_map: 地图数组
+        :param compress: (默认为False) 是否返回压缩轨迹格式
+        :return: (地图哈希, 是否复用了已有任务, 返回JSON字符串的asyncio.Future)
+        '''
+        target_map = np.asarray(target_map, dtype=np.uint8)
+        key = (map_hash(target_map), bool(compress))
+        future = self._pending.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return key[0], True, future
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, _plan_job, target_map, compress)
+        self._pending[key] = future
+        future.add_done_callback(lambda _: self._pending.pop(key, None))
+        return key[0], False, future
+
+    async def plan(self, target_map, map_name="map", compress=False):
+        '''
+        规划一张地图并等待结果
+
+        :return: 路径字典，格式同plan_map
+        '''
+        _, _, future = self.submit(target_map, compress)
+        return self._finish(await self._wait(future), map_name)
+
+    async def _wait(self, future):
+        start = time.perf_counter()
+        self.in_flight += 1
+        try:
+            text = await asyncio.shield(future)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        self._latencies.append((time.perf_counter() - start) * 1000)
+        self.completed += 1
+        return text
+
+    def _finish(self, text, map_name):
+        # 合并的请求共享规划结果，地图名称各自保留
+        res = result_from_json(text)
+        res["map_name"] = map_name
+        return res
+
+    def stats(self) -> dict:
+        '''
+        :return: 服务状态
+
+        {
+            "queue_depth": 正在规划的不同地图数,
+
+            "in_flight": 等待结果的请求数,
+
+            "completed": 已完成的请求数,
+
+            "coalesced": 被合并的请求数,
+
+            "errors": 失败的请求数,
+
+            "latency_ms": 最近请求的延迟分位数 {"p50", "p90", "p99"}
+        }
+        '''
+        latencies = np.array(self._latencies, dtype=float)
+        percentiles = {}
+        for p in (50, 90, 99):
+            percentiles["p{}".format(p)] = float(np.percentile(latencies, p)) if len(latencies) > 0 else None
+        return {
+            "queue_depth": len(self._pending),
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "latency_ms": percentiles
+        }
+
+    async def _handle_connection(self, reader, writer):
+        tasks = set()
+
+        async def send(message):
+            writer.write((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+            await writer.drain()
+
+        async def handle_plan(request):
+            start = time.perf_counter()
+            try:
+                hash_, coalesced, future = self.submit(request["map"], request.get("compress", False))
+                await send({"id": request.get("id"), "status": "accepted", "map_hash": hash_, "coalesced": coalesced})
+                res = json.loads(await self._wait(future))
+                res["map_name"] = request.get("map_name", "map")
+                await send({"id": request.get("id"), "status": "done",
+                            "latency_ms": (time.perf_counter() - start) * 1000, "result": res})
+            except Exception as e:
+                try:
+                    await send({"id": request.get("id"), "status": "error", "error": repr(e)})
+                except OSError:
+                    # 连接已断开，错误无法送达客户端
+                    pass
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    await send({"id": None, "status": "error", "error": repr(e)})
+                    continue
+                op = request.get("op", "plan")
+                if op == "stats":
+                    await send({"id": request.get("id"), "status": "done", "result": self.stats()})
+                elif op == "plan":
+                    # 每个请求独立执行，先完成的先返回
+                    task = asyncio.ensure_future(handle_plan(request))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                else:
+                    await send({"id": request.get("id"), "status": "error", "error": "未知操作：{}".format(op)})
+        except OSError:
+            # 客户端断开连接，已提交的请求仍然完成（结果无法送达）
+            pass
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks)
+            writer.close()
+
+
+class PlanningClient():
+    '''
+    规划服务客户端：通过Unix套接字或本地TCP连接，支持在一个连接上并发多个请求
+    '''
+
+    def __init__(self, path=None, host="127.0.0.1", port=None):
+        self.path = path
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+        self._next_id = 0
+        self._waiters = {}
+        self._reader_task = None
+
+    async def connect(self):
+        if self.path is not None:
+            self.reader, self.writer = await asyncio.open_unix_connection(self.path, limit=STREAM_LIMIT)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port, limit=STREAM_LIMIT)
+        self._reader_task = asyncio.ensure_future(self._read_loop())
+        return self
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            await self._reader_task
+            self.writer = None
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def _read_loop(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            waiter = self._waiters.get(message.get("id"))
+            if waiter is None or message["status"] == "accepted":
+                continue
+            del self._waiters[message["id"]]
+            if message["status"] == "error":
+                waiter.set_exception(RuntimeError(message["error"]))
+            else:
+                waiter.set_result(message["result"])
+        for waiter in self._waiters.values():
+            if not waiter.done():
+                waiter.set_exception(ConnectionError("连接已关闭"))
+
+    async def _request(self, request):
+        self._next_id += 1
+        request["id"] = self._next_id
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[request["id"]] = waiter
+        self.writer.write((json.dumps(request) + "\n").encode("utf-8"))
+        await self.writer.drain()
+        return await waiter
+
+    async def plan(self, target_map, map_name="map", compress=False):
+        res = await self._request({"op": "plan", "map": np.asarray(target_map).tolist(),
+                                   "map_name": map_name, "compress": compress})
+        return result_from_json(res)
+
+    async def stats(self):
+        return await self._request({"op": "stats"})
+
+
+class LocalPlanningClient():
+    '''
+    进程内替身客户端：接口与PlanningClient相同，直接调用PlanningService，不经过套接字，便于测试
+    '''
+
+    def __init__(self, service):
+        self.service = service
+
+    async def __aenter__(self):
+        await self.service.warm_up()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        pass
+
+    async def plan(self, target_map, map_name="map", compress=False):
+        return await self.service.plan(target_map, map_name, compress)
+
+    async def stats(self):
+        return self.service.stats()
+
+
+async def serve(path=None, host="127.0.0.1", port=0, processes=None):
+    service = PlanningService(processes)
+    address = await service.start(path, host, port)
+    print("规划服务已启动：{}，工作进程数：{}".format(address, service.processes))
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地覆盖路径规划服务")
+    parser.add_argument("--socket", default=None, help="Unix套接字路径，不指定时监听本地TCP端口")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--processes", type=int, default=None, help="工作进程数，默认为CPU核数")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.socket, args.host, args.port, args.processes))
+    except KeyboardInterrupt:
+        pass
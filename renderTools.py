@@ -0,0 +1,221 @@
+import numpy as np
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib as mpl
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
+
+from PathPlanningCore import PlannerStatus
+
+# 无界面的批量渲染：直接使用Figure + Agg画布，不经过pyplot，也不调用plt.show()
+# 整条轨迹用一个quiver/LineCollection绘制，而不是每一步一个箭头
+
+# 与CoveragePlanner一致的移动方向和动作
+MOVEMENT = np.array([[-1, 0], [0, -1], [1, 0], [0, 1]])
+ACTION = np.array([-1, 0, 1, 2])
+
+START_POSITION_COLOR = 'gold'  # 起始位置颜色
+START_ORIENTATION_COLOR = 'deeppink'  # 起始方向颜色
+STATUS_COLOR_REF = {
+    PlannerStatus.STANDBY: 'black',
+    PlannerStatus.COVERAGE_SEARCH: 'royalblue',
+    PlannerStatus.NEARST_UNVISITED_SEARCH: 'darkturquoise',
+    PlannerStatus.FOUND: 'mediumseagreen',
+    PlannerStatus.NOT_FOUND: 'red'
+}
+AGENT_COLORS = ['r', 'g', 'b', 'y', 'm', 'c']
+
+
+def _save_or_rasterize(fig, save_path, return_image):
+    # 保存图片，并按需返回RGB数组
+    canvas = FigureCanvasAgg(fig)
+    canvas.draw()
+    if save_path is not None:
+        directory = os.path.dirname(save_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        fig.savefig(save_path, bbox_inches='tight')
+    if return_image:
+        return np.asarray(canvas.buffer_rgba())[:, :, :3].copy()
+    return None
+
+
+def render_trajectory(target_map, trajectory, map_name="map", params_str="", save_path=None, return_image=False, dpi=100):
+    '''
+    无界面快速绘制单机覆盖路径，与getPath.plot_map的图示一致
+
+    :param target_map: 地图数组
+    :param trajectory: 完整轨迹 (plan_coverage_path结果中的policy_map)
+    :param map_name: 地图名称，用于标题
+    :param params_str: 标题第二行的参数说明
+    :param save_path: (默认为None) 图片保存路径，None时不保存
+    :param return_image: (默认为False) 是否返回渲染后的RGB数组 (H, W, 3)
+    :param dpi: (默认为100) 渲染分辨率
+    :return: return_image为True时返回RGB数组，否则返回None
+    '''
+    rows = np.array([t[1] for t in trajectory])
+    cols = np.array([t[2] for t in trajectory])
+    orient = np.array([t[3] for t in trajectory])
+    next_action = np.array([t[5] if t[5] is not None else 1 for t in trajectory])
+    status = [t[6] for t in trajectory]
+
+    fig = Figure(dpi=dpi)
+    ax = fig.add_subplot(1, 1, 1)
+
+    cmap = mpl.colors.ListedColormap(
+        ['w', 'k', START_POSITION_COLOR, STATUS_COLOR_REF[PlannerStatus.FOUND], STATUS_COLOR_REF[PlannerStatus.NOT_FOUND]])
+    norm = mpl.colors.BoundaryNorm([0, 1, 2, 3, 4, 5], cmap.N)
+    status_to_cmap_pos = {
+        PlannerStatus.FOUND: 3,
+        PlannerStatus.NOT_FOUND: 4
+    }
+
+    target_map_ref = np.array(target_map, dtype=np.uint8)
+    target_map_ref[rows[-1]][cols[-1]] = status_to_cmap_pos.get(status[-1], 4)
+    ax.imshow(target_map_ref, interpolation='none', cmap=cmap, norm=norm)
+
+    # 每一步的移动方向，一次性计算
+    mov_idx = (orient[:-1] + ACTION[next_action[:-1]]) % len(MOVEMENT)
+    mov = MOVEMENT[mov_idx]
+    x = cols[:-1].astype(float)
+    y = rows[:-1].astype(float)
+
+    # 仅为了改善可视化，将A*箭头略微右移/下移
+    a_star = np.array([s == PlannerStatus.NEARST_UNVISITED_SEARCH for s in status[:-1]], dtype=bool)
+    y[a_star & (mov_idx % 2 == 1)] -= 0.25
+    x[a_star & (mov_idx % 2 == 0)] += 0.25
+
+    colors = [STATUS_COLOR_REF[s] for s in status[:-1]]
+    if len(x) > 0:
+        ax.quiver(x, y, mov[:, 1], mov[:, 0], color=colors, angles='xy', scale_units='xy', scale=1,
+                  width=0.004, headwidth=4, headlength=4)
+
+    # 绘制初始方向
+    init_direction = MOVEMENT[orient[0]] / 2
+    ax.quiver([cols[0] - init_direction[1] / 2], [rows[0] - init_direction[0] / 2],
+              [init_direction[1]], [init_direction[0]], color=START_ORIENTATION_COLOR,
+              angles='xy', scale_units='xy', scale=1, width=0.006)
+
+    legend_elements = [
+        Line2D([0], [0], color=STATUS_COLOR_REF[PlannerStatus.COVERAGE_SEARCH], lw=1, marker='>',
+               markerfacecolor=STATUS_COLOR_REF[PlannerStatus.COVERAGE_SEARCH], label='前进(覆盖搜索)'),
+        Line2D([0], [0], color=STATUS_COLOR_REF[PlannerStatus.NEARST_UNVISITED_SEARCH], lw=1, marker='>',
+               markerfacecolor=STATUS_COLOR_REF[PlannerStatus.NEARST_UNVISITED_SEARCH], label='迂回(A*搜索)'),
+        Line2D([0], [0], color='w', lw=1, marker='>',
+               markerfacecolor=START_ORIENTATION_COLOR, label='初始方向'),
+        Line2D([0], [0], marker='s', color='w', label='起始位置',
+               markerfacecolor=START_POSITION_COLOR, markersize=15),
+        Line2D([0], [0], marker='s', color='w', label='结束位置',
+               markerfacecolor=STATUS_COLOR_REF[status[-1]], markersize=15),
+        Line2D([0], [0], marker='s', color='w',
+               label='障碍物', markerfacecolor='k', markersize=15),
+    ]
+    ax.legend(handles=legend_elements, bbox_to_anchor=(1.025, 1.0), loc='upper left')
+    ax.set_title("覆盖路径规划[{}]\n{}".format(map_name, params_str))
+    fig.tight_layout()
+
+    return _save_or_rasterize(fig, save_path, return_image)
+
+
+def render_multi_agent_path(original_map, regions, paths, title="多机覆盖路径", save_path=None, return_image=False, dpi=100):
+    '''
+    无界面快速绘制多机覆盖路径，每个智能体的路径用一个LineCollection绘制
+
+    :param original_map: 原始地图
+    :param regions: 划分后的区域列表
+    :param paths: 各智能体总图坐标的路径列表 ([row, col] 列表或 (k, 2) 数组)
+    :param title: 标题
+    :param save_path: (默认为None) 图片保存路径，None时不保存
+    :param return_image: (默认为False) 是否返回渲染后的RGB数组 (H, W, 3)
+    :param dpi: (默认为100) 渲染分辨率
+    :return: return_image为True时返回RGB数组，否则返回None
+    '''
+    fig = Figure(dpi=dpi)
+    ax = fig.add_subplot(1, 1, 1)
+
+    # 区域边界
+    boxes = []
+    for region in regions:
+        start_row, start_col, end_row, end_col = region['bounds']
+        boxes.append([[start_col, start_row], [end_col, start_row], [end_col, end_row],
+                      [start_col, end_row], [start_col, start_row]])
+    box_colors = [AGENT_COLORS[i % len(AGENT_COLORS)] for i in range(len(regions))]
+    ax.add_collection(LineCollection(boxes, colors=box_colors, linestyles='--', linewidths=1))
+
+    # 路径：相邻点连成线段
+    for i, path in enumerate(paths):
+        path = np.asarray(path, dtype=float).reshape(-1, 2)
+        if len(path) == 0:
+            continue
+        color = AGENT_COLORS[i % len(AGENT_COLORS)]
+        xy = path[:, ::-1]
+        segments = np.stack([xy[:-1], xy[1:]], axis=1)
+        ax.add_collection(LineCollection(segments, colors=color, linewidths=1, label='智能体 {}'.format(i+1)))
+        ax.plot(xy[:, 0], xy[:, 1], linestyle='none', marker='o', markersize=3, color=color)
+
+    ax.imshow(np.asarray(original_map), cmap='Greys', alpha=0.5)
+    ax.legend()
+    ax.set_title(title)
+    ax.grid(True, linewidth=0.5, alpha=0.5)
+    fig.tight_layout()
+
+    return _save_or_rasterize(fig, save_path, return_image)
+
+
+def rasterize_map(target_map, paths=None, cell_size=4, colors=None):
+    '''
+    不经过matplotlib，直接把地图和路径栅格化为RGB数组（每个单元格cell_size x cell_size像素）
+
+    :param target_map: 地图数组 (0: 空白, 1: 障碍物, 2: 起始点)
+    :param paths: (默认为None) 路径列表，每条路径为 [row, col] 列表或 (k, 2) 数组，按顺序着色
+    :param cell_size: (默认为4) 每个单元格的像素边长
+    :param colors: (默认为None) 各路径的颜色列表 (matplotlib颜色)，默认为AGENT_COLORS
+    :return: RGB数组 (rows*cell_size, cols*cell_size, 3)，uint8
+    '''
+    target_map = np.asarray(target_map)
+    palette = np.array([[255, 255, 255], [0, 0, 0], [255, 215, 0]], dtype=np.uint8)
+    cells = palette[np.clip(target_map, 0, 2)]
+
+    if paths is not None:
+        colors = colors if colors is not None else AGENT_COLORS
+        for i, path in enumerate(paths):
+            path = np.asarray(path, dtype=np.int64).reshape(-1, 2)
+            if len(path) == 0:
+                continue
+            rgb = np.array(mpl.colors.to_rgb(colors[i % len(colors)])) * 255
+            # 经过的单元格与空白按比例混合，保持障碍物可见
+            visited = np.zeros(target_map.shape, dtype=bool)
+            visited[path[:, 0], path[:, 1]] = True
+            cells[visited] = (0.4 * cells[visited] + 0.6 * rgb).astype(np.uint8)
+
+    return np.repeat(np.repeat(cells, cell_size, axis=0), cell_size, axis=1)
+
+
+def _render_job(job):
+    # 进程池任务：job为 (渲染函数名, 关键字参数)
+    kind, kwargs = job
+    if kind == "trajectory":
+        return render_trajectory(**kwargs)
+    elif kind == "multi_agent":
+        return render_multi_agent_path(**kwargs)
+    return rasterize_map(**kwargs)
+
+
+def render_maps_parallel(jobs: list, processes=None) -> list:
+    '''
+    在多个工作进程中并行渲染多张地图
+
+    :param jobs: 任务列表，每个任务为 (kind, kwargs)，kind为"trajectory"（render_trajectory）、
+                 "multi_agent"（render_multi_agent_path）或"raster"（rasterize_map）
+    :param processes: (默认为None) 进程数，None时取任务数与CPU核数的较小值，1表示在当前进程中顺序渲染
+    :return: 与jobs一一对应的渲染结果（RGB数组或None）
+    '''
+    if processes is None:
+        processes = min(len(jobs), os.cpu_count() or 1)
+    if processes <= 1:
+        return [_render_job(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(_render_job, jobs))
@@ -0,0 +1,115 @@
+import numpy as np
+from conflictCheck import check_conflicts, trajectories_to_array
+from executionSim import simulate_execution
+import time
+
+# 逐时间步的朴素冲突检测，用于核对向量化结果
+def brute_force_conflicts(trajectories):
+    positions, valid = trajectories_to_array(trajectories)
+    num_agents, horizon = valid.shape
+    vertex = set()
+    edge = set()
+    for t in range(horizon):
+        for a in range(num_agents):
+            for b in range(a + 1, num_agents):
+                if valid[a, t] and valid[b, t] and tuple(positions[a, t]) == tuple(positions[b, t]):
+                    vertex.add((t, a, b))
+                if t + 1 < horizon and valid[a, t] and valid[b, t] and valid[a, t+1] and valid[b, t+1]:
+                    if (tuple(positions[a, t]) == tuple(positions[b, t+1])
+                            and tuple(positions[b, t]) == tuple(positions[a, t+1])
+                            and tuple(positions[a, t]) != tuple(positions[a, t+1])):
+                        edge.add((t, a, b))
+    return vertex, edge
+
+# 测试时空冲突检测
+def test_conflict_check():
+    print("测试时空冲突检测...")
+
+    # 手工构造：智能体0和1在t=1互换，智能体2在t=2与智能体0处于同一单元格
+    trajectories = [
+        [[0, 0], [0, 1], [0, 0], [1, 0]],
+        [[1, 0], [0, 0], [0, 1]],
+        [[2, 0], [1, 0], [0, 0]],
+    ]
+    res = check_conflicts(trajectories)
+    print(f"顶点冲突:\n{res['vertex']}")
+    print(f"边冲突:\n{res['edge']}")
+    handmade_ok = ([2, 0, 2, 0, 0] in res['vertex'].tolist()
+                   and [1, 0, 1, 0, 1, 0, 0] in res['edge'].tolist())
+
+    # 随机轨迹与朴素实现比对
+    rng = np.random.default_rng(0)
+    moves = np.array([[-1, 0], [0, -1], [1, 0], [0, 1], [0, 0]])
+    random_trajectories = []
+    for _ in range(6):
+        steps = moves[rng.integers(0, 5, size=rng.integers(5, 30))]
+        start = rng.integers(0, 4, size=2)
+        path = np.clip(np.cumsum(np.vstack([start, steps]), axis=0), 0, 3)
+        random_trajectories.append(path.tolist())
+    res = check_conflicts(random_trajectories)
+    vertex, edge = brute_force_conflicts(random_trajectories)
+    random_ok = (set(map(tuple, res['vertex'][:, :3].tolist())) == vertex
+                 and len(res['vertex']) == len(vertex)
+                 and set(map(tuple, res['edge'][:, :3].tolist())) == edge
+                 and len(res['edge']) == len(edge))
+    print(f"随机轨迹: 顶点冲突={len(vertex)}, 边冲突={len(edge)}, 一致={random_ok}")
+
+    ok = handmade_ok and random_ok
+    assert ok
+    return ok
+
+# 测试锁步执行仿真：与逐时间步的朴素统计一致，数百个智能体在大地图上也能快速完成
+def test_execution_simulation():
+    print("\n测试锁步执行仿真...")
+
+    rng = np.random.default_rng(1)
+    grid = (rng.random((30, 40)) < 0.1).astype(np.uint8)
+    trajectories = []
+    for k in range(6):
+        # 随机游走，偶尔原地停留
+        steps = rng.integers(0, 5, size=rng.integers(20, 80))
+        moves = np.array([[-1, 0], [0, -1], [1, 0], [0, 1], [0, 0]])[steps]
+        path = np.clip(np.cumsum(np.vstack([[rng.integers(30), rng.integers(40)], moves]), axis=0), 0, [29, 39])
+        trajectories.append(path.tolist())
+    res = simulate_execution(grid, trajectories)
+
+    # 朴素统计
+    makespan = max(len(p) for p in trajectories) - 1
+    seen = set()
+    curve = []
+    visits = {}
+    for t in range(makespan + 1):
+        for p in trajectories:
+            if t < len(p):
+                cell = tuple(p[t])
+                visits[cell] = visits.get(cell, 0) + 1
+                if grid[cell] != 1:
+                    seen.add(cell)
+        curve.append(len(seen))
+    idle = [makespan - (len(p) - 1) + sum(p[i] == p[i+1] for i in range(len(p) - 1)) for p in trajectories]
+
+    same = (res["makespan"] == makespan and res["coverage_curve"].tolist() == curve
+            and res["idle_steps"].tolist() == idle
+            and res["revisits"] == sum(v - 1 for v in visits.values())
+            and res["obstacle_visits"] == sum(v for c, v in visits.items() if grid[c] == 1)
+            and res["new_cells"].sum() == curve[-1])
+    print(f"完工时间: {res['makespan']}, 最终覆盖: {curve[-1]}, 重复访问: {res['revisits']}, 与朴素统计一致: {same}")
+
+    # 300个智能体、每个5000步、1000x1000地图
+    big = [np.cumsum(np.vstack([[500, 500], rng.integers(-1, 2, size=(5000, 2)) * [1, 0]]), axis=0)
+           for _ in range(300)]
+    start = time.perf_counter()
+    big_res = simulate_execution(np.zeros((1000, 1000), dtype=np.uint8), big)
+    elapsed = time.perf_counter() - start
+    print(f"300个智能体x5000步: {elapsed:.2f}s, 完工时间: {big_res['makespan']}")
+
+    ok = same and big_res["makespan"] == 5000 and elapsed < 10
+    assert ok
+    return ok
+
+if __name__ == "__main__":
+    result = test_conflict_check()
+    print(f"时空冲突检测测试: {'通过' if result else '失败'}")
+
+    result = test_execution_simulation()
+    print(f"锁步执行仿真测试: {'通过' if result else '失败'}")
@@ -3,9 +3,19 @@ from mapTools import (
     gen_base_map, random_obstacle_map, basic_region_partition, advanced_region_partition,
     map_to_binary, binary_to_map, submap_to_global_coords, visualize_multi_agent_path
 )
-from getPath import plan_coverage_path
+from getPath import plan_coverage_path, plan_map, plan_multi_agent_coverage, plan_coverage_batch
 import matplotlib.pyplot as plt
 import time
+import asyncio
+import os
+import tempfile
+from planService import PlanningService, PlanningClient, LocalPlanningClient
+from batchPlan import run_batch
+from failureRecovery import agent_state_from_plan, reallocate_failed_agent
+from planMetrics import validate_plan
+from mapTools import save_packed_map
+from mapCatalog import build_map_catalog
+import json
 
 # 设置中文字体
 plt.rcParams['font.family'] = ['SimHei']
@@ -54,7 +64,9 @@ def test_multi_agent_coverage():
     
     # 为每个子地图规划路径
     print("\n3. 为每个子地图规划路径...")
-    paths = plan_coverage_path(submap_names, isprint=False, isconsole=False)
+    # 使用区域掩码，只覆盖分配给该智能体的单元格
+    masks = [region['mask'] for region in regions]
+    paths = plan_coverage_path(submap_names, isprint=False, isconsole=False, masks=masks)
     
     # 提取路径点
     path_points = []
@@ -82,6 +94,41 @@ def test_multi_agent_coverage():
     
     return True
 
+# 测试路径校验与质量指标：真实规划结果全部通过，人为破坏的轨迹能被检出
+def test_plan_validation():
+    print("\n\n开始路径校验测试...")
+
+    test_map = gen_base_map(16, 19, 2)
+    regions = advanced_region_partition(test_map, 3)
+    paths = plan_multi_agent_coverage(regions, processes=1)
+    report = validate_plan(test_map, paths)
+    steps = [p['Steps'] for p in paths]
+    print(f"   有效: {report['valid']}, 重叠率: {report['overlap_ratio']:.3f}, 转向: {report['turns'].tolist()}, "
+          f"完工时间差: {report['makespan_spread']}")
+
+    # 单条轨迹的朴素统计
+    path = paths[0]['global_path_point_list']
+    naive_turns = 0
+    for a, b, c in zip(path, path[1:], path[2:]):
+        if [b[0] - a[0], b[1] - a[1]] != [c[0] - b[0], c[1] - b[1]]:
+            naive_turns += 1
+    single = validate_plan(test_map, path, allowed_mask=np.zeros(test_map.shape, dtype=bool))
+
+    # 跳跃、经过障碍物和漏覆盖
+    obstacle = [int(v) for v in np.argwhere(test_map == 1)[0]]
+    broken = [list(p) for p in path]
+    broken[5] = obstacle
+    broken_report = validate_plan(test_map, [broken] + [p['global_path_point_list'] for p in paths[1:]])
+    partial = validate_plan(test_map, [p['global_path_point_list'][:-3] for p in paths])
+
+    all_ok = (report['valid'] and report['agent_steps'].tolist() == steps
+              and report['makespan_spread'] == max(steps) - min(steps)
+              and single['complete'] and single['turns'][0] == naive_turns
+              and not broken_report['connected'] and broken_report['obstacle_visits'] == 1
+              and not partial['complete'] and partial['uncovered_cells'] > 0)
+    assert all_ok
+    return all_ok
+
 # 性能测试
 def test_performance():
     print("\n\n开始性能测试...")
@@ -122,9 +169,198 @@ def test_performance():
     
     print("\n性能测试完成！")
 
+# 并行多机规划测试：结果与顺序规划一致，且已转换为总图坐标
+def test_parallel_multi_agent_coverage():
+    print("\n\n开始并行多机规划测试...")
+
+    test_map = gen_base_map(16, 19, 2)
+    regions = advanced_region_partition(test_map, 3)
+
+    parallel_paths = plan_multi_agent_coverage(regions, processes=2)
+    sequential_paths = plan_multi_agent_coverage(regions, processes=1)
+
+    all_ok = len(parallel_paths) == len(regions)
+    for i, (region, path, seq_path) in enumerate(zip(regions, parallel_paths, sequential_paths)):
+        expected = plan_map(region['map'], allowed_mask=region['mask'])
+        start_row, start_col, _, _ = region['bounds']
+        global_ok = all(g == [p[0] + start_row, p[1] + start_col]
+                        for g, p in zip(path['global_path_point_list'], path['Path_point_list']))
+        same_ok = (path['Path_point_list'] == expected['Path_point_list']
+                   and seq_path['Path_point_list'] == expected['Path_point_list'])
+        ok = path['agent_id'] == i and global_ok and same_ok
+        print(f"   智能体 {i+1}: 步数={path['Steps']}, 通过={ok}")
+        all_ok = all_ok and ok
+
+    assert all_ok
+    return all_ok
+
+# 测试多地图批量规划：共用进程池，结果按输入顺序且与逐个plan_map一致
+def test_batch_coverage():
+    print("\n=== 测试多地图批量规划 ===")
+
+    maps = [gen_base_map(8, 9, 2), gen_base_map(20, 24, 2), random_obstacle_map(10, 12), gen_base_map(12, 14, 3)]
+    for m in maps:
+        m[0][0] = 2
+    names = ["small", "large", "random", "medium"]
+
+    finished = []
+    results = plan_coverage_batch(maps, names, processes=2, progress=lambda done, total, i: finished.append(i))
+    sequential = plan_coverage_batch(maps, names, processes=1)
+
+    all_ok = sorted(finished) == [0, 1, 2, 3]
+    for m, name, res, seq in zip(maps, names, results, sequential):
+        expected = plan_map(m, name)
+        ok = res == expected and seq == expected
+        print(f"   {name}: 步数={res['Steps']}, 启发式={res['coverage_path_Heuristic']}, 通过={ok}")
+        all_ok = all_ok and ok
+
+    assert all_ok
+    return all_ok
+
+# 测试智能体故障重分配：故障智能体剩余的单元格由存活智能体接管，只重新规划受影响的智能体
+def test_agent_failure_reallocation():
+    print("\n=== 测试智能体故障重分配 ===")
+
+    test_map = gen_base_map(16, 19, 2)
+    regions = advanced_region_partition(test_map, 3)
+    plans = plan_multi_agent_coverage(regions, processes=1)
+
+    # 每个智能体执行了三分之一的路径后，智能体1故障
+    agents = [agent_state_from_plan(p, r, len(p['global_path_point_list']) // 3, test_map.shape)
+              for p, r in zip(plans, regions)]
+    res = reallocate_failed_agent(test_map, agents, failed_id=1, processes=1)
+
+    # 已覆盖的单元格 + 重新规划的剩余路径 + 未受影响智能体的原计划，应覆盖全部可通行单元格
+    covered = np.zeros(test_map.shape, dtype=bool)
+    for agent in agents:
+        covered |= agent['covered']
+    all_ok = res['agents'][1] is None and res['unreachable_cells'] == 0
+    for k, outcome in enumerate(res['agents']):
+        if outcome is None:
+            continue
+        if outcome['replanned']:
+            path = np.array(outcome['suffix']['Path_point_list'])
+            all_ok = all_ok and tuple(path[0]) == agents[k]['position']
+        else:
+            path = np.array(plans[k]['global_path_point_list'])
+        covered[path[:, 0], path[:, 1]] = True
+        print(f"   智能体 {k+1}: 新分配={outcome['reassigned_cells']}, 重新规划={outcome['replanned']}")
+
+    reassigned = sum(o['reassigned_cells'] for o in res['agents'] if o is not None)
+    full = bool(np.all(covered[test_map != 1]))
+    print(f"   剩余单元格={res['remaining_cells']}, 已重新分配={reassigned}, 全覆盖={full}")
+
+    all_ok = all_ok and reassigned == res['remaining_cells'] and full
+    assert all_ok
+    return all_ok
+
+# 测试规划服务：相同地图的并发请求只规划一次，套接字客户端与本地替身客户端结果一致
+def test_planning_service():
+    print("\n=== 测试规划服务 ===")
+
+    test_map = gen_base_map(16, 19, 2)
+    test_map[0][0] = 2
+    other_map = random_obstacle_map(10, 12)
+    other_map[0][0] = 2
+    expected = plan_map(test_map, map_name="base")
+
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            async with PlanningService(processes=2) as service:
+                # 本地替身客户端：5个相同请求和1个不同请求并发
+                async with LocalPlanningClient(service) as client:
+                    results = await asyncio.gather(*[client.plan(test_map, map_name="base") for _ in range(5)],
+                                                   client.plan(other_map, map_name="other"))
+                local_stats = await client.stats()
+
+                # Unix套接字客户端
+                await service.start(path=os.path.join(tmp, "plan.sock"))
+                async with PlanningClient(path=os.path.join(tmp, "plan.sock")) as remote:
+                    remote_results = await asyncio.gather(remote.plan(test_map, map_name="base"),
+                                                          remote.plan(test_map, map_name="base", compress=True))
+                    remote_stats = await remote.stats()
+        return results, local_stats, remote_results, remote_stats
+
+    results, local_stats, remote_results, remote_stats = asyncio.run(run())
+
+    same = all(res == expected for res in results[:5]) and remote_results[0] == expected
+    compressed = 'segments' in remote_results[1] and 'Path_point_list' not in remote_results[1]
+    coalesced = local_stats["coalesced"] >= 4
+    stats_ok = remote_stats["completed"] == 8 and remote_stats["queue_depth"] == 0 \
+        and remote_stats["latency_ms"]["p50"] is not None
+    print(f"   合并请求数={local_stats['coalesced']}, 延迟p50={remote_stats['latency_ms']['p50']:.1f}ms")
+
+    all_ok = same and compressed and coalesced and stats_ok and results[5]["map_name"] == "other"
+    assert all_ok
+    return all_ok
+
+# 测试批量规划：文件夹与地图目录两种来源，中断后续跑只规划剩余任务
+def test_batch_plan():
+    print("\n=== 测试批量规划 ===")
+
+    maps = [gen_base_map(16, 19, 2), gen_base_map(12, 14, 2), random_obstacle_map(10, 12)]
+    for m in maps:
+        m[0][0] = 2
+    names = ["base_a", "base_b", "random"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        map_dir = os.path.join(tmp, "maps")
+        os.makedirs(map_dir)
+        np.save(os.path.join(map_dir, "base_a.npy"), maps[0])
+        np.save(os.path.join(map_dir, "base_b.npy"), maps[1])
+        save_packed_map(os.path.join(map_dir, "random.npz"), maps[2])
+        output = os.path.join(tmp, "results.jsonl")
+
+        first = run_batch(map_dir, output, "advanced", [1, 2], workers=2, progress=None)
+        with open(output, encoding="utf-8") as f:
+            lines = f.readlines()
+
+        # 模拟中断：只保留前两行和半行
+        with open(output, 'w', encoding="utf-8") as f:
+            f.writelines(lines[:2])
+            f.write(lines[2][:20])
+        resumed = run_batch(map_dir, output, "advanced", [1, 2], workers=2, progress=None)
+        with open(output, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+
+        build_map_catalog(os.path.join(tmp, "maps.cat"), maps, names)
+        from_catalog = run_batch(os.path.join(tmp, "maps.cat"), os.path.join(tmp, "catalog.jsonl"), "basic", [1, 2, 3],
+                                 workers=1, compress=True, progress=None)
+
+    keys = {(r["map_name"], r["agents"]) for r in records}
+    single = {r["map_name"]: r for r in records if r["agents"] == 1}
+    same = all(single[name]["results"][0]["Path_point_list"] == plan_map(m)["Path_point_list"]
+               for name, m in zip(names, maps))
+    print(f"   首次: {first}, 续跑: {resumed}, 地图目录: {from_catalog}")
+
+    all_ok = (first == {"total": 6, "skipped": 0, "failed": 0}
+              and resumed == {"total": 4, "skipped": 2, "failed": 0}
+              and len(records) == 6 and len(keys) == 6 and same
+              and from_catalog["total"] == 9 and from_catalog["failed"] == 0)
+    assert all_ok
+    return all_ok
+
 if __name__ == "__main__":
     # 运行集成测试
     test_multi_agent_coverage()
+
+    # 运行并行多机规划测试
+    test_parallel_multi_agent_coverage()
+
+    # 运行多地图批量规划测试
+    test_batch_coverage()
+
+    # 运行智能体故障重分配测试
+    test_agent_failure_reallocation()
+
+    # 运行路径校验测试
+    test_plan_validation()
+
+    # 运行规划服务测试
+    test_planning_service()
+
+    # 运行批量规划测试
+    test_batch_plan()
     
     # 运行性能测试
     test_performance()
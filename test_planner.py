@@ -0,0 +1,429 @@
+import numpy as np
+from PathPlanningCore import CoveragePlanner, CompiledMap, HeuristicType, PlannerStatus, PlannerPool
+from mapTools import (
+    gen_base_map, advanced_region_partition, region_mask, random_block_map, place_start_point,
+    coverage_features, coverage_lower_bound, expected_coverage_steps, fit_step_model
+)
+from getPath import plan_map, plan_multi_agent_coverage
+from planMetrics import validate_plan
+from tiledPlanner import build_tiled_map, plan_tiled_coverage, label_components, connect
+from coarseToFine import plan_coarse_to_fine, classify_blocks, serpentine, BLOCK_OPEN
+import os
+import tempfile
+
+# 测试区域掩码：智能体只覆盖分配给自己的单元格
+def test_region_mask_coverage():
+    print("测试区域掩码覆盖...")
+
+    test_map = gen_base_map(16, 19, 2)
+    regions = advanced_region_partition(test_map, 3)
+
+    all_ok = True
+    for i, region in enumerate(regions):
+        submap = region['map']
+        mask = region_mask(region)
+
+        # 带掩码与不带掩码分别规划
+        cp_mask = CoveragePlanner(submap, allowed_mask=mask)
+        cp_mask.start(initial_orientation=0, cp_heuristic=HeuristicType.VERTICAL)
+        cp_mask.compute()
+        found, steps_mask, _, trajectory, xy = cp_mask.result()
+
+        cp_full = CoveragePlanner(submap)
+        cp_full.start(initial_orientation=0, cp_heuristic=HeuristicType.VERTICAL)
+        cp_full.compute()
+        steps_full = cp_full.result()[1]
+
+        # 掩码内的所有可通行单元格都必须被访问
+        visited = np.zeros(mask.shape, dtype=bool)
+        for p in xy:
+            visited[p[0]][p[1]] = True
+        target = mask & (np.asarray(submap) != 1)
+        covered = bool(np.all(visited[target]))
+
+        # 覆盖搜索段不得进入掩码外的单元格
+        cs_inside = all(mask[t[1]][t[2]] for t in trajectory
+                        if t[6] == PlannerStatus.COVERAGE_SEARCH)
+
+        ok = found and covered and cs_inside and steps_mask <= steps_full
+        print(f"区域 {i+1}: 掩码步数={steps_mask}, 全图步数={steps_full}, 覆盖完整={covered}, 通过={ok}")
+        all_ok = all_ok and ok
+
+    # 总图坐标系下的掩码也可以直接使用
+    region = regions[0]
+    global_map = np.array(test_map)
+    start_row, start_col, end_row, end_col = region['bounds']
+    global_map[start_row:end_row+1, start_col:end_col+1] = region['map']
+    cp_global = CoveragePlanner(global_map, allowed_mask=region_mask(region, global_map.shape))
+    cp_global.start()
+    cp_global.compute()
+    all_ok = all_ok and cp_global.result()[0]
+
+    # 起始点不在掩码内时构造即报错，而不是在start()中失败
+    outside = np.zeros(global_map.shape, dtype=bool)
+    outside[global_map != 2] = True
+    try:
+        CoveragePlanner(global_map, allowed_mask=outside)
+        all_ok = False
+    except ValueError:
+        pass
+
+    assert all_ok
+    return all_ok
+
+# 测试分块覆盖规划：覆盖完整、路径连续，驻留瓦片数有界
+def test_tiled_coverage():
+    print("\n测试分块覆盖规划...")
+
+    test_map = gen_base_map(50, 45, 2)
+    test_map[0][0] = 2
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 从内存映射的npy文件切分瓦片
+        np.save(os.path.join(tmp, "big.npy"), test_map)
+        big_map = np.load(os.path.join(tmp, "big.npy"), mmap_mode='r')
+        build_tiled_map(os.path.join(tmp, "tiles.cat"), big_map, tile_size=16)
+        del big_map
+
+        res = plan_tiled_coverage(os.path.join(tmp, "tiles.cat"))
+
+    path = res["path"]
+    connected = bool(np.all(np.abs(np.diff(path, axis=0)).sum(axis=1) == 1))
+    obstacle_free = bool(np.all(test_map[path[:, 0], path[:, 1]] != 1))
+    ok = (res["uncovered"] == 0 and connected and obstacle_free
+          and tuple(path[0]) == (0, 0) and res["peak_resident_tiles"] <= 10)
+    print(f"步数: {res['steps']}, 未覆盖: {res['uncovered']}, 最多驻留瓦片: {res['peak_resident_tiles']}, 通过: {ok}")
+
+    # 向量化的连通区域标记与最短连接路径
+    free = np.ones((7, 9), dtype=bool)
+    free[3, :] = False
+    free[3, 8] = True
+    free[:, 4] = False
+    labels, count = label_components(free)
+    corner = np.zeros(free.shape, dtype=bool)
+    corner[6, 8] = True
+    path = connect(free, [0, 5], corner)
+    helpers_ok = (count == 3 and labels[0, 0] == 1 and labels[0, 5] == 2 and labels[6, 5] == 2 and labels[6, 0] == 3
+                  and connect(free, [0, 0], corner) is None and len(connect(free, [0, 5], labels == 2)) == 1
+                  and path is not None and len(path) == 10 and path[-1] == [6, 8])
+    print(f"连通区域数: {count}, 连接路径正确: {helpers_ok}")
+    ok = ok and helpers_ok
+
+    assert ok
+    return ok
+
+# 测试plan_map的逐配置归约：结果与保留全部16个规划后排序取第一个一致
+def test_best_so_far_reduction():
+    print("\n测试最佳规划归约...")
+
+    all_ok = True
+    for seed in range(3):
+        test_map = place_start_point(random_block_map(24, 30, 0.2, (1, 3), 1, seed=seed), seed=seed)
+        compare_tb = []
+        for heuristic in [HeuristicType.VERTICAL, HeuristicType.HORIZONTAL, HeuristicType.CHEBYSHEV, HeuristicType.MANHATTAN]:
+            for orientation in range(4):
+                cp = CoveragePlanner(test_map)
+                cp.start(initial_orientation=orientation, cp_heuristic=heuristic)
+                cp.compute()
+                compare_tb.append([heuristic.name, orientation] + cp.result())
+        compare_tb.sort(key=lambda x: (x[3], x[4]))
+
+        best = plan_map(test_map)
+        ok = (best['coverage_path_Heuristic'] == compare_tb[0][0] and best['start_orientation_code'] == compare_tb[0][1]
+              and best['Steps'] == compare_tb[0][3] and best['Path_point_list'] == compare_tb[0][6])
+        print(f"种子 {seed}: 启发式={best['coverage_path_Heuristic']}, 步数={best['Steps']}, 通过={ok}")
+        all_ok = all_ok and ok
+
+    assert all_ok
+    return all_ok
+
+# 测试检查点：中断后从检查点恢复，结果与一次完成的规划完全一致
+def test_checkpoint_resume():
+    print("\n测试检查点与恢复...")
+
+    test_map = place_start_point(random_block_map(40, 50, 0.25, (1, 4), 1, seed=4), seed=4)
+    reference = CoveragePlanner(test_map)
+    reference.start(initial_orientation=1, cp_heuristic=HeuristicType.MANHATTAN)
+    reference.compute()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "planner.ckpt.npz")
+
+        # 模拟中断：执行若干FSM步骤后保存检查点并丢弃规划器
+        cp = CoveragePlanner(test_map)
+        cp.start(initial_orientation=1, cp_heuristic=HeuristicType.MANHATTAN)
+        while cp.compute_non_blocking() and cp.fsm_steps < 5:
+            pass
+        cp.save_checkpoint(path)
+        interrupted_steps = cp.fsm_steps
+        del cp
+
+        resumed = CoveragePlanner(test_map)
+        resumed.load_checkpoint(path)
+        resumed.compute(checkpoint_path=path, checkpoint_every=2)
+
+        # 检查点不能用于其他地图
+        other_map = np.array(test_map)
+        other_map[other_map == 0] = 1
+        try:
+            CoveragePlanner(other_map).load_checkpoint(path)
+            rejected = False
+        except ValueError:
+            rejected = True
+
+    ok = (resumed.result()[:4] == reference.result()[:4]
+          and resumed.current_trajectory_annotations == reference.current_trajectory_annotations
+          and np.array_equal(resumed.coverage_grid, reference.coverage_grid)
+          and resumed.fsm_steps == reference.fsm_steps and rejected)
+    print(f"中断于第{interrupted_steps}步, 总FSM步数: {resumed.fsm_steps}, 恢复后一致: {ok}")
+
+    assert ok
+    return ok
+
+# 测试规划器复用：同一实例反复start()以及实例池中取出的实例，结果都与新建的实例相同
+def test_planner_reuse():
+    print("测试规划器复用...")
+
+    maps = [place_start_point(random_block_map(12, 15, 0.2, (1, 3), 1, seed=k), seed=k) for k in range(3)]
+    other_shape = place_start_point(random_block_map(9, 11, 0.2, (1, 2), 1, seed=5), seed=5)
+    pool = PlannerPool()
+
+    all_ok = True
+    reused = CoveragePlanner(maps[0])
+    for m in maps + [other_shape]:
+        mask = np.ones(m.shape, dtype=bool)
+        mask[:, :2] = False
+        mask[m == 2] = True
+        for allowed_mask in (None, mask):
+            reference = CoveragePlanner(m, allowed_mask=allowed_mask)
+            reference.start(initial_orientation=1, cp_heuristic=HeuristicType.HORIZONTAL)
+            reference.compute()
+
+            reused.load_map(m, allowed_mask)
+            with pool.planner(m, allowed_mask) as pooled:
+                results = []
+                for cp in (reused, pooled):
+                    # 先跑一次其他配置，确认上一次运行不影响下一次
+                    cp.start(initial_orientation=0, cp_heuristic=HeuristicType.VERTICAL)
+                    cp.compute()
+                    cp.start(initial_orientation=1, cp_heuristic=HeuristicType.HORIZONTAL)
+                    cp.compute()
+                    results.append(cp.result()[:4] == reference.result()[:4]
+                                   and np.array_equal(cp.coverage_grid, reference.coverage_grid))
+            all_ok = all_ok and all(results)
+
+    print(f"新建实例: {pool.created}, 复用次数: {pool.reused}, 结果一致: {all_ok}")
+    all_ok = all_ok and pool.created == 2 and pool.reused == 6
+
+    # 空闲实例不再引用地图；超过max_shapes时淘汰最久未使用的形状
+    small_pool = PlannerPool(max_shapes=2)
+    shapes = [(5, 6), (6, 7), (7, 8), (6, 7), (5, 6)]
+    idle_cleared = True
+    for shape in shapes:
+        blank = np.zeros(shape, dtype=np.uint8)
+        blank[0, 0] = 2
+        with small_pool.planner(blank) as cp:
+            pass
+        idle_cleared = idle_cleared and cp.compiled is None
+    # (5, 6) 在 (7, 8) 归还时被淘汰，只有 (6, 7) 被复用
+    evict_ok = small_pool.created == 4 and small_pool.reused == 1
+    print(f"空闲实例不引用地图: {idle_cleared}, 按形状LRU淘汰: {evict_ok}")
+    all_ok = all_ok and idle_cleared and evict_ok
+    assert all_ok
+    return all_ok
+
+# 测试共享只读地图：多个运行上下文交替执行或在线程中执行，结果与独立规划相同
+def test_shared_compiled_map():
+    print("测试共享只读地图...")
+
+    test_map = place_start_point(random_block_map(14, 16, 0.2, (1, 3), 1, seed=7), seed=7)
+    compiled = CompiledMap(test_map)
+    try:
+        compiled.map_grid[0, 0] = 1
+        read_only = False
+    except ValueError:
+        read_only = True
+
+    # 两个上下文共享同一份地图，逐步交替执行
+    configs = [(HeuristicType.VERTICAL, 0), (HeuristicType.MANHATTAN, 3)]
+    contexts = [CoveragePlanner(compiled) for _ in configs]
+    for cp, (heuristic, orientation) in zip(contexts, configs):
+        cp.start(initial_orientation=orientation, cp_heuristic=heuristic)
+    running = [True, True]
+    while any(running):
+        running = [r and cp.compute_non_blocking() for r, cp in zip(running, contexts)]
+    interleaved_ok = True
+    for cp, (heuristic, orientation) in zip(contexts, configs):
+        reference = CoveragePlanner(test_map)
+        reference.start(initial_orientation=orientation, cp_heuristic=heuristic)
+        reference.compute()
+        interleaved_ok = interleaved_ok and cp.result()[:4] == reference.result()[:4]
+
+    threaded_ok = plan_map(test_map, threads=4) == plan_map(test_map)
+
+    regions = advanced_region_partition(gen_base_map(16, 19, 2), 3)
+    threaded_agents = plan_multi_agent_coverage(regions, processes=3, use_threads=True)
+    sequential_agents = plan_multi_agent_coverage(regions, processes=1)
+    agents_ok = threaded_agents == sequential_agents
+
+    print(f"只读: {read_only}, 交替执行一致: {interleaved_ok}, 多线程配置一致: {threaded_ok}, 多线程多机一致: {agents_ok}")
+    ok = read_only and interleaved_ok and threaded_ok and agents_ok
+    assert ok
+    return ok
+
+# 测试在线滚动规划：先验地图未知障碍物，每次规划horizon步并由传感器反馈发现障碍物，最终覆盖全部可达单元格
+def test_online_horizon():
+    print("测试在线滚动规划...")
+
+    horizon = 6
+    true_map = place_start_point(random_block_map(30, 36, 0.2, (1, 3), 1, seed=11), seed=11)
+    prior = np.where(true_map == 2, 2, 0).astype(np.uint8)
+    obstacles = np.argwhere(true_map == 1)
+
+    cp = CoveragePlanner(prior)
+    cp.start_online(initial_orientation=0)
+    calls = 0
+    longest = 0
+    while cp.state_ not in (PlannerStatus.FOUND, PlannerStatus.NOT_FOUND):
+        # 传感器看到以当前位置为中心、半径为horizon的范围
+        x, y = cp.current_pos[:2]
+        seen = obstacles[(np.abs(obstacles[:, 0] - x) <= horizon) & (np.abs(obstacles[:, 1] - y) <= horizon)]
+        cp.sense(obstacles=seen)
+        segment = cp.plan_horizon(horizon)
+        longest = max(longest, len(segment))
+        calls += 1
+
+    report = validate_plan(true_map, [t[1:3] for t in cp.current_trajectory])
+    # 窗口裁剪到地图范围内，加倍扩大的窗口也不会超过地图尺寸
+    window_ok = all(shape[0] <= true_map.shape[0] and shape[1] <= true_map.shape[1] for shape in cp._window_pool._idle)
+    print(f"调用次数: {calls}, 步数: {len(cp.current_trajectory) - 1}, 状态: {cp.state_.name}, "
+          f"有效: {report['valid']}, 窗口在地图内: {window_ok}")
+    ok = (cp.state_ == PlannerStatus.FOUND and report['valid'] and longest <= horizon
+          and cp.online_remaining == 0 and window_ok)
+
+    # 传感器报告角落 (0, 0) 已覆盖后，剩余计数正确减少，规划以FOUND结束
+    small = np.zeros((4, 5), dtype=np.uint8)
+    small[2, 2] = 2
+    cp = CoveragePlanner(small)
+    cp.start_online()
+    cp.sense(covered=[(0, 0), (0, 0), (3, 4)])
+    sensed_ok = cp.online_remaining == 17
+    while cp.state_ not in (PlannerStatus.FOUND, PlannerStatus.NOT_FOUND):
+        cp.plan_horizon(3)
+    corner_ok = sensed_ok and cp.state_ == PlannerStatus.FOUND and cp.online_remaining == 0
+    print(f"角落单元格反馈: 剩余计数正确={sensed_ok}, 状态: {cp.state_.name}")
+
+    ok = ok and corner_ok
+    assert ok
+    return ok
+
+# 测试覆盖下界与期望步数：下界不超过实际规划结果，剪枝不改变最佳路径
+def test_coverage_bounds():
+    print("测试覆盖步数下界...")
+
+    # 一条死胡同走廊：起始点在一端，另一端之外还有两个死胡同
+    corridor = np.ones((3, 7), dtype=np.uint8)
+    corridor[1, :] = 0
+    corridor[0, 3] = corridor[2, 5] = 0
+    corridor[1, 0] = 2
+    corridor_bound = coverage_lower_bound(corridor)
+
+    maps = [corridor, gen_base_map(16, 19, 2), place_start_point(random_block_map(20, 24, 0.2, (1, 3), 1, seed=4), seed=1)]
+    maps[1][0][0] = 2
+    all_ok = corridor_bound["steps"] == 10 and corridor_bound["turns"] == 2
+    for m in maps:
+        bound = coverage_lower_bound(m)
+        res = plan_map(m)
+        report = validate_plan(m, res)
+        pruned = plan_map(m, prune=True)
+        expected = expected_coverage_steps(m)
+        ok = (res["Steps"] >= bound["steps"] and report["total_turns"] >= bound["turns"]
+              and float(res["Cost"]) + 1e-9 >= bound["cost"] and expected >= bound["steps"]
+              and pruned == res)
+        print(f"   地图{np.shape(m)}: 步数={res['Steps']}, 下界={bound['steps']}, 期望={expected}, "
+              f"转向={report['total_turns']}, 转向下界={bound['turns']}, 通过={ok}")
+        all_ok = all_ok and ok
+
+    # 有被障碍物围住的可通行单元格时所有配置都以NOT_FOUND结束，剪枝不改变结果
+    enclosed = gen_base_map(12, 14, 2)
+    enclosed[0][0] = 2
+    enclosed[5:8, 6:9] = 1
+    enclosed[6, 7] = 0
+    res = plan_map(enclosed)
+    enclosed_ok = plan_map(enclosed, prune=True) == res
+    print(f"   围住单元格的地图: 步数={res['Steps']}, 剪枝结果一致={enclosed_ok}")
+    all_ok = all_ok and enclosed_ok
+
+    # 拟合能恢复线性模型的系数
+    features = [coverage_features(m) for m in maps]
+    features += [coverage_features(place_start_point(random_block_map(12 + k, 15, 0.1 * k, (1, 2), 1, seed=k), seed=k))
+                 for k in range(1, 5)]
+    model = (1.0, 0.5, 2.0, -3.0)
+    steps = [np.dot(model, [f["cells"], f["boundary_edges"], f["dead_ends"], 1]) for f in features]
+    fitted = fit_step_model(features, steps)
+    all_ok = all_ok and np.allclose(fitted, model, atol=1e-3)
+
+    assert all_ok
+    return all_ok
+
+# 测试由粗到细的多分辨率规划：轨迹完整有效，空闲粗单元格不调用块内规划器，步数接近逐单元格规划
+def test_coarse_to_fine():
+    print("\n测试由粗到细多分辨率规划...")
+
+    sweep = serpentine(3, 4, (1, 0), by_rows=False)
+    sweep_ok = (sweep[0].tolist() == [2, 0] and sweep[-1].tolist() == [2, 3] and len(np.unique(sweep, axis=0)) == 12
+                and bool(np.all(np.abs(np.diff(sweep, axis=0)).sum(axis=1) == 1)))
+
+    all_ok = sweep_ok
+    for seed, (rows, cols) in enumerate([(40, 40), (45, 53)]):
+        test_map = place_start_point(random_block_map(rows, cols, 0.04, (1, 3), 1, seed=seed), seed=seed)
+        res = plan_coarse_to_fine(test_map, k=8)
+        check = validate_plan(test_map, res["path"])
+        kinds = classify_blocks(test_map, 8)
+        start = np.argwhere(test_map == 2)[0]
+        best = plan_map(test_map)
+        ok = (check["valid"] and res["uncovered"] == 0 and res["path"][0].tolist() == start.tolist()
+              and res["open_blocks"] == int((kinds == BLOCK_OPEN).sum()) - int(kinds[tuple(start // 8)] == BLOCK_OPEN)
+              and res["mixed_blocks"] + res["open_blocks"] == len(res["coarse_order"])
+              and res["steps"] <= 1.2 * len(best["Path_point_list"]))
+        print(f"地图{rows}x{cols}: 步数 {res['steps']} (逐单元格 {len(best['Path_point_list']) - 1}), "
+              f"蛇形扫描块 {res['open_blocks']}, 细规划块 {res['mixed_blocks']}, 有效: {check['valid']}")
+        all_ok = all_ok and ok
+
+    # 完全空闲的地图只有起始点所在的粗单元格需要细规划
+    open_map = np.zeros((64, 64), dtype=np.uint8)
+    open_map[0, 0] = 2
+    res = plan_coarse_to_fine(open_map, k=8)
+    all_ok = (all_ok and res["mixed_blocks"] == 1 and res["open_blocks"] == 63
+              and validate_plan(open_map, res["path"])["valid"] and res["steps"] <= 64 * 64 + 64)
+
+    assert all_ok
+    return all_ok
+
+if __name__ == "__main__":
+    result = test_region_mask_coverage()
+    print(f"区域掩码覆盖测试: {'通过' if result else '失败'}")
+
+    result = test_tiled_coverage()
+    print(f"分块覆盖规划测试: {'通过' if result else '失败'}")
+
+    result = test_best_so_far_reduction()
+    print(f"最佳规划归约测试: {'通过' if result else '失败'}")
+
+    result = test_checkpoint_resume()
+    print(f"检查点恢复测试: {'通过' if result else '失败'}")
+
+    result = test_planner_reuse()
+    print(f"规划器复用测试: {'通过' if result else '失败'}")
+
+    result = test_shared_compiled_map()
+    print(f"共享只读地图测试: {'通过' if result else '失败'}")
+
+    result = test_online_horizon()
+    print(f"在线滚动规划测试: {'通过' if result else '失败'}")
+
+    result = test_coverage_bounds()
+    print(f"覆盖步数下界测试: {'通过' if result else '失败'}")
+
+    result = test_coarse_to_fine()
+    print(f"由粗到细多分辨率规划测试: {'通过' if result else '失败'}")
@@ -0,0 +1,108 @@
+import numpy as np
+import json
+from mapTools import gen_base_map, random_obstacle_map
+from getPath import plan_map
+from trajectoryCodec import compress_trajectory, compress_policy, expand_trajectory
+from planIO import PlanWriter, save_plan, load_plan, trajectory_to_array
+from PathPlanningCore import CoveragePlanner
+import os
+import tempfile
+
+# 测试轨迹压缩：展开后与原路径完全一致，开阔地图上载荷缩小一个数量级
+def test_trajectory_compression():
+    print("测试轨迹压缩...")
+
+    open_map = np.zeros((30, 40), dtype=np.uint8)
+    open_map[10:14, 8:30] = 1
+    test_maps = [("基础地图", gen_base_map(16, 19, 2)), ("随机障碍地图", random_obstacle_map(10, 12)),
+                 ("开阔地图", open_map)]
+
+    all_ok = True
+    for map_name, test_map in test_maps:
+        test_map[0][0] = 2
+        best = plan_map(test_map)
+        policy = best['policy_map']
+
+        # 直接由规划器轨迹压缩，并无损展开
+        compressed = compress_policy(policy)
+        points, status = expand_trajectory(compressed, with_status=True)
+        lossless = (np.array_equal(points, np.array(best['Path_point_list']))
+                    and np.array_equal(status, [t[6].value for t in policy]))
+
+        # 由坐标数组压缩得到相同的分段
+        from_points = compress_trajectory(best['Path_point_list'], [t[6].value for t in policy[:-1]])
+        same_segments = (np.array_equal(from_points['segments'], compressed['segments'])
+                         and np.array_equal(from_points['turns'], compressed['turns']))
+
+        compact = plan_map(test_map, compress=True)
+        full_size = len(json.dumps(best['Path_point_list'])) + len(json.dumps(
+            [[float(t[0]), t[1], t[2], int(t[3]), t[4], t[5], t[6].name] for t in policy]))
+        compact_size = len(json.dumps(compact['segments']))
+        ok = lossless and same_segments and 'Path_point_list' not in compact
+        print(f"{map_name}: 路径点={len(points)}, 分段={len(compressed['segments'])}, "
+              f"载荷 {full_size} -> {compact_size} 字节, 通过={ok}")
+        all_ok = all_ok and ok
+
+    # 开阔地图上压缩效果至少一个数量级
+    all_ok = all_ok and full_size > 10 * compact_size
+
+    assert all_ok
+    return all_ok
+
+# 测试二进制规划文件：与路径字典精确往返，内存映射读取，流式写入与一次写入的结果一致
+def test_plan_binary_format():
+    print("\n测试二进制规划文件...")
+
+    test_map = gen_base_map(16, 19, 2)
+    test_map[0][0] = 2
+    best = plan_map(test_map)
+
+    cp = CoveragePlanner(test_map)
+    cp.start()
+    cp.compute()
+    trajectory = cp.result()[3]
+    annotations = cp.current_trajectory_annotations
+
+    with tempfile.TemporaryDirectory() as tmp:
+        save_plan(os.path.join(tmp, "best.plan"), best, target_map=test_map, annotations=annotations)
+        plan = load_plan(os.path.join(tmp, "best.plan"))
+        round_trip = plan.to_dict() == best
+        zero_copy = isinstance(plan.trajectory, np.memmap)
+        same_xy = np.array_equal(plan.xy(), np.array(best['Path_point_list']))
+        same_annotations = [[int(a['x']), int(a['y']), a['label'].decode()] for a in plan.annotations] == annotations
+        has_header = plan.header['Steps'] == best['Steps'] and len(plan.header['map_hash']) == 40
+        del plan
+
+        # 分批流式写入
+        with PlanWriter(os.path.join(tmp, "stream.plan")) as writer:
+            for i in range(0, len(trajectory), 7):
+                writer.append(trajectory[i:i+7])
+            writer.close({"Steps": len(trajectory) - 1})
+        streamed = load_plan(os.path.join(tmp, "stream.plan"), mmap=False)
+        same_stream = np.array_equal(streamed.trajectory, trajectory_to_array(trajectory))
+
+        # 未调用close()离开with块时自动写入头部；出现异常时不留下文件
+        with PlanWriter(os.path.join(tmp, "implicit.plan")) as writer:
+            writer.append(trajectory)
+        implicit_ok = len(load_plan(os.path.join(tmp, "implicit.plan"), mmap=False).trajectory) == len(trajectory)
+        try:
+            with PlanWriter(os.path.join(tmp, "failed.plan")) as writer:
+                writer.append(trajectory)
+                raise RuntimeError("规划中断")
+        except RuntimeError:
+            pass
+        no_partial = not any(name == "failed.plan" or name.endswith(".part") for name in os.listdir(tmp))
+        same_stream = same_stream and implicit_ok and no_partial
+
+    ok = round_trip and zero_copy and same_xy and same_annotations and has_header and same_stream
+    print(f"往返一致={round_trip}, 零拷贝={zero_copy}, 标注一致={same_annotations}, 流式写入一致={same_stream}, 通过={ok}")
+
+    assert ok
+    return ok
+
+if __name__ == "__main__":
+    result = test_trajectory_compression()
+    print(f"轨迹压缩测试: {'通过' if result else '失败'}")
+
+    result = test_plan_binary_format()
+    print(f"二进制规划文件测试: {'通过' if result else '失败'}")
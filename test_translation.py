@@ -2,9 +2,21 @@ import numpy as np
 from mapTools import (
     gen_base_map, random_obstacle_map, basic_region_partition, advanced_region_partition,
     map_to_binary, binary_to_map, submap_to_global_coords, global_to_submap_coords,
-    visualize_multi_agent_path
+    visualize_multi_agent_path, pack_map, unpack_map, randomStartPoint
 )
+from PathPlanningCore import CoveragePlanner
+from mapCatalog import MapCatalog, build_map_catalog, build_scenario_catalog
+from mapTools import map_hash, random_block_map, scenario_corpus, gen_scenario_map, coverage_features
+from mapTools import submap_to_global_array, global_to_submap_array, submaps_to_global, compose_bounds
+import time
+from tiledPlanner import label_components
+from getPath import plan_coverage_path, plan_map
+from renderTools import render_trajectory, rasterize_map, render_maps_parallel
+import os
+import tempfile
 import matplotlib.pyplot as plt
+from mapIngest import (read_pgm, write_pgm, image_to_binary, binary_to_image, inflate_obstacles,
+                       block_reduce, ingest_occupancy_map)
 
 # 设置中文字体
 plt.rcParams['font.family'] = ['SimHei']
@@ -37,6 +49,106 @@ def test_map_conversion():
     
     return obstacle_match and free_match
 
+# 测试紧凑数据类型与位压缩存储
+def test_compact_map_storage():
+    print("\n测试紧凑地图存储...")
+
+    test_map = np.array(randomStartPoint(random_obstacle_map(31, 47), 1))
+    dtype_ok = test_map.dtype == np.uint8 and gen_base_map(10, 12, 2).dtype == np.uint8
+    print(f"生成地图类型: {test_map.dtype}")
+
+    # 位压缩后可以无损还原
+    packed = pack_map(test_map)
+    restored = unpack_map(packed)
+    roundtrip_ok = np.array_equal(test_map, restored) and restored.dtype == np.uint8
+    print(f"位压缩: {test_map.nbytes} 字节 -> {packed['bits'].nbytes} 字节, 还原一致: {roundtrip_ok}")
+
+    # 规划器内部网格使用紧凑类型
+    cp = CoveragePlanner(test_map.astype(np.int64))
+    heuristic = cp.create_heuristic([3, 5], cp.a_star_heuristic)
+    planner_ok = (cp.map_grid.dtype == np.uint8 and cp.coverage_grid.dtype == np.uint8
+                  and heuristic.dtype.itemsize <= 4 and heuristic[0][0] == 8)
+    print(f"规划器网格类型: {cp.map_grid.dtype}, 启发式类型: {heuristic.dtype}")
+
+    ok = dtype_ok and roundtrip_ok and planner_ok
+    assert ok
+    return ok
+
+# 测试内存映射地图目录
+def test_map_catalog():
+    print("\n测试地图目录...")
+
+    maps = [np.array(randomStartPoint(gen_base_map(10 + i, 12 + i, 2), 1)) for i in range(5)]
+    names = ["catalog_map_{}".format(i) for i in range(5)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "maps.cat")
+        build_map_catalog(path, maps[:3], names[:3])
+        build_map_catalog(path, iter(maps[3:]), names[3:], append=True)
+
+        # 名称重复的追加在写入前就被拒绝，目录文件保持完整
+        size = os.path.getsize(path)
+        try:
+            build_map_catalog(path, iter(maps[:2]), ["catalog_map_new", names[0]], append=True)
+            duplicate_ok = False
+        except ValueError:
+            duplicate_ok = os.path.getsize(path) == size
+
+        catalog = MapCatalog(path)
+        content_ok = len(catalog) == 5 and catalog.names() == names
+        for name, m in zip(names, maps):
+            info = catalog.info(name)
+            content_ok = (content_ok and np.array_equal(catalog[name], m)
+                          and info["hash"] == map_hash(m)
+                          and tuple(info["start"]) == tuple(np.argwhere(m == 2)[0]))
+        # 目录中的地图是内存映射视图，不是拷贝
+        zero_copy = isinstance(catalog.get(names[0]).base, np.memmap) or isinstance(catalog.get(names[0]), np.memmap)
+        print(f"地图数量: {len(catalog)}, 内容一致: {content_ok}, 零拷贝: {zero_copy}, 拒绝重复名称: {duplicate_ok}")
+
+        # 直接从目录规划
+        paths = plan_coverage_path(names[:1], isprint=False, isconsole=False, catalog=path)
+        plan_ok = len(paths) == 1 and paths[0]['Path_point_list'][0] == list(catalog.info(names[0])["start"])
+        del catalog
+
+    ok = content_ok and zero_copy and plan_ok and duplicate_ok
+    assert ok
+    return ok
+
+# 测试随机地图生成：相同种子结果一致，空白区域连通，场景库可复现
+def test_map_generators():
+    print("\n测试随机地图生成...")
+
+    a = random_block_map(120, 150, density=0.15, block_size=(2, 5), corridor_width=2, seed=7)
+    b = random_block_map(120, 150, density=0.15, block_size=(2, 5), corridor_width=2, seed=7)
+    c = random_block_map(120, 150, density=0.15, block_size=(2, 5), corridor_width=2, seed=8)
+    seeded = np.array_equal(a, b) and not np.array_equal(a, c)
+    _, components = label_components(a == 0)
+    border_free = not (a[:2].any() or a[-2:].any() or a[:, :2].any() or a[:, -2:].any())
+    density_ok = abs(a.mean() - 0.15) < 0.03
+    print(f"种子可复现: {seeded}, 连通区域数: {components}, 障碍占比: {a.mean():.3f}")
+
+    # 场景库：参数相同时地图完全一致，可以直接规划
+    scenarios = scenario_corpus(sizes=((20, 24),), densities=(0.1, 0.3), block_sizes=((1, 3),), repeats=2, seed=1)
+    with tempfile.TemporaryDirectory() as tmp:
+        entries = build_scenario_catalog(os.path.join(tmp, "corpus.cat"), scenarios)
+        again = build_scenario_catalog(os.path.join(tmp, "again.cat"), scenario_corpus(
+            sizes=((20, 24),), densities=(0.1, 0.3), block_sizes=((1, 3),), repeats=2, seed=1))
+    corpus_ok = (len(entries) == 4 and [e["hash"] for e in entries] == [e["hash"] for e in again]
+                 and len(set(e["hash"] for e in entries)) == 4)
+    m = gen_scenario_map(scenarios[-1])
+    plan_ok = np.count_nonzero(m == 2) == 1 and plan_map(m)["Steps"] > 0
+    print(f"场景数: {len(entries)}, 场景库可复现: {corpus_ok}, 规划成功: {plan_ok}")
+
+    # obstacle场景有死胡同，用于拟合步数模型的死胡同系数
+    obstacle = scenario_corpus(sizes=((20, 24),), densities=(0,), block_sizes=((1, 1),), repeats=2, generator="obstacle")
+    dead_end_map = gen_scenario_map(obstacle[0])
+    corpus_ok = (corpus_ok and obstacle[0]["name"].endswith("_obstacle") and len(set(s["name"] for s in obstacle)) == 2
+                 and np.count_nonzero(dead_end_map == 2) == 1 and coverage_features(dead_end_map)["dead_ends"] > 0)
+
+    ok = seeded and components == 1 and border_free and density_ok and corpus_ok and plan_ok
+    assert ok
+    return ok
+
 # 测试坐标转译
 def test_coordinate_translation():
     print("\n测试坐标转译...")
@@ -65,6 +177,38 @@ def test_coordinate_translation():
     
     return conversion_correct
 
+# 测试批量坐标转译：与逐点转换一致，嵌套区域的偏移可以合成
+def test_batched_coordinate_translation():
+    print("\n测试批量坐标转译...")
+
+    rng = np.random.default_rng(0)
+    outer = (10, 20, 109, 219)
+    inner = (5, 7, 40, 60)
+    points = rng.integers(0, 30, size=(1000, 2))
+
+    # 与逐点转换一致
+    global_points = submap_to_global_array(points, outer)
+    same_as_scalar = all(tuple(g) == submap_to_global_coords(p, outer) for g, p in zip(global_points, points))
+    round_trip = np.array_equal(global_to_submap_array(global_points, outer), points)
+
+    # 嵌套区域：内层子地图坐标 -> 外层子地图坐标 -> 总图坐标
+    nested = submap_to_global_array(points, [outer, inner])
+    nested_ok = (np.array_equal(nested, submap_to_global_array(submap_to_global_array(points, inner), outer))
+                 and np.array_equal(nested, submap_to_global_array(points, compose_bounds(outer, inner))))
+
+    # 多条路径拼接后一次转换：一百万个点
+    paths = [rng.integers(0, 100, size=(250000, 2)) for _ in range(4)]
+    bounds_list = [(0, 0, 99, 99), (0, 100, 99, 199), (100, 0, 199, 99), [outer, inner]]
+    start = time.perf_counter()
+    stitched = submaps_to_global(paths, bounds_list)
+    elapsed = (time.perf_counter() - start) * 1000
+    stitched_ok = all(np.array_equal(s, submap_to_global_array(p, b)) for s, p, b in zip(stitched, paths, bounds_list))
+    print(f"逐点一致: {same_as_scalar}, 往返一致: {round_trip}, 嵌套一致: {nested_ok}, 一百万点拼接耗时: {elapsed:.1f}ms")
+
+    ok = same_as_scalar and round_trip and nested_ok and stitched_ok
+    assert ok
+    return ok
+
 # 测试多机路径可视化
 def test_multi_agent_visualization():
     print("\n测试多机路径可视化...")
@@ -92,6 +236,102 @@ def test_multi_agent_visualization():
     print("多机路径可视化完成")
     return True
 
+# 测试无界面批量渲染
+def test_headless_rendering():
+    print("\n测试无界面渲染...")
+
+    test_map = gen_base_map(16, 19, 2)
+    test_map[0][0] = 2
+    best = plan_map(test_map)
+
+    image = render_trajectory(test_map, best['policy_map'], return_image=True)
+    image_ok = image.ndim == 3 and image.shape[2] == 3 and image.dtype == np.uint8
+
+    raster = rasterize_map(test_map, [best['Path_point_list']], cell_size=3)
+    raster_ok = (raster.shape == (16 * 3, 19 * 3, 3)
+                 and tuple(raster[1 * 3, 1 * 3]) == (0, 0, 0)
+                 and tuple(raster[0, 0]) != (255, 255, 255))
+
+    jobs = [("raster", {"target_map": test_map, "paths": [best['Path_point_list']], "cell_size": 2}),
+            ("trajectory", {"target_map": test_map, "trajectory": best['policy_map'], "return_image": True})]
+    parallel = render_maps_parallel(jobs, processes=2)
+    parallel_ok = (np.array_equal(parallel[0], rasterize_map(test_map, [best['Path_point_list']], cell_size=2))
+                   and parallel[1].shape == image.shape)
+    print(f"图像尺寸: {image.shape}, 栅格尺寸: {raster.shape}, 并行渲染一致: {parallel_ok}")
+
+    ok = image_ok and raster_ok and parallel_ok
+    assert ok
+    return ok
+
+# 测试占据栅格图像导入：条带流式处理与整图处理一致，膨胀与朴素实现一致
+def test_occupancy_ingestion():
+    print("\n测试占据栅格图像导入...")
+
+    # 合成SLAM风格的图像：254为空闲，0为占据，205为未知
+    rng = np.random.default_rng(3)
+    image = np.full((203, 157), 254, dtype=np.uint8)
+    image[rng.random(image.shape) < 0.01] = 0
+    image[:, :5] = 205
+    image[90:95, 40:120] = 0
+
+    binary = image_to_binary(image)
+    threshold_ok = (binary[:, :5].all() and binary[image == 0].all() and not binary[image == 254].any()
+                    and not image_to_binary(image, unknown_is_obstacle=False)[:, :5].any()
+                    and np.array_equal(image_to_binary(binary_to_image(binary)), binary))
+
+    # 膨胀与逐障碍物画圆的朴素实现比对
+    radius = 3
+    small = binary[:60, :70]
+    expected = np.zeros_like(small)
+    for r, c in np.argwhere(small == 1):
+        for dr in range(-radius, radius + 1):
+            for dc in range(-radius, radius + 1):
+                if dr * dr + dc * dc <= radius * radius and 0 <= r + dr < 60 and 0 <= c + dc < 70:
+                    expected[r + dr, c + dc] = 1
+    inflate_ok = np.array_equal(inflate_obstacles(small, radius), expected)
+
+    reduced = block_reduce(np.eye(5, dtype=np.uint8), 2)
+    reduce_ok = reduced.tolist() == [[1, 0, 1], [0, 1, 1], [1, 1, 1]]
+
+    # PGM读写并以小条带流式导入，结果与整图一次处理一致
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "floor.pgm")
+        write_pgm(path, image)
+        with open(path, 'r+b') as f:
+            content = f.read()
+            f.seek(0)
+            f.write(content.replace(b"P5\n", b"P5\n# CREATOR: map_saver\n", 1))
+        pgm_image, pgm_maxval = read_pgm(path)
+        pgm_ok = np.array_equal(pgm_image, image) and pgm_maxval == 255
+
+        whole = ingest_occupancy_map(image, cell_size=4, robot_radius=radius, start=(100, 80), band_rows=10 ** 6)
+        streamed = ingest_occupancy_map(path, cell_size=4, robot_radius=radius, start=(100, 80), band_rows=16,
+                                        output=os.path.join(tmp, "floor.npy"))
+        stream_ok = (np.array_equal(np.asarray(streamed), whole) and whole.shape == (51, 40)
+                     and whole[25, 20] == 2 and (whole == 2).sum() == 1
+                     and np.array_equal(whole == 1, block_reduce(inflate_obstacles(binary, radius), 4) == 1))
+        del streamed
+
+        # maxval不是255的PGM：100表示空闲，按头部的maxval归一化
+        small_path = os.path.join(tmp, "maxval.pgm")
+        small = np.full((4, 4), 100, dtype=np.uint8)
+        small[0, 0] = 0
+        with open(small_path, 'wb') as f:
+            f.write(b"P5\n4 4\n100\n" + small.tobytes())
+        small_map = ingest_occupancy_map(small_path, start=(3, 3))
+        maxval_ok = (read_pgm(small_path)[1] == 100 and small_map[0, 0] == 1 and small_map[3, 3] == 2
+                     and (small_map == 0).sum() == 14
+                     and np.array_equal(image_to_binary(small / 100.0), image_to_binary(small, maxval=100)))
+
+    planned = plan_map(whole)
+    plan_ok = planned['Path_point_list'][0] == [25, 20]
+    print(f"阈值化: {threshold_ok}, 膨胀: {inflate_ok}, 降采样: {reduce_ok}, PGM: {pgm_ok}, "
+          f"流式一致: {stream_ok}, maxval: {maxval_ok}, 地图尺寸: {whole.shape}, 可规划: {plan_ok}")
+
+    ok = threshold_ok and inflate_ok and reduce_ok and pgm_ok and stream_ok and maxval_ok and plan_ok
+    assert ok
+    return ok
+
 if __name__ == "__main__":
     print("开始测试转译层功能...")
     
@@ -99,14 +339,38 @@ if __name__ == "__main__":
     map_conversion_result = test_map_conversion()
     print(f"地图格式转换测试: {'通过' if map_conversion_result else '失败'}")
     
+    # 测试紧凑地图存储
+    compact_storage_result = test_compact_map_storage()
+    print(f"紧凑地图存储测试: {'通过' if compact_storage_result else '失败'}")
+
+    # 测试地图目录
+    map_catalog_result = test_map_catalog()
+    print(f"地图目录测试: {'通过' if map_catalog_result else '失败'}")
+
+    # 测试随机地图生成
+    map_generators_result = test_map_generators()
+    print(f"随机地图生成测试: {'通过' if map_generators_result else '失败'}")
+
     # 测试坐标转译
     coordinate_translation_result = test_coordinate_translation()
     print(f"坐标转译测试: {'通过' if coordinate_translation_result else '失败'}")
     
+    # 测试批量坐标转译
+    batched_translation_result = test_batched_coordinate_translation()
+    print(f"批量坐标转译测试: {'通过' if batched_translation_result else '失败'}")
+
     # 测试多机路径可视化
     visualization_result = test_multi_agent_visualization()
     print(f"多机路径可视化测试: {'通过' if visualization_result else '失败'}")
     
+    # 测试无界面渲染
+    headless_rendering_result = test_headless_rendering()
+    print(f"无界面渲染测试: {'通过' if headless_rendering_result else '失败'}")
+
+    # 测试占据栅格图像导入
+    ingestion_result = test_occupancy_ingestion()
+    print(f"占据栅格图像导入测试: {'通过' if ingestion_result else '失败'}")
+
     # 总结测试结果
-    all_tests_passed = map_conversion_result and coordinate_translation_result and visualization_result
+    all_tests_passed = map_conversion_result and compact_storage_result and map_catalog_result and map_generators_result and coordinate_translation_result and batched_translation_result and visualization_result and headless_rendering_result and ingestion_result
     print(f"\n所有测试: {'全部通过' if all_tests_passed else '部分失败'}")
@@ -0,0 +1,314 @@
+import numpy as np
+from collections import OrderedDict
+
+from PathPlanningCore import HeuristicType, GRID_DTYPE, default_planner_pool
+from mapCatalog import MapCatalog, build_map_catalog
+
+# 分块（瓦片）覆盖路径规划：地图以内存映射瓦片存储，逐块调用CoveragePlanner覆盖，
+# 块与块之间用连接路径拼接。任意时刻只有有限个瓦片驻留内存，峰值内存取决于瓦片尺寸而不是地图尺寸
+
+# 4邻域移动，与CoveragePlanner.movement一致
+MOVEMENT = [(-1, 0), (0, -1), (1, 0), (0, 1)]
+
+
+def tile_name(tile_row, tile_col):
+    return "tile_{}_{}".format(tile_row, tile_col)
+
+
+def build_tiled_map(path, input_map, tile_size=256):
+    '''
+    将大地图切分为瓦片写入地图目录文件，每次只读取一个瓦片
+
+    :param path: 目录文件路径
+    :param input_map: 输入的地图，可以是np.load(..., mmap_mode='r')得到的内存映射数组
+    :param tile_size: (默认为256) 瓦片边长
+    :return: (瓦片行数, 瓦片列数)
+    '''
+    rows, cols = input_map.shape
+    tile_rows = (rows + tile_size - 1) // tile_size
+    tile_cols = (cols + tile_size - 1) // tile_size
+
+    names = [tile_name(tr, tc) for tr in range(tile_rows) for tc in range(tile_cols)]
+    tiles = (input_map[tr*tile_size:(tr+1)*tile_size, tc*tile_size:(tc+1)*tile_size]
+             for tr in range(tile_rows) for tc in range(tile_cols))
+    build_map_catalog(path, tiles, names)
+    return tile_rows, tile_cols
+
+
+class TiledMap():
+    '''
+    瓦片地图：瓦片按需从地图目录读入，驻留内存的瓦片数量不超过max_resident（LRU淘汰）
+    '''
+
+    def __init__(self, catalog, max_resident=9):
+        if isinstance(catalog, str):
+            catalog = MapCatalog(catalog)
+        self.catalog = catalog
+        self.max_resident = max_resident
+        self.resident = OrderedDict()
+        self.peak_resident = 0
+
+        # 由瓦片名推出瓦片网格尺寸，由首行/首列瓦片推出地图尺寸
+        self.tile_rows = 0
+        self.tile_cols = 0
+        while tile_name(self.tile_rows, 0) in catalog:
+            self.tile_rows += 1
+        while tile_name(0, self.tile_cols) in catalog:
+            self.tile_cols += 1
+        self.tile_size = max(catalog.info(tile_name(0, 0))["shape"])
+        self.shape = (sum(catalog.info(tile_name(tr, 0))["shape"][0] for tr in range(self.tile_rows)),
+                      sum(catalog.info(tile_name(0, tc))["shape"][1] for tc in range(self.tile_cols)))
+
+    # 返回瓦片数组（驻留内存的拷贝）
+    def get(self, tile_row, tile_col):
+        key = (tile_row, tile_col)
+        if key in self.resident:
+            self.resident.move_to_end(key)
+            return self.resident[key]
+
+        tile = np.array(self.catalog.get(tile_name(tile_row, tile_col)), dtype=GRID_DTYPE)
+        self.resident[key] = tile
+        if len(self.resident) > self.max_resident:
+            self.resident.popitem(last=False)
+        self.peak_resident = max(self.peak_resident, len(self.resident))
+        return tile
+
+    # 返回瓦片左上角的总图坐标
+    def origin(self, tile_row, tile_col):
+        return tile_row * self.tile_size, tile_col * self.tile_size
+
+    # 返回给定总图坐标所在的瓦片
+    def tile_of(self, pos):
+        return pos[0] // self.tile_size, pos[1] // self.tile_size
+
+    # 拼接给定瓦片范围 [tr0, tr1] x [tc0, tc1] 的窗口，返回窗口地图和左上角坐标
+    def window(self, tr0, tc0, tr1, tc1):
+        top, left = self.origin(tr0, tc0)
+        bottom = min(self.shape[0], (tr1 + 1) * self.tile_size)
+        right = min(self.shape[1], (tc1 + 1) * self.tile_size)
+        window = np.ones((bottom - top, right - left), dtype=GRID_DTYPE)
+        for tr in range(tr0, tr1 + 1):
+            for tc in range(tc0, tc1 + 1):
+                tile = self.get(tr, tc)
+                r, c = self.origin(tr, tc)
+                window[r-top:r-top+tile.shape[0], c-left:c-left+tile.shape[1]] = tile
+        return window, (top, left)
+
+
+def label_components(free):
+    '''
+    标记4连通的可通行区域
+
+    以并行并查集的方式向量化：每一轮把相邻两个单元格所在的根挂到较小的根下，再做指针跳跃压缩，
+    轮数约为O(log 单元格数)，每一轮都是整张网格上的数组运算
+
+    :param free: bool数组，True为可通行
+    :return: (labels, 区域数量)，labels中0表示不可通行，区域编号从1开始（按区域中第一个单元格的行优先顺序）
+    '''
+    free = np.asarray(free, dtype=bool)
+    rows, cols = free.shape
+    index = np.arange(rows * cols).reshape(rows, cols)
+    parent = np.arange(rows * cols)
+
+    # 相邻可通行单元格之间的边
+    horizontal = free[:, :-1] & free[:, 1:]
+    vertical = free[:-1, :] & free[1:, :]
+    a = np.concatenate([index[:, :-1][horizontal], index[:-1, :][vertical]])
+    b = np.concatenate([index[:, 1:][horizontal], index[1:, :][vertical]])
+
+    while True:
+        root_a, root_b = parent[a], parent[b]
+        active = root_a != root_b
+        if not active.any():
+            break
+        a, b = a[active], b[active]
+        root_a, root_b = root_a[active], root_b[active]
+        # 根只会挂到更小的根下，不会成环；每个区域的根最终是其行优先的第一个单元格
+        np.minimum.at(parent, np.maximum(root_a, root_b), np.minimum(root_a, root_b))
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+
+    roots = parent.reshape(rows, cols)[free]
+    unique_roots = np.unique(roots)
+    labels = np.zeros((rows, cols), dtype=np.int32)
+    labels[free] = np.searchsorted(unique_roots, roots) + 1
+    return labels, len(unique_roots)
+
+
+def connect(free, start, target):
+    '''
+    查找从start到最近目标单元格的最短4连通路径
+
+    BFS波前以下标数组逐层向量化扩展，每层的代价与波前大小成正比；到达目标后沿距离递减的方向回溯，
+    Python循环只用于回溯路径本身
+
+    :param free: bool数组，True为可通行
+    :param start: 起点 (row, col)
+    :param target: bool数组，True为目标单元格
+    :return: 路径 [[row, col], ...]（包含起点和终点），找不到时返回None；同距离的目标取行优先的第一个
+    '''
+    rows, cols = free.shape
+    free_flat = np.ravel(free)
+    target_flat = np.ravel(target)
+    dist = np.full(rows * cols, -1, dtype=np.int32)
+    front = np.array([int(start[0]) * cols + int(start[1])], dtype=np.int64)
+    dist[front] = 0
+    d = 0
+    while True:
+        hits = front[target_flat[front]]
+        if len(hits) > 0:
+            x, y = divmod(int(hits.min()), cols)
+            break
+
+        # 波前的4邻域（不越过地图边界），只保留可通行且未到达的单元格
+        col = front % cols
+        neighbors = np.concatenate([front[front >= cols] - cols, front[front < (rows - 1) * cols] + cols,
+                                    front[col > 0] - 1, front[col < cols - 1] + 1])
+        neighbors = np.unique(neighbors[free_flat[neighbors] & (dist[neighbors] < 0)])
+        if len(neighbors) == 0:
+            return None
+        d += 1
+        dist[neighbors] = d
+        front = neighbors
+
+    # 从目标沿距离递减回溯到起点
+    dist = dist.reshape(rows, cols)
+    path = [[x, y]]
+    while d > 0:
+        for dx, dy in MOVEMENT:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < rows and 0 <= ny < cols and dist[nx, ny] == d - 1:
+                x, y = nx, ny
+                break
+        d -= 1
+        path.append([x, y])
+    path.reverse()
+    return path
+
+
+def serpentine_tiles(tile_rows, tile_cols):
+    # 蛇形遍历瓦片，保证相邻两个瓦片在地图上相邻
+    for tr in range(tile_rows):
+        cols = range(tile_cols) if tr % 2 == 0 else range(tile_cols - 1, -1, -1)
+        for tc in cols:
+            yield tr, tc
+
+
+def iter_tiled_coverage(tiled_map, cp_heuristic=HeuristicType.VERTICAL, connector_radius=1):
+    '''
+    逐块生成覆盖路径片段（流式输出，调用者可以边规划边写盘）
+
+    :param tiled_map: TiledMap或地图目录路径
+    :param cp_heuristic: (默认为VERTICAL) 块内覆盖搜索的启发式
+    :param connector_radius: (默认为1) 连接路径搜索窗口的瓦片半径
+    :return: 生成器，每个元素为 {"tile": (瓦片行, 瓦片列), "kind": "connector"或"coverage", "path": 总图坐标的(k, 2)数组}
+    '''
+    if not isinstance(tiled_map, TiledMap):
+        tiled_map = TiledMap(tiled_map, max_resident=(2 * connector_radius + 1) ** 2 + 1)
+
+    pos = None
+    orientation = 0
+    for tr, tc in serpentine_tiles(tiled_map.tile_rows, tiled_map.tile_cols):
+        tile = tiled_map.get(tr, tc)
+        top, left = tiled_map.origin(tr, tc)
+        labels, count = label_components(tile != 1)
+        # 瓦片内尚未经过的可通行单元格
+        uncovered = tile != 1
+
+        # 第一个瓦片从起始点（没有起始点时从第一个可通行单元格）开始
+        if pos is None and count > 0:
+            starts = np.argwhere(tile == 2)
+            local = starts[0] if len(starts) > 0 else np.argwhere(uncovered)[0]
+            pos = [top + int(local[0]), left + int(local[1])]
+
+        radius = connector_radius
+        while uncovered.any():
+            # 在当前瓦片周围（并包含当前位置所在瓦片）的窗口中寻找最近的未覆盖单元格
+            ptr, ptc = tiled_map.tile_of(pos)
+            tr0 = max(0, min(tr - radius, ptr))
+            tc0 = max(0, min(tc - radius, ptc))
+            tr1 = min(tiled_map.tile_rows - 1, max(tr + radius, ptr))
+            tc1 = min(tiled_map.tile_cols - 1, max(tc + radius, ptc))
+            window, (wtop, wleft) = tiled_map.window(tr0, tc0, tr1, tc1)
+
+            target = np.zeros(window.shape, dtype=bool)
+            target[top-wtop:top-wtop+tile.shape[0], left-wleft:left-wleft+tile.shape[1]] = uncovered
+            connector = connect(window != 1, [pos[0] - wtop, pos[1] - wleft], target)
+            if connector is None:
+                # 窗口内不连通时逐步扩大窗口；窗口已覆盖整张地图仍不连通，则剩余单元格不可达
+                if tr0 == 0 and tc0 == 0 and tr1 == tiled_map.tile_rows - 1 and tc1 == tiled_map.tile_cols - 1:
+                    break
+                radius *= 2
+                continue
+            radius = connector_radius
+
+            connector = np.asarray(connector, dtype=np.int32) + np.array([wtop, wleft], dtype=np.int32)
+            if len(connector) > 1:
+                last = connector[-1] - connector[-2]
+                orientation = MOVEMENT.index((int(last[0]), int(last[1])))
+                yield {"tile": (tr, tc), "kind": "connector", "path": connector}
+            entry = [int(connector[-1][0]) - top, int(connector[-1][1]) - left]
+
+            # 连接路径经过的本瓦片单元格也算已覆盖（入口除外，它是下一段覆盖的起点）
+            local = connector[:-1] - np.array([top, left], dtype=np.int32)
+            inside = ((local[:, 0] >= 0) & (local[:, 0] < tile.shape[0])
+                      & (local[:, 1] >= 0) & (local[:, 1] < tile.shape[1]))
+            uncovered[local[inside, 0], local[inside, 1]] = False
+
+            # 用现有规划器覆盖入口所在连通区域内尚未经过的单元格
+            tile_map = (tile == 1).astype(GRID_DTYPE)
+            tile_map[entry[0], entry[1]] = 2
+            with default_planner_pool.planner(tile_map, (labels == labels[entry[0], entry[1]]) & uncovered) as cp:
+                cp.start(initial_orientation=orientation, cp_heuristic=cp_heuristic)
+                cp.compute()
+                xy = np.asarray(cp.result()[4], dtype=np.int32).reshape(-1, 2)
+                orientation = cp.current_pos[2]
+            uncovered[xy[:, 0], xy[:, 1]] = False
+            xy += np.array([top, left], dtype=np.int32)
+            pos = [int(xy[-1][0]), int(xy[-1][1])]
+            yield {"tile": (tr, tc), "kind": "coverage", "path": xy}
+
+
+def plan_tiled_coverage(catalog, cp_heuristic=HeuristicType.VERTICAL, connector_radius=1) -> dict:
+    '''
+    分块覆盖路径规划，并把所有片段拼接为一条轨迹
+
+    :param catalog: 由build_tiled_map生成的地图目录 (MapCatalog或文件路径)
+    :param cp_heuristic: (默认为VERTICAL) 块内覆盖搜索的启发式
+    :param connector_radius: (默认为1) 连接路径搜索窗口的瓦片半径
+    :return: {"path": 总图坐标轨迹(k, 2), "steps": 总步数, "uncovered": 未能到达的可通行单元格数, "peak_resident_tiles": 最多同时驻留的瓦片数}
+    '''
+    tiled_map = TiledMap(catalog, max_resident=(2 * connector_radius + 1) ** 2 + 1)
+
+    segments = []
+    for segment in iter_tiled_coverage(tiled_map, cp_heuristic, connector_radius):
+        path = segment["path"]
+        # 去掉与上一片段末尾重复的位置
+        if segments and len(path) > 0 and np.array_equal(segments[-1][-1], path[0]):
+            path = path[1:]
+        segments.append(path)
+    path = np.concatenate(segments) if segments else np.zeros((0, 2), dtype=np.int32)
+
+    # 按瓦片对轨迹点分桶，逐块统计未覆盖的可通行单元格
+    tile_ids = (path[:, 0] // tiled_map.tile_size) * tiled_map.tile_cols + path[:, 1] // tiled_map.tile_size
+    order = np.argsort(tile_ids, kind='stable')
+    bounds = np.searchsorted(tile_ids[order], np.arange(tiled_map.tile_rows * tiled_map.tile_cols + 1))
+    uncovered = 0
+    for tr, tc in serpentine_tiles(tiled_map.tile_rows, tiled_map.tile_cols):
+        top, left = tiled_map.origin(tr, tc)
+        tile = tiled_map.get(tr, tc)
+        tile_id = tr * tiled_map.tile_cols + tc
+        points = path[order[bounds[tile_id]:bounds[tile_id + 1]]]
+        visited = np.zeros(tile.shape, dtype=bool)
+        visited[points[:, 0] - top, points[:, 1] - left] = True
+        uncovered += int(np.count_nonzero((tile != 1) & ~visited))
+
+    return {
+        "path": path,
+        "steps": max(len(path) - 1, 0),
+        "uncovered": uncovered,
+        "peak_resident_tiles": tiled_map.peak_resident
+    }
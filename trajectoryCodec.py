@@ -0,0 +1,146 @@
+import numpy as np
+
+from PathPlanningCore import PlannerStatus
+
+# 轨迹压缩：把逐单元格的路径编码为直线段 (起点, 方向, 长度) 和转弯事件，可以无损展开回单元格路径
+
+# 与CoveragePlanner一致的移动方向 ['^', '<', 'v', '>'] 和动作 ['R', '#', 'L', 'B']
+MOVEMENT = np.array([[-1, 0], [0, -1], [1, 0], [0, 1]], dtype=np.int64)
+ACTION_NAME = ['R', '#', 'L', 'B']
+
+# 由 (dr+1)*3 + (dc+1) 查找移动方向，-1表示不是单步4连通移动
+_DIRECTION_LOOKUP = np.full(9, -1, dtype=np.int64)
+for _i, (_dr, _dc) in enumerate(MOVEMENT):
+    _DIRECTION_LOOKUP[(_dr + 1) * 3 + (_dc + 1)] = _i
+
+
+def compress_trajectory(points, move_status=None, start_orientation=0, end_status=None) -> dict:
+    '''
+    将单元格路径压缩为直线段
+
+    :param points: 路径点 [[row, col], ...] 或 (n, 2) 数组，相邻点必须4连通
+    :param move_status: (默认为None) 每一步移动的状态值 (长度n-1，PlannerStatus.value)，状态变化处也会分段
+    :param start_orientation: (默认为0) 初始方向
+    :param end_status: (默认为None) 终点状态值 (PlannerStatus.value)
+    :return: 压缩轨迹
+
+    {
+        "start": 起点 [row, col],
+
+        "start_orientation": 初始方向,
+
+        "end_status": 终点状态值,
+
+        "segments": (段数, 5) 的int32数组，每行为 [起点row, 起点col, 方向, 长度, 状态值],
+
+        "turns": (段数-1, 3) 的int32数组，每行为 [row, col, 动作]，动作是ACTION_NAME的下标
+    }
+    '''
+    points = np.asarray(points, dtype=np.int64).reshape(-1, 2)
+    if len(points) == 0:
+        raise ValueError("轨迹为空")
+
+    delta = np.diff(points, axis=0)
+    code = (delta[:, 0] + 1) * 3 + (delta[:, 1] + 1)
+    valid = (np.abs(delta) <= 1).all(axis=1)
+    directions = np.where(valid, _DIRECTION_LOOKUP[np.clip(code, 0, 8)], -1)
+    if np.any(directions < 0):
+        raise ValueError("轨迹第{}步不是单步4连通移动".format(int(np.argmax(directions < 0)) + 1))
+
+    if move_status is None:
+        move_status = np.zeros(len(directions), dtype=np.int64)
+    move_status = np.asarray(move_status, dtype=np.int64)
+
+    # 方向或状态变化处开始新的一段
+    change = (directions[1:] != directions[:-1]) | (move_status[1:] != move_status[:-1])
+    starts = np.concatenate([[0], np.flatnonzero(change) + 1]) if len(directions) > 0 else np.zeros(0, dtype=np.int64)
+    lengths = np.diff(np.concatenate([starts, [len(directions)]]))
+
+    segments = np.stack([points[starts, 0], points[starts, 1], directions[starts], lengths, move_status[starts]],
+                        axis=1).astype(np.int32).reshape(-1, 5)
+
+    # 转弯事件：方向改变的段起点，以及从上一方向到新方向所需的动作
+    turn_idx = np.flatnonzero(segments[1:, 2] != segments[:-1, 2]) + 1
+    actions = (segments[turn_idx, 2] - segments[turn_idx - 1, 2] + 1) % len(ACTION_NAME)
+    turns = np.stack([segments[turn_idx, 0], segments[turn_idx, 1], actions], axis=1).astype(np.int32).reshape(-1, 3)
+
+    return {
+        "start": [int(points[0][0]), int(points[0][1])],
+        "start_orientation": int(start_orientation),
+        "end_status": end_status,
+        "segments": segments,
+        "turns": turns
+    }
+
+
+def compress_policy(trajectory) -> dict:
+    '''
+    直接由规划器输出的完整轨迹 (CoveragePlanner.current_trajectory或结果中的policy_map) 压缩，
+    只遍历一次轨迹，不生成逐单元格的坐标列表
+
+    :param trajectory: 完整轨迹 [[值, x, y, 方向, 执行的动作, 下一个动作, 当前状态_], ...]
+    :return: 压缩轨迹，格式同compress_trajectory
+    '''
+    segments = []
+    turns = []
+    prev = trajectory[0]
+    for t in trajectory[1:]:
+        direction = _DIRECTION_LOOKUP[(t[1] - prev[1] + 1) * 3 + (t[2] - prev[2] + 1)] \
+            if abs(t[1] - prev[1]) <= 1 and abs(t[2] - prev[2]) <= 1 else -1
+        if direction < 0:
+            raise ValueError("轨迹在({}, {})处不是单步4连通移动".format(t[1], t[2]))
+        status = prev[6].value
+        if segments and segments[-1][2] == direction and segments[-1][4] == status:
+            segments[-1][3] += 1
+        else:
+            if segments and segments[-1][2] != direction:
+                turns.append([prev[1], prev[2], (direction - segments[-1][2] + 1) % len(ACTION_NAME)])
+            segments.append([prev[1], prev[2], direction, 1, status])
+        prev = t
+
+    return {
+        "start": [int(trajectory[0][1]), int(trajectory[0][2])],
+        "start_orientation": int(trajectory[0][3]),
+        "end_status": trajectory[-1][6].value,
+        "segments": np.array(segments, dtype=np.int32).reshape(-1, 5),
+        "turns": np.array(turns, dtype=np.int32).reshape(-1, 3)
+    }
+
+
+def expand_trajectory(compressed, with_status=False):
+    '''
+    将压缩轨迹无损展开为单元格路径
+
+    :param compressed: compress_trajectory或compress_policy的输出
+    :param with_status: (默认为False) 是否同时返回每个路径点的状态值
+    :return: (n, 2) 的路径点数组；with_status为True时返回 (路径点数组, 状态值数组)
+    '''
+    segments = np.asarray(compressed["segments"], dtype=np.int64).reshape(-1, 5)
+    moves = np.repeat(MOVEMENT[segments[:, 2]], segments[:, 3], axis=0)
+    points = np.empty((len(moves) + 1, 2), dtype=np.int64)
+    points[0] = compressed["start"]
+    np.cumsum(moves, axis=0, out=points[1:])
+    points[1:] += points[0]
+
+    if not with_status:
+        return points
+    status = np.empty(len(points), dtype=np.int64)
+    status[:-1] = np.repeat(segments[:, 4], segments[:, 3])
+    status[-1] = compressed["end_status"] if compressed["end_status"] is not None else 0
+    return points, status
+
+
+def compress_result(best_trajectory) -> dict:
+    '''
+    将plan_coverage_path / plan_map返回的路径字典转换为下发给机器人的紧凑格式，
+    用压缩轨迹代替逐单元格的Path_point_list和policy_map
+
+    :param best_trajectory: 路径字典
+    :return: 紧凑路径字典，"segments"为嵌套列表，便于JSON序列化（转弯点即各段起点，不再单独下发）
+    '''
+    compressed = compress_policy(best_trajectory["policy_map"])
+    payload = {k: v for k, v in best_trajectory.items() if k not in ("Path_point_list", "policy_map")}
+    payload["start_orientation_code"] = compressed["start_orientation"]
+    payload["end_status"] = PlannerStatus(compressed["end_status"]).name
+    payload["segments"] = compressed["segments"].tolist()
+    return payload